@@ -0,0 +1,137 @@
+# io_executor.py
+
+"""
+Off-loop file I/O for the notes server.
+
+- IOExecutor: a bounded thread pool that runs blocking filesystem and SQLite
+  work, counting in-flight and finished calls.
+- LoopLagMonitor: a background task that measures how late the event loop
+  wakes up from short sleeps, i.e. how long it was blocked.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+
+class IOExecutor:
+    """
+    A bounded thread pool for blocking I/O, with call counters.
+
+    At most `max_workers` calls run at once; further calls queue up in the
+    pool instead of piling threads onto the disk.
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        self.max_workers: int = max_workers
+        self.pending: int = 0
+        self.completed: int = 0
+        self.busy_seconds: float = 0.0
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="notes-io"
+            )
+        return self._pool
+
+    def _timed[T](self, func: Callable[[], T]) -> T:
+        started: float = time.perf_counter()
+        try:
+            return func()
+        finally:
+            elapsed: float = time.perf_counter() - started
+            with self._lock:
+                self.busy_seconds += elapsed
+
+    async def run[T](self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run `func(*args, **kwargs)` in the pool and await its result."""
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        call: Callable[[], T] = functools.partial(func, *args, **kwargs)
+        self.pending += 1
+        try:
+            return await loop.run_in_executor(
+                self._executor(), functools.partial(self._timed, call)
+            )
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "pending": self.pending,
+            "completed": self.completed,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag by sleeping for `interval` seconds in a loop and
+    recording how much later than asked each wake-up happened.
+
+    The most recent `window` samples are kept for percentiles.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600) -> None:
+        self.interval: float = interval
+        self.samples: deque[float] = deque(maxlen=window)
+        self.max_lag: float = 0.0
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started: float = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(lag=time.perf_counter() - started - self.interval)
+
+    def record(self, lag: float) -> None:
+        lag = max(0.0, lag)
+        self.samples.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+
+    def stats(self) -> dict[str, Any]:
+        """Return lag percentiles over the window, in milliseconds."""
+        ordered: list[float] = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(
+                ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3
+            )
+
+        return {
+            "running": self._task is not None,
+            "samples": len(ordered),
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+            "window_max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+            "max_ms": round(self.max_lag * 1000, 3),
+        }
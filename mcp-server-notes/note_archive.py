@@ -0,0 +1,231 @@
+# note_archive.py
+
+"""
+Streaming import and export of note files for the notes server.
+
+Notes can be read from, and written to, a plain directory, a tar archive
+(optionally gzip, bz2 or xz compressed) or a zip archive. Archives are
+processed one member at a time, so memory use does not grow with their size.
+
+Exports include a manifest mapping each note file's name (without suffix) to
+the note's original title, which filenames cannot always spell.
+"""
+
+import io
+import itertools
+import json
+import os
+import tarfile
+import time
+import zipfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, BinaryIO
+
+# Manifest member holding {"titles": {filename stem: title}}
+MANIFEST_NAME: str = "notes-manifest.json"
+
+# File suffixes treated as notes when importing
+NOTE_SUFFIXES: tuple[str, ...] = (".txt", ".md")
+
+# Earliest time a zip archive can record (1980-01-01, with a day to spare for
+# time zones)
+ZIP_EPOCH: float = 315_619_200.0
+
+# Archive suffixes, by archive kind
+TAR_SUFFIXES: tuple[str, ...] = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+ZIP_SUFFIXES: tuple[str, ...] = (".zip",)
+
+
+def archive_kind(path: Path) -> str:
+    """
+    Returns "tar", "zip" or "directory" for an import source or export target.
+    """
+    name: str = path.name.lower()
+    if name.endswith(TAR_SUFFIXES):
+        return "tar"
+    if name.endswith(ZIP_SUFFIXES):
+        return "zip"
+    return "directory"
+
+
+def _is_note_name(name: str) -> bool:
+    base: str = name.rsplit("/", 1)[-1]
+    return base.lower().endswith(NOTE_SUFFIXES) and not base.startswith(".")
+
+
+def read_manifest(data: bytes) -> dict[str, str]:
+    """
+    Returns the stem -> title mapping of a manifest, or an empty mapping if
+    it is malformed.
+    """
+    try:
+        titles: Any = json.loads(data).get("titles")
+    except (ValueError, AttributeError):
+        return {}
+    if not isinstance(titles, dict):
+        return {}
+    return {
+        stem: title
+        for stem, title in titles.items()
+        if isinstance(stem, str) and isinstance(title, str)
+    }
+
+
+def _manifest(titles: dict[str, str]) -> bytes:
+    return json.dumps({"titles": titles}, ensure_ascii=False).encode(encoding="utf-8")
+
+
+def _read_bounded(f: BinaryIO, max_bytes: int) -> bytes | None:
+    """Reads at most `max_bytes` from `f`, or returns None if it holds more."""
+    data: bytes = f.read(max_bytes + 1)
+    return data if len(data) <= max_bytes else None
+
+
+def iter_note_files(
+    source: Path, max_bytes: int, max_members: int
+) -> Iterator[tuple[str, bytes | None, str | None]]:
+    """
+    Yields (member name, raw content, error) for every note file in a
+    directory, tar or zip archive, reading one file at a time.
+
+    Only `.txt` and `.md` files are yielded; hidden files are skipped. The
+    manifest is yielded too, under MANIFEST_NAME: first for directories and
+    zip archives, and where it is stored for tar archives (exports store it
+    first). Member names are never used as paths, so archives cannot write
+    outside the notes directory.
+
+    Files larger than `max_bytes` are not read (at most `max_bytes + 1`
+    bytes are, whatever size they claim) and come with an error instead of
+    content. After `max_members` members, files included, one final error
+    is yielded under the source's name and the rest is skipped, so that a
+    crafted archive cannot exhaust memory.
+    """
+    too_large: str = f"Larger than the {max_bytes}-byte import limit."
+    too_many: tuple[str, None, str] = (
+        source.name,
+        None,
+        f"More than {max_members} archive members; the rest were skipped.",
+    )
+    kind: str = archive_kind(path=source)
+    if kind == "tar":
+        # Stream mode reads the archive sequentially without seeking
+        with tarfile.open(name=source, mode="r|*") as archive:
+            for count, member in enumerate(archive, start=1):
+                if count > max_members:
+                    yield too_many
+                    return
+                if not member.isfile() or not (
+                    member.name == MANIFEST_NAME or _is_note_name(name=member.name)
+                ):
+                    continue
+                if member.size > max_bytes:
+                    yield member.name, None, too_large
+                    continue
+                f = archive.extractfile(member)
+                if f is not None:
+                    data: bytes | None = _read_bounded(f=f, max_bytes=max_bytes)
+                    yield member.name, data, None if data is not None else too_large
+    elif kind == "zip":
+        with zipfile.ZipFile(file=source) as archive:
+            infos: list[zipfile.ZipInfo] = archive.infolist()
+            manifest: zipfile.ZipInfo | None = archive.NameToInfo.get(MANIFEST_NAME)
+            notes: Iterator[zipfile.ZipInfo] = (
+                info
+                for info in infos[:max_members]
+                if not info.is_dir() and _is_note_name(name=info.filename)
+            )
+            for info in ([manifest] if manifest is not None else []) + list(notes):
+                if info.file_size > max_bytes:
+                    yield info.filename, None, too_large
+                    continue
+                with archive.open(name=info) as f:
+                    data = _read_bounded(f=f, max_bytes=max_bytes)
+                yield info.filename, data, None if data is not None else too_large
+            if len(infos) > max_members:
+                yield too_many
+    else:
+        if not source.is_dir():
+            raise FileNotFoundError(f"No such directory: {source}")
+        paths: Iterator[Path] = (
+            path
+            for path in sorted(source.rglob(pattern="*"))
+            if path.is_file() and _is_note_name(name=path.name)
+        )
+        if (source / MANIFEST_NAME).is_file():
+            paths = itertools.chain([source / MANIFEST_NAME], paths)
+        for count, path in enumerate(paths, start=1):
+            if count > max_members:
+                yield too_many
+                return
+            name: str = str(path.relative_to(source))
+            if path.stat().st_size > max_bytes:
+                yield name, None, too_large
+                continue
+            with path.open(mode="rb") as f:
+                data = _read_bounded(f=f, max_bytes=max_bytes)
+            yield name, data, None if data is not None else too_large
+
+
+def export_note_files(
+    files: Iterable[tuple[str, bytes, float]],
+    destination: Path,
+    titles: dict[str, str] | None = None,
+) -> int:
+    """
+    Writes (filename, content, mtime) triples into a new directory, tar or
+    zip archive, keeping each file's modification time, preceded by a
+    manifest of the notes' `titles` by filename stem.
+
+    Archives are compressed according to their suffix (e.g. `.tar.gz`). An
+    existing archive is never overwritten; files already present in an
+    existing directory are left alone, while its manifest is extended.
+    Returns the number of note files written.
+    """
+    manifest: bytes = _manifest(titles=titles or {})
+    kind: str = archive_kind(path=destination)
+    written: int = 0
+    if kind == "tar":
+        compression: str = {".gz": "gz", ".tgz": "gz", ".bz2": "bz2", ".xz": "xz"}.get(
+            destination.suffix.lower(), ""
+        )
+        with tarfile.open(name=destination, mode=f"x:{compression}") as archive:
+            info = tarfile.TarInfo(name=MANIFEST_NAME)
+            info.size = len(manifest)
+            info.mtime = int(time.time())
+            archive.addfile(tarinfo=info, fileobj=io.BytesIO(manifest))
+            for name, data, mtime in files:
+                info = tarfile.TarInfo(name=name)
+                info.size = len(data)
+                info.mtime = int(mtime)
+                archive.addfile(tarinfo=info, fileobj=io.BytesIO(data))
+                written += 1
+    elif kind == "zip":
+        with zipfile.ZipFile(
+            file=destination, mode="x", compression=zipfile.ZIP_DEFLATED
+        ) as archive:
+            archive.writestr(zinfo_or_arcname=MANIFEST_NAME, data=manifest)
+            for name, data, mtime in files:
+                info = zipfile.ZipInfo(
+                    filename=name, date_time=time.localtime(max(mtime, ZIP_EPOCH))[:6]
+                )
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(zinfo_or_arcname=info, data=data)
+                written += 1
+    else:
+        destination.mkdir(parents=True, exist_ok=True)
+        manifest_path: Path = destination / MANIFEST_NAME
+        if manifest_path.is_file():
+            manifest = _manifest(
+                titles=read_manifest(data=manifest_path.read_bytes()) | (titles or {})
+            )
+        manifest_path.write_bytes(manifest)
+        for name, data, mtime in files:
+            try:
+                with (destination / name).open(mode="xb") as f:
+                    f.write(data)
+            except FileExistsError:
+                continue
+            os.utime(destination / name, times=(mtime, mtime))
+            written += 1
+    return written
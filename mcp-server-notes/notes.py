@@ -2,22 +2,342 @@
 """
 This module provides a simple note-taking application using the FastMCP framework.
 It includes tools for creating, reading, editing, deleting, and listing notes.
-Each note is stored as a separate file in the 'notes_data' directory.
+By default each note is stored as a separate file in the 'notes_data' directory;
+a single-file SQLite store can be selected instead (see storage.py).
 """
 
+import asyncio
+import atexit
+import base64
+import binascii
+import json
+import os
 import re
+import tarfile
+import threading
 import unicodedata
+import zipfile
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
+from typing import Any
+from urllib.parse import unquote
 
+from io_executor import IOExecutor, LoopLagMonitor
 from mcp.server import FastMCP
-
-# Initialize FastMCP server
-mcp = FastMCP(name="notes")
+from note_archive import (
+    MANIFEST_NAME,
+    archive_kind,
+    export_note_files,
+    iter_note_files,
+    read_manifest,
+)
+from search_index import SearchHit, SearchIndex
+from storage import (
+    CREATE,
+    REPLACE,
+    SORT_MTIME,
+    SORT_NAME,
+    UPSERT,
+    BlobStore,
+    FileStore,
+    NoteMeta,
+    NoteStore,
+    SQLiteStore,
+    WriteResult,
+    iter_contents,
+)
+from subscriptions import ResourceSubscriptions, StoreWatcher, enable_subscriptions
 
 # Current file path
 current_dir: Path = Path(__file__).parent
 notes_dir: Path = current_dir / "notes_data"
 
+# Storage backend: "file" (one .txt per note in notes_data), "sqlite", or
+# "blob" (deduplicated, compressed contents)
+NOTES_BACKEND: str = os.getenv(key="NOTES_BACKEND", default="file").lower()
+NOTES_DB_PATH: Path = Path(
+    os.getenv(key="NOTES_DB_PATH", default=str(current_dir / "notes.sqlite3"))
+)
+NOTES_BLOB_DIR: Path = Path(
+    os.getenv(key="NOTES_BLOB_DIR", default=str(current_dir / "notes_blobs"))
+)
+# Smallest note the blob backend compresses, in bytes
+NOTES_COMPRESS_MIN_BYTES: int = int(
+    os.getenv(key="NOTES_COMPRESS_MIN_BYTES", default="4096")
+)
+
+# Full-text search index, kept outside notes_data so writing it does not
+# touch the notes directory's mtime
+NOTES_SEARCH_INDEX_PATH: Path = Path(
+    os.getenv(
+        key="NOTES_SEARCH_INDEX_PATH",
+        default=str(current_dir / "notes_search.sqlite3"),
+    )
+)
+
+
+# Default and largest number of titles list_notes returns per page
+NOTES_LIST_PAGE_SIZE: int = int(os.getenv(key="NOTES_LIST_PAGE_SIZE", default="100"))
+NOTES_LIST_MAX_PAGE_SIZE: int = 1000
+
+# Default size budget of notes_summary_prompt, in estimated tokens, and the
+# largest extract taken from any one note
+SUMMARY_MAX_TOKENS: int = int(os.getenv(key="NOTES_SUMMARY_MAX_TOKENS", default="8000"))
+SUMMARY_NOTE_MAX_TOKENS: int = int(
+    os.getenv(key="NOTES_SUMMARY_NOTE_MAX_TOKENS", default="1000")
+)
+# Rough UTF-8 bytes per token used to turn token budgets into byte budgets
+BYTES_PER_TOKEN: int = 4
+
+# Number of per-note extracts kept for notes_summary_prompt
+EXTRACT_CACHE_SIZE: int = int(os.getenv(key="NOTES_EXTRACT_CACHE_SIZE", default="4096"))
+
+# Notes written per batch (one index transaction) when importing
+IMPORT_BATCH_SIZE: int = int(os.getenv(key="NOTES_IMPORT_BATCH_SIZE", default="500"))
+# Largest file imported, and most archive members looked at, per import
+IMPORT_MAX_BYTES: int = int(
+    os.getenv(key="NOTES_IMPORT_MAX_BYTES", default=str(10 * 1024 * 1024))
+)
+IMPORT_MAX_MEMBERS: int = int(
+    os.getenv(key="NOTES_IMPORT_MAX_MEMBERS", default="100000")
+)
+
+# Worker threads doing the server's file and index I/O
+IO_WORKERS: int = int(os.getenv(key="NOTES_IO_WORKERS", default="4"))
+# How often the event loop's responsiveness is sampled, in seconds
+LOOP_LAG_INTERVAL: float = float(
+    os.getenv(key="NOTES_LOOP_LAG_INTERVAL", default="0.1")
+)
+
+# How often the note store is checked for changes by other processes while
+# clients are subscribed, and how long changes are collected before
+# subscribers are notified, in seconds
+NOTES_WATCH_INTERVAL: float = float(
+    os.getenv(key="NOTES_WATCH_INTERVAL", default="1.0")
+)
+NOTES_NOTIFY_DEBOUNCE: float = float(
+    os.getenv(key="NOTES_NOTIFY_DEBOUNCE", default="0.2")
+)
+
+# Resources with fixed URIs; any other notes:// URI names a note
+LATEST_URI: str = "notes://latest"
+IO_STATS_URI: str = "notes://stats/io"
+STORAGE_STATS_URI: str = "notes://stats/storage"
+
+
+# --- Storage ---
+
+
+def create_note_store() -> NoteStore:
+    """
+    Creates the storage backend selected by NOTES_BACKEND.
+    """
+    if NOTES_BACKEND == "sqlite":
+        return SQLiteStore(path=NOTES_DB_PATH)
+    if NOTES_BACKEND == "blob":
+        return BlobStore(
+            directory=NOTES_BLOB_DIR, compress_min_bytes=NOTES_COMPRESS_MIN_BYTES
+        )
+    if NOTES_BACKEND != "file":
+        raise ValueError(
+            f"Unknown NOTES_BACKEND '{NOTES_BACKEND}'; use file, sqlite or blob."
+        )
+    return FileStore(directory=notes_dir)
+
+
+# Where every tool reads and writes notes
+note_store: NoteStore = create_note_store()
+
+# Full-text index of note titles and contents
+search_index = SearchIndex(path=NOTES_SEARCH_INDEX_PATH)
+
+# Store version the search index was last synced against
+_search_synced_version: int | None = None
+
+
+# --- Per-Note Locks ---
+
+
+class KeyedLock:
+    """
+    One asyncio lock per key, created on first use and dropped once no task
+    holds or waits for it.
+
+    Writes to the same note are serialized while writes to different notes
+    proceed concurrently.
+    """
+
+    def __init__(self) -> None:
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._users: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        lock: asyncio.Lock = self._locks.setdefault(key, asyncio.Lock())
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
+
+
+# Locks of the notes being written, keyed by filename stem
+note_locks = KeyedLock()
+
+
+# --- Note Extracts ---
+
+
+class ExtractCache:
+    """
+    LRU cache of the leading extract of each note, as used in prompts.
+
+    An extract is reused only while the note's size and mtime, and the
+    extract length asked for, are unchanged.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize: int = maxsize
+        self._entries: OrderedDict[str, tuple[tuple[int, float, int], str]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, meta: NoteMeta, max_bytes: int, store: NoteStore) -> str | None:
+        """
+        Returns at most `max_bytes` of the start of a note, reading only that
+        much of it when the extract is not cached. Returns None if the note
+        no longer exists.
+        """
+        version: tuple[int, float, int] = (meta.size, meta.mtime, max_bytes)
+        with self._lock:
+            cached: tuple[tuple[int, float, int], str] | None = self._entries.get(
+                meta.stem
+            )
+            if cached is not None and cached[0] == version:
+                self._entries.move_to_end(meta.stem)
+                return cached[1]
+
+        data: bytes | None = store.read_prefix(stem=meta.stem, max_bytes=max_bytes + 1)
+        if data is None:
+            return None
+        extract: str = data[:max_bytes].decode(encoding="utf-8", errors="ignore")
+        if len(data) > max_bytes:
+            # Cut at a word boundary and mark the note as truncated
+            cut: int = extract.rfind(" ")
+            extract = (extract[:cut] if cut > 0 else extract).rstrip() + " [...]"
+
+        with self._lock:
+            self._entries[meta.stem] = (version, extract)
+            self._entries.move_to_end(meta.stem)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return extract
+
+    def discard(self, stem: str) -> None:
+        with self._lock:
+            self._entries.pop(stem, None)
+
+
+# Extracts of notes included in summary prompts
+extract_cache = ExtractCache(maxsize=EXTRACT_CACHE_SIZE)
+
+
+# --- I/O Pool ---
+
+# Thread pool running every blocking file and index operation
+io_executor = IOExecutor(max_workers=IO_WORKERS)
+
+# Samples how long the event loop is blocked
+loop_lag = LoopLagMonitor(interval=LOOP_LAG_INTERVAL)
+
+
+# --- Subscriptions ---
+
+
+def _resource_key(uri: str) -> str:
+    """
+    Maps a subscribed URI to the key its changes are announced under, so
+    that `notes://Apple%20Pie` and `notes://apple-pie` both follow one note.
+    """
+    if uri in (LATEST_URI, IO_STATS_URI, STORAGE_STATS_URI) or not uri.startswith(
+        "notes://"
+    ):
+        return uri
+    return "note:" + _get_note_stem(title=unquote(uri.removeprefix("notes://")))
+
+
+def _changed_keys(stems: Iterable[str]) -> list[str]:
+    return [LATEST_URI, STORAGE_STATS_URI, *(f"note:{stem}" for stem in stems)]
+
+
+def _subscribed_stems() -> list[str]:
+    return [
+        key.removeprefix("note:")
+        for key in subscriptions.subscribed_keys()
+        if key.startswith("note:")
+    ]
+
+
+def _announce_external(stems: set[str], list_changed: bool) -> None:
+    subscriptions.changed(keys=_changed_keys(stems=stems), list_changed=list_changed)
+
+
+# Sessions subscribed to notes resources
+subscriptions = ResourceSubscriptions(debounce=NOTES_NOTIFY_DEBOUNCE, key=_resource_key)
+
+# Notices notes changed by other processes while anyone is subscribed
+store_watcher = StoreWatcher(
+    store=note_store,
+    on_change=_announce_external,
+    active=lambda: len(subscriptions) > 0,
+    run=io_executor.run,
+    interval=NOTES_WATCH_INTERVAL,
+    watched=_subscribed_stems,
+)
+
+
+# --- Server Lifecycle ---
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """
+    Start event-loop lag sampling and change notifications.
+
+    FastMCP enters the lifespan once per client session (over SSE, once per
+    connection), but these are shared by every session, so they are started
+    by the first one and left running when any one session ends. The I/O
+    pool, note store and search index are released when the process exits.
+    """
+    loop_lag.start()
+    subscriptions.start()
+    store_watcher.start()
+    yield
+
+
+def _release() -> None:
+    io_executor.shutdown()
+    note_store.close()
+    search_index.close()
+
+
+atexit.register(_release)
+
+
+# Initialize FastMCP server
+mcp = FastMCP(name="notes", lifespan=lifespan)
+enable_subscriptions(server=mcp, subscriptions=subscriptions)
+
 
 # --- Helper Functions ---
 
@@ -36,33 +356,391 @@ def _sanitize_title_to_filename(title: str) -> str:
     return s + ".txt"
 
 
-def _get_note_path(title: str) -> Path:
+def _get_note_stem(title: str) -> str:
+    """
+    Gets the key a note is stored under from its title.
+    """
+    return _sanitize_title_to_filename(title).removesuffix(".txt")
+
+
+def _encode_cursor(sort: str, prefix: str, meta: NoteMeta) -> str:
+    """
+    Encodes the position after `meta` in a listing as an opaque cursor.
+    """
+    raw: bytes = json.dumps(
+        [sort, prefix, meta.mtime, meta.stem], separators=(",", ":")
+    ).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, prefix: str) -> tuple[float, str]:
     """
-    Gets the full path for a note from its title.
-    Ensures the notes directory exists.
+    Decodes a cursor from _encode_cursor into the (mtime, stem) to list after.
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another listing.
     """
-    notes_dir.mkdir(exist_ok=True)
-    filename = _sanitize_title_to_filename(title)
-    return notes_dir / filename
+    try:
+        raw: bytes = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_prefix, mtime, stem = json.loads(raw)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError("malformed cursor") from e
+    if (cursor_sort, cursor_prefix) != (sort, prefix):
+        raise ValueError("cursor is from a listing with another sort or prefix")
+    return float(mtime), str(stem)
+
+
+def _sync_search_index() -> None:
+    """
+    Re-index notes changed by other processes since the last sync.
+
+    Only runs when the store reports it may have changed; the server's own
+    writes update the search index directly.
+    """
+    global _search_synced_version
+
+    note_store.refresh()
+    version: int = note_store.version
+    if _search_synced_version == version:
+        return
+
+    indexed: dict[str, tuple[int, float]] = search_index.indexed()
+    metas: dict[str, NoteMeta] = {meta.stem: meta for meta in note_store.entries()}
+    for stem in indexed.keys() - metas.keys():
+        search_index.remove(stem=stem)
+    for stem, meta in metas.items():
+        if indexed.get(stem) == (meta.size, meta.mtime):
+            continue
+        content: str | None = note_store.read(stem=stem)
+        if content is None:
+            continue
+        search_index.upsert(
+            stem=stem,
+            title=search_index.title(stem=stem) or meta.title,
+            content=content,
+            size=meta.size,
+            mtime=meta.mtime,
+        )
+    _search_synced_version = version
+
+
+# --- Blocking Operations ---
+# Each tool runs one of these on the I/O pool, so a tool call costs a single
+# hop off the event loop however many files and index rows it touches.
+
+
+def _list_page(
+    sort: str, prefix: str, after: tuple[float, str] | None, limit: int
+) -> list[NoteMeta]:
+    note_store.refresh()
+    # One extra entry tells whether another page follows
+    metas: list[NoteMeta] = note_store.page(
+        sort=sort, prefix=prefix, after=after, limit=limit + 1
+    )
+    if note_store.recheck(stems=[meta.stem for meta in metas]):
+        # Notes rewritten in place by other processes may have moved
+        metas = note_store.page(sort=sort, prefix=prefix, after=after, limit=limit + 1)
+    return metas
+
+
+def _write_note(stem: str, title: str, content: str, mode: str) -> WriteResult:
+    """
+    Creates or replaces one note and updates the search index.
+    """
+    result: WriteResult = note_store.write(
+        stem=stem, title=title, content=content, mode=mode
+    )
+    if result.meta is not None:
+        extract_cache.discard(stem=stem)
+        search_index.upsert(
+            stem=stem,
+            title=search_index.title(stem=stem) or result.meta.title,
+            content=content,
+            size=result.meta.size,
+            mtime=result.meta.mtime,
+        )
+        store_watcher.seen(meta=result.meta)
+        subscriptions.changed(
+            keys=_changed_keys(stems=[stem]), list_changed=result.status == "created"
+        )
+    return result
+
+
+def _delete_note(stem: str) -> bool:
+    """
+    Deletes a note and drops it from every index. Returns False if missing.
+    """
+    deleted: bool = note_store.delete(stem=stem)
+    search_index.remove(stem=stem)
+    extract_cache.discard(stem=stem)
+    if deleted:
+        store_watcher.forget(stem=stem)
+        subscriptions.changed(keys=_changed_keys(stems=[stem]), list_changed=True)
+    return deleted
+
+
+def _read_many(stems: list[str]) -> list[str | None]:
+    return [note_store.read(stem=stem) for stem in stems]
+
+
+def _write_many(
+    notes: list[tuple[str, str]], overwrite: bool = False
+) -> list[dict[str, str]]:
+    """
+    Creates (or, with `overwrite`, also replaces) many notes, indexing them
+    in a single search-index transaction.
+
+    Returns one result per (title, content) pair, with a status of
+    "created", "updated", "exists" or "error".
+    """
+    results: list[dict[str, str] | None] = []
+    batch: list[tuple[str, str, str]] = []
+    for title, content in notes:
+        title, content = title.strip(), content.strip()
+        if not title or not content:
+            results.append(
+                {"title": title, "status": "error", "error": "Empty title or content."}
+            )
+        else:
+            results.append(None)
+            batch.append((_get_note_stem(title=title), title, content))
+
+    written: Iterator[WriteResult] = iter(
+        note_store.write_many(notes=batch, mode=UPSERT if overwrite else CREATE)
+    )
+    indexed: list[tuple[str, str, str, int, float]] = []
+    batch_items: Iterator[tuple[str, str, str]] = iter(batch)
+    for i, result in enumerate(results):
+        if result is not None:
+            continue
+        stem, title, content = next(batch_items)
+        outcome: WriteResult = next(written)
+        results[i] = {"title": title, "status": outcome.status}
+        if outcome.error:
+            results[i]["error"] = outcome.error
+        if outcome.meta is not None:
+            extract_cache.discard(stem=stem)
+            store_watcher.seen(meta=outcome.meta)
+            indexed.append(
+                (
+                    stem,
+                    outcome.meta.title,
+                    content,
+                    outcome.meta.size,
+                    outcome.meta.mtime,
+                )
+            )
+
+    search_index.upsert_many(rows=indexed)
+    subscriptions.changed(
+        keys=_changed_keys(stems=[row[0] for row in indexed]),
+        list_changed=any(result["status"] == "created" for result in results),
+    )
+    return results
+
+
+def _import_notes(source: Path, overwrite: bool) -> dict[str, Any]:
+    """
+    Streams note files out of a directory or archive into the note store,
+    writing them in batches of IMPORT_BATCH_SIZE.
+
+    Notes are titled as listed in the archive's manifest, or after their
+    filename when it has none.
+    """
+    results: list[dict[str, str]] = []
+    batch: list[tuple[str, str]] = []
+    titles: dict[str, str] = {}
+    for name, data, error in iter_note_files(
+        source=source, max_bytes=IMPORT_MAX_BYTES, max_members=IMPORT_MAX_MEMBERS
+    ):
+        if name == MANIFEST_NAME and data is not None:
+            titles = read_manifest(data=data)
+            continue
+        title: str = titles.get(Path(name).stem, Path(name).stem)
+        if data is None:
+            results.append({"title": title, "status": "error", "error": error})
+            continue
+        try:
+            batch.append((title, data.decode(encoding="utf-8")))
+        except UnicodeDecodeError:
+            results.append(
+                {"title": title, "status": "error", "error": "Not valid UTF-8."}
+            )
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            results.extend(_write_many(notes=batch, overwrite=overwrite))
+            batch = []
+    results.extend(_write_many(notes=batch, overwrite=overwrite))
+    return _bulk_report(results=results)
+
+
+def _export_notes(destination: Path) -> int:
+    note_store.refresh()
+    return export_note_files(
+        titles={meta.stem: meta.title for meta in note_store.entries()},
+        files=(
+            (f"{meta.stem}.txt", content.encode(encoding="utf-8"), meta.mtime)
+            for meta, content in iter_contents(store=note_store)
+        ),
+        destination=destination,
+    )
+
+
+def _bulk_report(results: list[dict[str, str]]) -> dict[str, Any]:
+    """
+    Summarizes per-item results of a bulk write into status counts.
+    """
+    counts: dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {"counts": counts, "items": results}
+
+
+def _search(query: str, limit: int) -> list[SearchHit]:
+    _sync_search_index()
+    hits: list[SearchHit] = search_index.search(query=query, limit=limit)
+    if note_store.recheck(stems=[hit.stem for hit in hits]):
+        # Some hits were rewritten in place by other processes; re-index them
+        _sync_search_index()
+        hits = search_index.search(query=query, limit=limit)
+    return hits
+
+
+def _read_latest() -> str | None:
+    note_store.refresh()
+    latest: NoteMeta | None = note_store.latest()
+    if latest is None:
+        return None
+    return note_store.read(stem=latest.stem)
+
+
+def _clip_extract(extract: str, max_bytes: int) -> str:
+    """
+    Shortens an extract to at most `max_bytes` of UTF-8, cutting at a word
+    boundary and marking it as truncated.
+    """
+    data: bytes = extract.encode(encoding="utf-8")
+    if len(data) <= max_bytes:
+        return extract
+    marker: str = " [...]"
+    clipped: str = data[: max(0, max_bytes - len(marker))].decode(
+        encoding="utf-8", errors="ignore"
+    )
+    cut: int = clipped.rfind(" ")
+    return (clipped[:cut] if cut > 0 else clipped).rstrip() + marker
+
+
+def _summary_blocks(
+    order: str, query: str, budget: int, note_budget: int
+) -> tuple[list[str], int]:
+    """
+    Collects note extracts for a summary prompt in the given order until
+    `budget` bytes are used up. Returns the blocks and how many notes were
+    left out.
+
+    The first note is always included, its extract shortened to fit the
+    budget if needed. A later note that does not fit is left out, but the
+    notes after it are still tried, since a shorter one may fit.
+    """
+    metas: Iterator[NoteMeta | None]
+    if order == "relevance":
+        _sync_search_index()
+        hits: list[SearchHit] = search_index.search(
+            query=query, limit=note_store.count()
+        )
+        metas = (note_store.get(stem=hit.stem) for hit in hits)
+    elif order == "recency":
+        note_store.refresh()
+        metas = iter(note_store.by_recency())
+    else:
+        note_store.refresh()
+        metas = iter(note_store.entries())
+
+    blocks: list[str] = []
+    used: int = 0
+    omitted: int = 0
+    for meta in metas:
+        if meta is None:
+            continue
+        heading: str = f"--- Note: {meta.title} ---\n"
+        # Blocks are joined by a blank line
+        heading_size: int = len(heading.encode(encoding="utf-8")) + 2
+        if blocks and used + heading_size >= budget:
+            # Not even the heading fits, so the note need not be read
+            omitted += 1
+            continue
+        if note_store.recheck(stems=[meta.stem]):
+            # Rewritten in place by another process since it was listed
+            meta = note_store.get(stem=meta.stem) or meta
+        extract: str | None = extract_cache.get(
+            meta=meta, max_bytes=note_budget, store=note_store
+        )
+        if extract is None:
+            continue
+        if not blocks:
+            extract = _clip_extract(
+                extract=extract, max_bytes=max(0, budget - heading_size)
+            )
+        size: int = heading_size + len(extract.encode(encoding="utf-8"))
+        if blocks and used + size > budget:
+            omitted += 1
+            continue
+        blocks.append(heading + extract)
+        used += size
+    return blocks, omitted
 
 
 # --- Tools ---
 
 
 @mcp.tool()
-async def list_notes() -> str:
+async def list_notes(
+    prefix: str = "", sort: str = SORT_NAME, cursor: str = "", limit: int = 0
+) -> str:
     """
-    Lists all available notes by their title.
+    Lists available notes by their title, one page at a time.
+
+    Args:
+        prefix (str): Only list notes whose title starts with this text.
+        sort (str): "name" for alphabetical order, or "mtime" for the most
+            recently modified notes first.
+        cursor (str): The cursor from a previous call, to get the next page.
+        limit (int): Titles per page (default NOTES_LIST_PAGE_SIZE).
 
     Returns:
-        str: A list of available note titles, or a message if none exist.
+        str: A page of note titles, ending with the cursor for the next page
+             if more notes follow, or a message if none exist.
     """
-    notes_dir.mkdir(exist_ok=True)
-    note_files: list[Path] = sorted(notes_dir.glob(pattern="*.txt"))
-    if not note_files:
+    if sort not in (SORT_NAME, SORT_MTIME):
+        return f"Error: Unknown sort '{sort}'. Use 'name' or 'mtime'."
+    limit = min(limit if limit > 0 else NOTES_LIST_PAGE_SIZE, NOTES_LIST_MAX_PAGE_SIZE)
+    stem_prefix: str = _get_note_stem(title=prefix) if prefix.strip() else ""
+    after: tuple[float, str] | None = None
+    if cursor:
+        try:
+            after = _decode_cursor(cursor=cursor, sort=sort, prefix=stem_prefix)
+        except ValueError as e:
+            return f"Error: Invalid cursor: {e}."
+
+    metas: list[NoteMeta] = await io_executor.run(
+        _list_page, sort=sort, prefix=stem_prefix, after=after, limit=limit
+    )
+    if not metas:
+        if cursor:
+            return "No more notes."
+        if stem_prefix:
+            return f"No notes found with titles starting with '{prefix}'."
         return "No notes found. You can create one with 'add_note'."
-    titles: list[str] = [f.stem.replace("-", " ").title() for f in note_files]
-    return "Available notes:\n- " + "\n- ".join(titles)
+    listing: str = "Available notes:\n- " + "\n- ".join(
+        meta.title for meta in metas[:limit]
+    )
+    if len(metas) > limit:
+        next_cursor: str = _encode_cursor(
+            sort=sort, prefix=stem_prefix, meta=metas[limit - 1]
+        )
+        listing += (
+            f"\n\nMore notes available; call list_notes with cursor='{next_cursor}'"
+        )
+    return listing
 
 
 @mcp.tool()
@@ -79,10 +757,19 @@ async def add_note(title: str, content: str) -> str:
     """
     if not title.strip() or not content.strip():
         return "Error: Title and content cannot be empty."
-    note_path: Path = _get_note_path(title=title)
-    if note_path.exists():
+    stem: str = _get_note_stem(title=title)
+    async with note_locks.hold(key=stem):
+        result: WriteResult = await io_executor.run(
+            _write_note,
+            stem=stem,
+            title=title.strip(),
+            content=content.strip(),
+            mode=CREATE,
+        )
+    if result.status == "exists":
         return f"Error: A note with the title '{title}' already exists."
-    note_path.write_text(content.strip(), encoding="utf-8")
+    if result.status == "error":
+        return f"Error: Could not save note '{title}': {result.error}"
     return f"Note '{title}' created successfully."
 
 
@@ -97,11 +784,12 @@ async def read_note(title: str) -> str:
     Returns:
         str: The content of the note, or an error message if not found.
     """
-    note_path: Path = _get_note_path(title=title)
-    try:
-        return note_path.read_text(encoding="utf-8")
-    except FileNotFoundError:
+    content: str | None = await io_executor.run(
+        note_store.read, stem=_get_note_stem(title=title)
+    )
+    if content is None:
         return f"Error: Note with title '{title}' not found."
+    return content
 
 
 @mcp.tool()
@@ -115,12 +803,12 @@ async def delete_note(title: str) -> str:
     Returns:
         str: A success or failure message.
     """
-    note_path: Path = _get_note_path(title=title)
-    try:
-        note_path.unlink()
-        return f"Note '{title}' deleted successfully."
-    except FileNotFoundError:
+    stem: str = _get_note_stem(title=title)
+    async with note_locks.hold(key=stem):
+        deleted: bool = await io_executor.run(_delete_note, stem=stem)
+    if not deleted:
         return f"Error: Note with title '{title}' not found."
+    return f"Note '{title}' deleted successfully."
 
 
 @mcp.tool()
@@ -137,17 +825,162 @@ async def edit_note(title: str, new_content: str) -> str:
     """
     if not new_content.strip():
         return "Error: Cannot replace a note with empty content."
-    note_path: Path = _get_note_path(title=title)
-    if not note_path.exists():
+    stem: str = _get_note_stem(title=title)
+    async with note_locks.hold(key=stem):
+        result: WriteResult = await io_executor.run(
+            _write_note,
+            stem=stem,
+            title=title.strip(),
+            content=new_content.strip(),
+            mode=REPLACE,
+        )
+    if result.status == "missing":
         return f"Error: Note with title '{title}' not found."
-    note_path.write_text(data=new_content.strip(), encoding="utf-8")
+    if result.status == "error":
+        return f"Error: Could not save note '{title}': {result.error}"
     return f"Note '{title}' edited successfully."
 
 
+@mcp.tool()
+async def search_notes(query: str, limit: int = 10) -> str:
+    """
+    Searches the titles and contents of all notes.
+
+    Results are ranked by relevance (BM25), with matches in titles counting
+    more than matches in contents. Every word must appear in a matching
+    note; end a word with `*` to match it as a prefix.
+
+    Args:
+        query (str): The words to search for.
+        limit (int): Maximum number of notes to return. Defaults to 10.
+
+    Returns:
+        str: The matching note titles with a snippet of each, or a message
+             if nothing matched.
+    """
+    if not query.strip():
+        return "Error: Search query cannot be empty."
+    hits: list[SearchHit] = await io_executor.run(_search, query=query, limit=limit)
+    if not hits:
+        return f"No notes found matching '{query}'."
+    lines: list[str] = [
+        f"- {hit.title} (score {hit.score:.2f}): {hit.snippet}" for hit in hits
+    ]
+    return f"Notes matching '{query}':\n" + "\n".join(lines)
+
+
+@mcp.tool()
+async def read_notes(titles: list[str]) -> str:
+    """
+    Reads the content of several notes in one call.
+
+    Args:
+        titles (list[str]): The titles of the notes to read.
+
+    Returns:
+        str: A JSON array with one object per title, holding either its
+             "content" or an "error".
+    """
+    stems: list[str] = [_get_note_stem(title=title) for title in titles]
+    contents: list[str | None] = await io_executor.run(_read_many, stems=stems)
+    rows: list[dict[str, str]] = [
+        {"title": title, "content": content}
+        if content is not None
+        else {"title": title, "error": "Note not found."}
+        for title, content in zip(titles, contents)
+    ]
+    return json.dumps(rows, separators=(",", ":"))
+
+
+@mcp.tool()
+async def add_notes(notes: list[dict[str, str]], overwrite: bool = False) -> str:
+    """
+    Creates many notes in one call.
+
+    Args:
+        notes (list[dict[str, str]]): Notes as {"title": ..., "content": ...}
+            objects.
+        overwrite (bool): Replace the content of notes that already exist
+            instead of skipping them. Defaults to False.
+
+    Returns:
+        str: JSON with a count per status and a result per note, whose
+             status is "created", "updated", "exists" or "error".
+    """
+    pairs: list[tuple[str, str]] = [
+        (note.get("title", ""), note.get("content", "")) for note in notes
+    ]
+    stems: set[str] = {_get_note_stem(title=title) for title, _ in pairs}
+    async with AsyncExitStack() as stack:
+        # Lock in sorted order so overlapping batches cannot deadlock
+        for stem in sorted(stems):
+            await stack.enter_async_context(note_locks.hold(key=stem))
+        results: list[dict[str, str]] = await io_executor.run(
+            _write_many, notes=pairs, overwrite=overwrite
+        )
+    return json.dumps(_bulk_report(results=results), separators=(",", ":"))
+
+
+@mcp.tool()
+async def import_notes(source: str, overwrite: bool = False) -> str:
+    """
+    Imports every .txt and .md file from a directory, tar or zip archive.
+
+    Files are streamed one at a time and each becomes a note titled as in
+    the archive's manifest (written by export_notes), or else after its
+    filename.
+    Files over NOTES_IMPORT_MAX_BYTES, and archive members past
+    NOTES_IMPORT_MAX_MEMBERS, are reported as errors instead of imported.
+
+    Args:
+        source (str): Path of a directory or a .tar, .tar.gz, .tgz, .tar.bz2,
+            .tar.xz or .zip archive.
+        overwrite (bool): Replace notes that already exist instead of
+            skipping them. Defaults to False.
+
+    Returns:
+        str: JSON with a count per status and a result per imported file,
+             or an error message.
+    """
+    source_path: Path = Path(source).expanduser()
+    try:
+        report: dict[str, Any] = await io_executor.run(
+            _import_notes, source=source_path, overwrite=overwrite
+        )
+    except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+        return f"Error: Could not import notes from '{source}': {e}"
+    return json.dumps(report, separators=(",", ":"))
+
+
+@mcp.tool()
+async def export_notes(destination: str) -> str:
+    """
+    Exports every note to a directory, tar or zip archive.
+
+    Args:
+        destination (str): Path of a directory, or of a new .tar, .tar.gz,
+            .tgz, .tar.bz2, .tar.xz or .zip archive.
+
+    Returns:
+        str: A success or failure message.
+    """
+    destination_path: Path = Path(destination).expanduser()
+    try:
+        written: int = await io_executor.run(
+            _export_notes, destination=destination_path
+        )
+    except FileExistsError:
+        return f"Error: '{destination}' already exists."
+    except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+        return f"Error: Could not export notes to '{destination}': {e}"
+    kind: str = archive_kind(path=destination_path)
+    return f"Exported {written} note(s) to {kind} '{destination}'."
+
+
 # --- Resources & Prompts ---
 
 
-@mcp.resource(uri="notes://latest")
+@mcp.resource(uri=LATEST_URI)
 async def get_latest_notes() -> str:
     """
     Retrieve the content of the most recently modified note.
@@ -156,39 +989,111 @@ async def get_latest_notes() -> str:
         str: The content of the latest note if it exists,
              otherwise returns a default message.
     """
-    notes_dir.mkdir(exist_ok=True)
-    try:
-        latest_file: Path = max(
-            notes_dir.glob(pattern="*.txt"), key=lambda f: f.stat().st_mtime
-        )
-        return latest_file.read_text(encoding="utf-8")
-    except (FileNotFoundError, ValueError):
+    content: str | None = await io_executor.run(_read_latest)
+    if content is None:
         return "No notes yet!."
+    return content
+
+
+@mcp.resource(uri=IO_STATS_URI)
+async def get_io_stats() -> str:
+    """
+    Report event-loop lag and I/O pool usage, to check that file access
+    is not blocking the server.
+
+    Returns:
+        str: JSON with the lag percentiles (ms) and I/O pool counters.
+    """
+    return json.dumps(
+        {"event_loop_lag": loop_lag.stats(), "io_pool": io_executor.stats()},
+        separators=(",", ":"),
+    )
+
+
+@mcp.resource(uri=STORAGE_STATS_URI)
+async def get_storage_stats() -> str:
+    """
+    Report how many bytes the notes take up on disk compared to their
+    size as text.
+
+    Returns:
+        str: JSON with the note count, logical and stored bytes, and the
+             stored-to-logical ratio.
+    """
+    usage: dict[str, int] = await io_executor.run(note_store.usage)
+    ratio: float = (
+        usage["stored_bytes"] / usage["logical_bytes"]
+        if usage["logical_bytes"]
+        else 1.0
+    )
+    return json.dumps(
+        {"backend": NOTES_BACKEND, **usage, "ratio": round(ratio, 3)},
+        separators=(",", ":"),
+    )
+
+
+@mcp.resource(uri="notes://{title}")
+async def get_note_resource(title: str) -> str:
+    """
+    Read a note by its (URL-encoded) title, e.g. `notes://Apple%20Pie`.
+
+    Returns:
+        str: The content of the note, or an error message if not found.
+    """
+    return await read_note(title=unquote(title))
 
 
 @mcp.prompt()
-async def notes_summary_prompt() -> str:
+async def notes_summary_prompt(
+    order: str = "name",
+    query: str = "",
+    max_tokens: int = SUMMARY_MAX_TOKENS,
+    max_note_tokens: int = SUMMARY_NOTE_MAX_TOKENS,
+) -> str:
     """
-    Generate a prompt for summarizing all available notes.
+    Generate a prompt for summarizing the available notes.
 
-    This function reads the content of all note files and creates a prompt
-    requesting a summary.
+    Notes are added in the chosen order until the token budget is used up;
+    long notes contribute only their leading extract. Extracts of notes that
+    have not changed are reused from earlier prompts.
+
+    Args:
+        order (str): "name", "recency" (newest first) or "relevance" (best
+            matches for `query` first; non-matching notes are left out).
+        query (str): Search query used by the "relevance" order.
+        max_tokens (int): Approximate size budget of the whole prompt.
+        max_note_tokens (int): Approximate size limit of each note's extract.
 
     Returns:
         str: A prompt string containing either the notes to be summarized
              or a message indicating no notes exist.
     """
-    notes_dir.mkdir(exist_ok=True)
-    all_content: list[str] = []
-    for note_path in sorted(notes_dir.glob(pattern="*.txt")):
-        title: str = note_path.stem.replace("-", " ").title()
-        content: str = note_path.read_text(encoding="utf-8")
-        all_content.append(f"--- Note: {title} ---\n{content}")
+    if order not in ("name", "recency", "relevance"):
+        return "Error: order must be one of 'name', 'recency' or 'relevance'."
+    if order == "relevance" and not query.strip():
+        return "Error: The 'relevance' order needs a search query."
 
-    if not all_content:
+    header: str = "Summarize the following notes:"
+    blocks, omitted = await io_executor.run(
+        _summary_blocks,
+        order=order,
+        query=query,
+        budget=max(0, max_tokens) * BYTES_PER_TOKEN - len(header),
+        note_budget=max(1, max_note_tokens) * BYTES_PER_TOKEN,
+    )
+
+    if not blocks and not omitted:
+        if order == "relevance":
+            return f"No notes found matching '{query}'."
         return "No notes yet!."
 
-    return "Summarize the following notes:\n\n" + "\n\n".join(all_content)
+    prompt: str = header + "\n\n" + "\n\n".join(blocks)
+    if omitted:
+        prompt += (
+            f"\n\n({omitted} more note(s) were left out to stay within the "
+            "prompt budget.)"
+        )
+    return prompt
 
 
 # Entry point for the FastMCP server
@@ -0,0 +1,177 @@
+# search_index.py
+
+"""
+Full-text search index for the notes server.
+
+Notes are indexed in a SQLite FTS5 table stored next to the notes directory,
+so the index survives restarts and queries never read note files. The tools
+update the index as they write. Each note's size and mtime are recorded when
+it is indexed, so notes changed by other processes can be spotted and
+re-indexed.
+"""
+
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+# A search term, optionally followed by `*` for a prefix search
+_TERM_PATTERN: re.Pattern[str] = re.compile(pattern=r"(\w+)(\*?)")
+
+
+@dataclass
+class SearchHit:
+    """
+    A note matching a search query.
+    """
+
+    stem: str
+    title: str
+    snippet: str
+    score: float
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query matching notes containing every term.
+
+    Terms are quoted so punctuation in the input is never parsed as FTS5
+    syntax; a trailing `*` on a term keeps its prefix-search meaning.
+    """
+    return " ".join(
+        f'"{term}"{star}' for term, star in _TERM_PATTERN.findall(string=query)
+    )
+
+
+class SearchIndex:
+    """
+    A persistent SQLite FTS5 index of note titles and contents.
+
+    The database is opened lazily on first use. One connection is shared by
+    the I/O worker threads, so every method holds a lock while using it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(database=self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Size and mtime of each note when it was indexed, to spot changes;
+            # a document's id is the rowid of its notes_fts row
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id INTEGER PRIMARY KEY, stem TEXT NOT NULL UNIQUE, "
+                "title TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5("
+                "title, content, tokenize='porter unicode61')"
+            )
+        return self._conn
+
+    def upsert(
+        self, stem: str, title: str, content: str, size: int, mtime: float
+    ) -> None:
+        """
+        Index (or re-index) a note's title and content.
+        """
+        self.upsert_many(rows=[(stem, title, content, size, mtime)])
+
+    def upsert_many(self, rows: list[tuple[str, str, str, int, float]]) -> None:
+        """
+        Index (or re-index) many notes in one transaction. Each row holds a
+        note's stem, title, content, size and mtime.
+        """
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                for stem, title, content, size, mtime in rows:
+                    row = conn.execute(
+                        "SELECT id FROM documents WHERE stem = ?", (stem,)
+                    ).fetchone()
+                    if row is None:
+                        doc_id: int = conn.execute(
+                            "INSERT INTO documents (stem, title, size, mtime) "
+                            "VALUES (?, ?, ?, ?)",
+                            (stem, title, size, mtime),
+                        ).lastrowid
+                    else:
+                        doc_id = row[0]
+                        conn.execute(
+                            "UPDATE documents SET title = ?, size = ?, mtime = ? "
+                            "WHERE id = ?",
+                            (title, size, mtime, doc_id),
+                        )
+                        conn.execute("DELETE FROM notes_fts WHERE rowid = ?", (doc_id,))
+                    conn.execute(
+                        "INSERT INTO notes_fts (rowid, title, content) VALUES (?, ?, ?)",
+                        (doc_id, title, content),
+                    )
+
+    def remove(self, stem: str) -> None:
+        """
+        Drop a note from the index.
+        """
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                conn.execute(
+                    "DELETE FROM notes_fts WHERE rowid = "
+                    "(SELECT id FROM documents WHERE stem = ?)",
+                    (stem,),
+                )
+                conn.execute("DELETE FROM documents WHERE stem = ?", (stem,))
+
+    def title(self, stem: str) -> str | None:
+        """
+        Returns the title a note was indexed under, if it is indexed.
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT title FROM documents WHERE stem = ?", (stem,))
+                .fetchone()
+            )
+            return None if row is None else row[0]
+
+    def indexed(self) -> dict[str, tuple[int, float]]:
+        """
+        Returns the size and mtime recorded for every indexed note.
+        """
+        with self._lock:
+            rows = self._connect().execute("SELECT stem, size, mtime FROM documents")
+            return {stem: (size, mtime) for stem, size, mtime in rows}
+
+    def search(self, query: str, limit: int = 10) -> list[SearchHit]:
+        """
+        Returns the best matching notes, ranked by BM25 with titles weighted
+        above contents.
+        """
+        match: str = build_match_query(query=query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT documents.stem, documents.title, "
+                "snippet(notes_fts, 1, '[', ']', '...', 12), "
+                "bm25(notes_fts, 5.0, 1.0) AS rank "
+                "FROM notes_fts JOIN documents ON documents.id = notes_fts.rowid "
+                "WHERE notes_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, max(0, limit)),
+            )
+            return [
+                SearchHit(stem=stem, title=title, snippet=snippet, score=-rank)
+                for stem, title, snippet, rank in rows
+            ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
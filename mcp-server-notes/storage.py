@@ -0,0 +1,1033 @@
+# storage.py
+
+"""
+Storage backends for the notes server.
+
+- FileStore: one UTF-8 `.txt` file per note in a directory (the default),
+  with an in-memory index of the directory.
+- SQLiteStore: every note's title, content and timestamps in a single
+  SQLite file in WAL mode, with indexed listing by name and recency.
+- BlobStore: a SQLiteStore whose contents live in content-addressed object
+  files, so identical notes are stored once and large ones are compressed.
+
+Both are driven from the server's I/O worker threads and are thread-safe.
+Notes are keyed by the filename stem derived from their title.
+
+Migrate the existing text files into a SQLite store (or, given a target
+without a file suffix, a blob store directory) with:
+    python storage.py migrate [notes_dir] [db_path | blob_dir]
+"""
+
+import bisect
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# Write modes: fail if the note exists, fail if it is missing, or either
+CREATE, REPLACE, UPSERT = "create", "replace", "upsert"
+
+# Listing orders: by stem, or most recently modified first
+SORT_NAME, SORT_MTIME = "name", "mtime"
+
+
+@dataclass
+class NoteMeta:
+    """
+    Metadata of a single stored note.
+    """
+
+    stem: str
+    title: str
+    size: int
+    mtime: float
+
+
+@dataclass
+class WriteResult:
+    """
+    Outcome of writing one note: "created", "updated", "exists" (CREATE of
+    an existing note), "missing" (REPLACE of a missing note) or "error".
+    """
+
+    status: str
+    meta: NoteMeta | None = None
+    error: str = ""
+
+
+def stem_to_title(stem: str) -> str:
+    """
+    Derives a display title from a note's filename stem.
+    """
+    return stem.replace("-", " ").title()
+
+
+class NoteStore(ABC):
+    """
+    Where the notes server keeps its notes.
+    """
+
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        """
+        A number that changes whenever other processes may have changed
+        the store, so derived indexes know to re-check it.
+        """
+
+    @abstractmethod
+    def refresh(self) -> None:
+        """
+        Pick up changes made by other processes, if the backend caches any
+        state about them.
+        """
+
+    def recheck(self, stems: Iterable[str]) -> bool:
+        """
+        Re-read the metadata of the given notes, in case other processes
+        changed them without `refresh` noticing. Returns whether any had
+        changed, in which case the version changes too.
+        """
+        return False
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+    @abstractmethod
+    def get(self, stem: str) -> NoteMeta | None: ...
+
+    @abstractmethod
+    def entries(self) -> list[NoteMeta]:
+        """
+        Returns every note, sorted by stem.
+        """
+
+    @abstractmethod
+    def by_recency(self) -> list[NoteMeta]:
+        """
+        Returns every note, most recently modified first.
+        """
+
+    @abstractmethod
+    def latest(self) -> NoteMeta | None: ...
+
+    @abstractmethod
+    def page(
+        self,
+        sort: str = SORT_NAME,
+        prefix: str = "",
+        after: tuple[float, str] | None = None,
+        limit: int = 100,
+    ) -> list[NoteMeta]:
+        """
+        Returns up to `limit` notes whose stem starts with `prefix`, in
+        `sort` order, starting after the note with the given (mtime, stem).
+        """
+
+    @abstractmethod
+    def read(self, stem: str) -> str | None:
+        """
+        Returns a note's content, or None if it does not exist.
+        """
+
+    @abstractmethod
+    def read_prefix(self, stem: str, max_bytes: int) -> bytes | None:
+        """
+        Returns at most `max_bytes` of the start of a note's UTF-8 content,
+        without reading the rest of it.
+        """
+
+    @abstractmethod
+    def write_many(
+        self,
+        notes: list[tuple[str, str, str]],
+        mode: str = UPSERT,
+        mtimes: list[float] | None = None,
+    ) -> list[WriteResult]:
+        """
+        Writes (stem, title, content) notes according to `mode`, optionally
+        with explicit modification times. Returns one result per note.
+        """
+
+    @abstractmethod
+    def delete(self, stem: str) -> bool:
+        """
+        Deletes a note. Returns False if it did not exist.
+        """
+
+    def write(self, stem: str, title: str, content: str, mode: str) -> WriteResult:
+        return self.write_many(notes=[(stem, title, content)], mode=mode)[0]
+
+    def close(self) -> None:
+        pass
+
+    def usage(self) -> dict[str, int]:
+        """
+        Returns the number of notes, their total size as text (logical bytes)
+        and the bytes they take up on disk (stored bytes).
+        """
+        self.refresh()
+        logical: int = sum(meta.size for meta in self.entries())
+        return {
+            "notes": self.count(),
+            "logical_bytes": logical,
+            "stored_bytes": logical,
+        }
+
+
+# --- File Backend ---
+
+
+def write_file_atomically(
+    path: Path, content: str | bytes, exclusive: bool = False
+) -> None:
+    """
+    Atomically writes a file.
+
+    The content is written and fsynced to a temporary file in the same
+    directory, which then replaces the file (or, with `exclusive`, is linked
+    into place only if no file exists yet, raising FileExistsError
+    otherwise). A crash leaves either the old file or the new one, never a
+    truncated file. Temporary files end in `.tmp`, so they are never listed
+    as notes.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+    try:
+        if isinstance(content, str):
+            content = content.encode(encoding="utf-8")
+        with os.fdopen(fd, mode="wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if exclusive:
+            os.link(tmp_name, path)
+        else:
+            os.replace(tmp_name, path)
+    finally:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+
+class FileStore(NoteStore):
+    """
+    One `.txt` file per note, with an in-memory index of the directory.
+
+    The store's own writes update the index directly. Changes made by other
+    processes (files added, removed or renamed) are picked up by rescanning
+    the directory only when its mtime has changed since the last refresh.
+    A note rewritten in place does not change the directory, so its size
+    and mtime are only updated when it is rechecked.
+
+    Filenames lose the original spelling of titles, so titles are recorded
+    in an append-only log (TITLES_FILE) in the same directory, which is
+    compacted once it holds mostly superseded lines.
+    """
+
+    TITLES_FILE: str = ".titles.jsonl"
+    # Superseded title log lines tolerated before the log is compacted
+    TITLES_SLACK: int = 1000
+
+    def __init__(self, directory: Path) -> None:
+        self.directory: Path = directory
+        self._lock = threading.RLock()
+        self._entries: dict[str, NoteMeta] = {}
+        self._stems: list[str] = []
+        # (-mtime, stem) of every note, so the newest notes come first
+        self._by_mtime: list[tuple[float, str]] = []
+        self._dir_mtime_ns: int | None = None
+        self._version: int = 0
+        self._titles: dict[str, str] = {}
+        self._titles_inode: int = 0
+        self._titles_offset: int = 0
+        self._titles_lines: int = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def path(self, stem: str) -> Path:
+        return self.directory / f"{stem}.txt"
+
+    def _title(self, stem: str) -> str:
+        return self._titles.get(stem) or stem_to_title(stem=stem)
+
+    def refresh(self) -> None:
+        """
+        Rescan the directory if it changed outside the store's own writes,
+        and read titles other processes appended to the title log.
+
+        Notes other processes rewrote in place keep their old size and mtime
+        until passed to `recheck`, since that leaves the directory unchanged.
+        """
+        with self._lock:
+            try:
+                mtime_ns: int = self.directory.stat().st_mtime_ns
+            except FileNotFoundError:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                mtime_ns = self.directory.stat().st_mtime_ns
+            self._load_titles()
+            if mtime_ns == self._dir_mtime_ns:
+                return
+
+            entries: dict[str, NoteMeta] = {}
+            with os.scandir(self.directory) as it:
+                for dir_entry in it:
+                    if dir_entry.name.endswith(".txt") and dir_entry.is_file():
+                        stat: os.stat_result = dir_entry.stat()
+                        stem: str = dir_entry.name.removesuffix(".txt")
+                        entries[stem] = NoteMeta(
+                            stem=stem,
+                            title=self._title(stem=stem),
+                            size=stat.st_size,
+                            mtime=stat.st_mtime,
+                        )
+
+            self._entries = entries
+            self._stems = sorted(entries)
+            self._by_mtime = sorted(
+                (-meta.mtime, stem) for stem, meta in entries.items()
+            )
+            self._dir_mtime_ns = mtime_ns
+            self._version += 1
+
+    def recheck(self, stems: Iterable[str]) -> bool:
+        changed: bool = False
+        with self._lock:
+            for stem in stems:
+                meta: NoteMeta | None = self._entries.get(stem)
+                if meta is None:
+                    continue
+                try:
+                    stat: os.stat_result = self.path(stem=stem).stat()
+                except FileNotFoundError:
+                    # Removing it changed the directory, so refresh sees that
+                    continue
+                if (stat.st_size, stat.st_mtime) == (meta.size, meta.mtime):
+                    continue
+                self._by_mtime.remove((-meta.mtime, stem))
+                bisect.insort(self._by_mtime, (-stat.st_mtime, stem))
+                self._entries[stem] = NoteMeta(
+                    stem=stem, title=meta.title, size=stat.st_size, mtime=stat.st_mtime
+                )
+                changed = True
+            if changed:
+                self._version += 1
+        return changed
+
+    def _sync_dir_mtime(self) -> None:
+        # Our own write changed the directory; don't treat that as external
+        self._dir_mtime_ns = self.directory.stat().st_mtime_ns
+
+    def _load_titles(self) -> None:
+        """
+        Reads title log lines appended since the last call.
+        """
+        path: Path = self.directory / self.TITLES_FILE
+        try:
+            stat: os.stat_result | None = path.stat()
+        except FileNotFoundError:
+            stat = None
+        identity: tuple[int, int] = (stat.st_ino, stat.st_size) if stat else (0, 0)
+        if identity == (self._titles_inode, self._titles_offset):
+            return
+
+        changed: set[str] = set()
+        if identity[0] != self._titles_inode or identity[1] < self._titles_offset:
+            # The log was compacted or removed; read it again from the start
+            changed.update(self._titles)
+            self._titles, self._titles_offset, self._titles_lines = {}, 0, 0
+            self._titles_inode = identity[0]
+        if stat is None:
+            self._retitle(stems=changed)
+            return
+
+        with path.open(mode="rb") as f:
+            f.seek(self._titles_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # A line still being written by another process
+                self._titles_offset += len(line)
+                self._titles_lines += 1
+                try:
+                    stem, title = json.loads(line)
+                except ValueError:
+                    continue
+                if title is None:
+                    self._titles.pop(stem, None)
+                else:
+                    self._titles[stem] = title
+                changed.add(stem)
+
+        self._retitle(stems=changed)
+
+    def _retitle(self, stems: set[str]) -> None:
+        for stem in stems & self._entries.keys():
+            self._entries[stem].title = self._title(stem=stem)
+
+    def _log_titles(self, titles: list[tuple[str, str | None]]) -> None:
+        """
+        Appends (stem, title) records to the title log; a None title
+        forgets the note's title.
+        """
+        if not titles:
+            return
+        with self._lock:
+            path: Path = self.directory / self.TITLES_FILE
+            with path.open(mode="ab") as f:
+                f.write(
+                    b"".join(
+                        json.dumps(record, ensure_ascii=False).encode() + b"\n"
+                        for record in titles
+                    )
+                )
+            self._load_titles()
+            if self._titles_lines > 2 * len(self._titles) + self.TITLES_SLACK:
+                self._compact_titles()
+            self._sync_dir_mtime()
+
+    def _compact_titles(self) -> None:
+        live: dict[str, str] = {
+            stem: title for stem, title in self._titles.items() if stem in self._entries
+        }
+        write_file_atomically(
+            path=self.directory / self.TITLES_FILE,
+            content="".join(
+                json.dumps([stem, title], ensure_ascii=False) + "\n"
+                for stem, title in live.items()
+            ),
+        )
+        self._titles, self._titles_offset, self._titles_lines = {}, 0, 0
+        self._load_titles()
+
+    def _record(self, stem: str) -> NoteMeta:
+        stat: os.stat_result = self.path(stem=stem).stat()
+        meta = NoteMeta(
+            stem=stem,
+            title=self._title(stem=stem),
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+        )
+        with self._lock:
+            old: NoteMeta | None = self._entries.get(stem)
+            if old is None:
+                bisect.insort(self._stems, stem)
+            else:
+                self._by_mtime.remove((-old.mtime, stem))
+            bisect.insort(self._by_mtime, (-meta.mtime, stem))
+            self._entries[stem] = meta
+            self._sync_dir_mtime()
+        return meta
+
+    def _forget(self, stem: str) -> None:
+        with self._lock:
+            meta: NoteMeta | None = self._entries.pop(stem, None)
+            if meta is not None:
+                del self._stems[bisect.bisect_left(self._stems, stem)]
+                del self._by_mtime[
+                    bisect.bisect_left(self._by_mtime, (-meta.mtime, stem))
+                ]
+            self._sync_dir_mtime()
+
+    def count(self) -> int:
+        return len(self._entries)
+
+    def get(self, stem: str) -> NoteMeta | None:
+        return self._entries.get(stem)
+
+    def entries(self) -> list[NoteMeta]:
+        with self._lock:
+            return [self._entries[stem] for stem in self._stems]
+
+    def by_recency(self) -> list[NoteMeta]:
+        with self._lock:
+            return [self._entries[stem] for _, stem in self._by_mtime]
+
+    def latest(self) -> NoteMeta | None:
+        with self._lock:
+            return self._entries[self._by_mtime[0][1]] if self._by_mtime else None
+
+    def page(
+        self,
+        sort: str = SORT_NAME,
+        prefix: str = "",
+        after: tuple[float, str] | None = None,
+        limit: int = 100,
+    ) -> list[NoteMeta]:
+        with self._lock:
+            if sort == SORT_NAME:
+                start: int = bisect.bisect_left(self._stems, prefix)
+                if after is not None:
+                    start = max(start, bisect.bisect_right(self._stems, after[1]))
+                stems: Iterator[str] = itertools.takewhile(
+                    lambda stem: stem.startswith(prefix),
+                    itertools.islice(self._stems, start, None),
+                )
+            else:
+                start = 0
+                if after is not None:
+                    start = bisect.bisect_right(self._by_mtime, (-after[0], after[1]))
+                stems = (
+                    stem
+                    for _, stem in itertools.islice(self._by_mtime, start, None)
+                    if stem.startswith(prefix)
+                )
+            return [self._entries[stem] for stem in itertools.islice(stems, limit)]
+
+    def read(self, stem: str) -> str | None:
+        try:
+            return self.path(stem=stem).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def read_prefix(self, stem: str, max_bytes: int) -> bytes | None:
+        try:
+            with self.path(stem=stem).open(mode="rb") as f:
+                return f.read(max_bytes)
+        except FileNotFoundError:
+            return None
+
+    def write_many(
+        self,
+        notes: list[tuple[str, str, str]],
+        mode: str = UPSERT,
+        mtimes: list[float] | None = None,
+    ) -> list[WriteResult]:
+        self.refresh()
+        results: list[WriteResult] = []
+        new_titles: list[tuple[str, str | None]] = []
+        for i, (stem, title, content) in enumerate(notes):
+            path: Path = self.path(stem=stem)
+            exists: bool = stem in self._entries
+            if exists and mode == CREATE:
+                results.append(WriteResult(status="exists"))
+                continue
+            if not exists and mode == REPLACE:
+                results.append(WriteResult(status="missing"))
+                continue
+            try:
+                try:
+                    write_file_atomically(
+                        path=path, content=content, exclusive=not exists
+                    )
+                except FileExistsError:
+                    # Another process created the note behind the index's back
+                    if mode == CREATE:
+                        results.append(WriteResult(status="exists"))
+                        continue
+                    write_file_atomically(path=path, content=content)
+                    exists = True
+                if mtimes is not None:
+                    os.utime(path, times=(mtimes[i], mtimes[i]))
+            except OSError as e:
+                results.append(WriteResult(status="error", error=str(e)))
+                continue
+            if not exists:
+                # Only new notes take the title they are written with
+                new_titles.append((stem, title))
+                self._titles[stem] = title
+            results.append(
+                WriteResult(
+                    status="updated" if exists else "created",
+                    meta=self._record(stem=stem),
+                )
+            )
+        self._log_titles(titles=new_titles)
+        return results
+
+    def delete(self, stem: str) -> bool:
+        # Pick up outside changes first, so our own unlink is not mistaken
+        # for one and the directory is not rescanned
+        self.refresh()
+        try:
+            self.path(stem=stem).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+        finally:
+            self._forget(stem=stem)
+            if stem in self._titles:
+                self._log_titles(titles=[(stem, None)])
+
+
+# --- SQLite Backend ---
+
+
+class SQLiteStore(NoteStore):
+    """
+    Notes stored as rows of a single SQLite database in WAL mode.
+
+    Titles keep their original spelling. Listing by name and by recency are
+    served from indexes, so they do not slow down as notes accumulate. The
+    database is opened lazily on first use; one connection is shared by the
+    I/O worker threads under a lock.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(database=self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_schema(conn=self._conn)
+        return self._conn
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS notes ("
+            "stem TEXT PRIMARY KEY, title TEXT NOT NULL, content TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS notes_updated_at ON notes (updated_at)"
+        )
+
+    @staticmethod
+    def _meta(row: tuple[str, str, int, float]) -> NoteMeta:
+        return NoteMeta(stem=row[0], title=row[1], size=row[2], mtime=row[3])
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    @property
+    def version(self) -> int:
+        # Changes whenever another connection commits to the database
+        return self._query("PRAGMA data_version")[0][0]
+
+    def refresh(self) -> None:
+        pass
+
+    def count(self) -> int:
+        return self._query("SELECT count(*) FROM notes")[0][0]
+
+    def get(self, stem: str) -> NoteMeta | None:
+        rows = self._query(
+            "SELECT stem, title, size, updated_at FROM notes WHERE stem = ?", (stem,)
+        )
+        return self._meta(rows[0]) if rows else None
+
+    def entries(self) -> list[NoteMeta]:
+        rows = self._query(
+            "SELECT stem, title, size, updated_at FROM notes ORDER BY stem"
+        )
+        return [self._meta(row) for row in rows]
+
+    def by_recency(self) -> list[NoteMeta]:
+        rows = self._query(
+            "SELECT stem, title, size, updated_at FROM notes "
+            "ORDER BY updated_at DESC, stem"
+        )
+        return [self._meta(row) for row in rows]
+
+    def latest(self) -> NoteMeta | None:
+        rows = self._query(
+            "SELECT stem, title, size, updated_at FROM notes "
+            "ORDER BY updated_at DESC LIMIT 1"
+        )
+        return self._meta(rows[0]) if rows else None
+
+    def page(
+        self,
+        sort: str = SORT_NAME,
+        prefix: str = "",
+        after: tuple[float, str] | None = None,
+        limit: int = 100,
+    ) -> list[NoteMeta]:
+        # Stems are ASCII, so this bounds every stem starting with the prefix
+        where: list[str] = ["stem >= ?", "stem < ?"]
+        params: list[Any] = [prefix, prefix + "\x7f"]
+        if sort == SORT_NAME:
+            order: str = "stem"
+            if after is not None:
+                where.append("stem > ?")
+                params.append(after[1])
+        else:
+            order = "updated_at DESC, stem"
+            if after is not None:
+                where.append("(updated_at < ? OR (updated_at = ? AND stem > ?))")
+                params.extend([after[0], after[0], after[1]])
+        rows = self._query(
+            "SELECT stem, title, size, updated_at FROM notes "
+            f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?",
+            (*params, max(0, limit)),
+        )
+        return [self._meta(row) for row in rows]
+
+    def read(self, stem: str) -> str | None:
+        rows = self._query("SELECT content FROM notes WHERE stem = ?", (stem,))
+        return rows[0][0] if rows else None
+
+    def read_prefix(self, stem: str, max_bytes: int) -> bytes | None:
+        rows = self._query(
+            "SELECT substr(CAST(content AS BLOB), 1, ?) FROM notes WHERE stem = ?",
+            (max_bytes, stem),
+        )
+        return rows[0][0] if rows else None
+
+    def write_many(
+        self,
+        notes: list[tuple[str, str, str]],
+        mode: str = UPSERT,
+        mtimes: list[float] | None = None,
+    ) -> list[WriteResult]:
+        results: list[WriteResult] = []
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                for i, (stem, title, content) in enumerate(notes):
+                    now: float = mtimes[i] if mtimes is not None else time.time()
+                    size: int = len(content.encode(encoding="utf-8"))
+                    row = conn.execute(
+                        "SELECT title FROM notes WHERE stem = ?", (stem,)
+                    ).fetchone()
+                    if row is not None and mode == CREATE:
+                        results.append(WriteResult(status="exists"))
+                        continue
+                    if row is None and mode == REPLACE:
+                        results.append(WriteResult(status="missing"))
+                        continue
+
+                    if row is None:
+                        conn.execute(
+                            "INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?)",
+                            (stem, title, content, size, now, now),
+                        )
+                    else:
+                        # Keep the title the note was created with
+                        title = row[0]
+                        conn.execute(
+                            "UPDATE notes SET content = ?, size = ?, updated_at = ? "
+                            "WHERE stem = ?",
+                            (content, size, now, stem),
+                        )
+                    results.append(
+                        WriteResult(
+                            status="created" if row is None else "updated",
+                            meta=NoteMeta(stem=stem, title=title, size=size, mtime=now),
+                        )
+                    )
+        return results
+
+    def delete(self, stem: str) -> bool:
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                return (
+                    conn.execute("DELETE FROM notes WHERE stem = ?", (stem,)).rowcount
+                    > 0
+                )
+
+    def _logical_usage(self) -> dict[str, int]:
+        count, logical = self._query(
+            "SELECT count(*), coalesce(sum(size), 0) FROM notes"
+        )[0]
+        return {"notes": count, "logical_bytes": logical}
+
+    def usage(self) -> dict[str, int]:
+        stored: int = sum(
+            path.stat().st_size
+            for path in (self.path, self.path.with_name(self.path.name + "-wal"))
+            if path.exists()
+        )
+        return {**self._logical_usage(), "stored_bytes": stored}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# --- Content-Addressed Backend ---
+
+
+class BlobStore(SQLiteStore):
+    """
+    Note metadata in SQLite, with contents in content-addressed object files.
+
+    Each distinct content is stored once, as `objects/<sha256[:2]>/<rest>`
+    under the store's directory, and shared by every note with that content.
+    Contents of at least `compress_min_bytes` are zlib-compressed when that
+    makes them smaller, and are decompressed in chunks as they are read, so
+    reading the start of a large note does not inflate all of it. Objects
+    are reference-counted and removed once no note uses them.
+    """
+
+    # Bytes read from an object file at a time
+    CHUNK_SIZE: int = 64 * 1024
+
+    def __init__(self, directory: Path, compress_min_bytes: int = 4096) -> None:
+        super().__init__(path=directory / "index.sqlite3")
+        self.directory: Path = directory
+        self.compress_min_bytes: int = compress_min_bytes
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS notes ("
+            "stem TEXT PRIMARY KEY, title TEXT NOT NULL, digest TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS notes_updated_at ON notes (updated_at)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "digest TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+            "stored_size INTEGER NOT NULL, compressed INTEGER NOT NULL, "
+            "refs INTEGER NOT NULL)"
+        )
+
+    def _object_path(self, digest: str) -> Path:
+        return self.directory / "objects" / digest[:2] / digest[2:]
+
+    def _iter_chunks(self, digest: str, compressed: bool) -> Iterator[bytes]:
+        """
+        Yields a content's bytes, decompressing at most CHUNK_SIZE at a time.
+        """
+        with self._object_path(digest=digest).open(mode="rb") as f:
+            if not compressed:
+                while chunk := f.read(self.CHUNK_SIZE):
+                    yield chunk
+                return
+            decompressor = zlib.decompressobj()
+            while chunk := f.read(self.CHUNK_SIZE):
+                while chunk:
+                    yield decompressor.decompress(chunk, self.CHUNK_SIZE)
+                    chunk = decompressor.unconsumed_tail
+            yield decompressor.flush()
+
+    def _blob(self, stem: str) -> tuple[str, bool] | None:
+        rows = self._query(
+            "SELECT b.digest, b.compressed FROM notes n "
+            "JOIN blobs b ON b.digest = n.digest WHERE n.stem = ?",
+            (stem,),
+        )
+        return (rows[0][0], bool(rows[0][1])) if rows else None
+
+    def read(self, stem: str) -> str | None:
+        blob: tuple[str, bool] | None = self._blob(stem=stem)
+        if blob is None:
+            return None
+        try:
+            data: bytes = b"".join(
+                self._iter_chunks(digest=blob[0], compressed=blob[1])
+            )
+        except FileNotFoundError:
+            return None
+        return data.decode(encoding="utf-8")
+
+    def read_prefix(self, stem: str, max_bytes: int) -> bytes | None:
+        blob: tuple[str, bool] | None = self._blob(stem=stem)
+        if blob is None:
+            return None
+        prefix = bytearray()
+        try:
+            for chunk in self._iter_chunks(digest=blob[0], compressed=blob[1]):
+                prefix += chunk
+                if len(prefix) >= max_bytes:
+                    break
+        except FileNotFoundError:
+            return None
+        return bytes(prefix[:max_bytes])
+
+    def _store_object(self, conn: sqlite3.Connection, data: bytes) -> str:
+        """
+        Adds a reference to the object holding `data`, writing the object
+        file if no note has this content yet. Returns the content's digest.
+        """
+        digest: str = hashlib.sha256(data).hexdigest()
+        if conn.execute(
+            "UPDATE blobs SET refs = refs + 1 WHERE digest = ?", (digest,)
+        ).rowcount:
+            return digest
+
+        stored: bytes = data
+        if len(data) >= self.compress_min_bytes:
+            compressed: bytes = zlib.compress(data)
+            if len(compressed) < len(data):
+                stored = compressed
+        path: Path = self._object_path(digest=digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_file_atomically(path=path, content=stored)
+        conn.execute(
+            "INSERT INTO blobs VALUES (?, ?, ?, ?, 1)",
+            (digest, len(data), len(stored), stored is not data),
+        )
+        return digest
+
+    def _release_objects(
+        self, conn: sqlite3.Connection, digests: Iterable[str]
+    ) -> list[str]:
+        """
+        Drops a reference to each object, returning the digests no note
+        refers to any more.
+        """
+        unused: list[str] = []
+        for digest in digests:
+            conn.execute("UPDATE blobs SET refs = refs - 1 WHERE digest = ?", (digest,))
+            if conn.execute(
+                "DELETE FROM blobs WHERE digest = ? AND refs <= 0", (digest,)
+            ).rowcount:
+                unused.append(digest)
+        return unused
+
+    def _remove_objects(self, digests: list[str]) -> None:
+        # Runs after the commit, so a failed transaction never loses content
+        for digest in digests:
+            if not self._query("SELECT 1 FROM blobs WHERE digest = ?", (digest,)):
+                self._object_path(digest=digest).unlink(missing_ok=True)
+
+    def write_many(
+        self,
+        notes: list[tuple[str, str, str]],
+        mode: str = UPSERT,
+        mtimes: list[float] | None = None,
+    ) -> list[WriteResult]:
+        results: list[WriteResult] = []
+        released: list[str] = []
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                for i, (stem, title, content) in enumerate(notes):
+                    now: float = mtimes[i] if mtimes is not None else time.time()
+                    data: bytes = content.encode(encoding="utf-8")
+                    row = conn.execute(
+                        "SELECT title, digest FROM notes WHERE stem = ?", (stem,)
+                    ).fetchone()
+                    if row is not None and mode == CREATE:
+                        results.append(WriteResult(status="exists"))
+                        continue
+                    if row is None and mode == REPLACE:
+                        results.append(WriteResult(status="missing"))
+                        continue
+
+                    try:
+                        digest: str = self._store_object(conn=conn, data=data)
+                    except OSError as e:
+                        results.append(WriteResult(status="error", error=str(e)))
+                        continue
+                    if row is None:
+                        conn.execute(
+                            "INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?)",
+                            (stem, title, digest, len(data), now, now),
+                        )
+                    else:
+                        # Keep the title the note was created with
+                        title = row[0]
+                        conn.execute(
+                            "UPDATE notes SET digest = ?, size = ?, updated_at = ? "
+                            "WHERE stem = ?",
+                            (digest, len(data), now, stem),
+                        )
+                        released += self._release_objects(conn=conn, digests=[row[1]])
+                    results.append(
+                        WriteResult(
+                            status="created" if row is None else "updated",
+                            meta=NoteMeta(
+                                stem=stem, title=title, size=len(data), mtime=now
+                            ),
+                        )
+                    )
+            self._remove_objects(digests=released)
+        return results
+
+    def delete(self, stem: str) -> bool:
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                row = conn.execute(
+                    "DELETE FROM notes WHERE stem = ? RETURNING digest", (stem,)
+                ).fetchone()
+                released: list[str] = (
+                    self._release_objects(conn=conn, digests=[row[0]]) if row else []
+                )
+            self._remove_objects(digests=released)
+        return row is not None
+
+    def usage(self) -> dict[str, int]:
+        blobs, stored = self._query(
+            "SELECT count(*), coalesce(sum(stored_size), 0) FROM blobs"
+        )[0]
+        return {
+            **self._logical_usage(),
+            "unique_contents": blobs,
+            "stored_bytes": stored,
+        }
+
+
+# --- Migration ---
+
+
+def migrate(source: NoteStore, target: NoteStore, batch_size: int = 500) -> int:
+    """
+    Copies every note from one store into another, keeping modification
+    times. Notes already in the target are left untouched. Returns the
+    number of notes copied.
+    """
+    source.refresh()
+    copied: int = 0
+    metas: list[NoteMeta] = source.entries()
+    for start in range(0, len(metas), batch_size):
+        batch: list[tuple[str, str, str]] = []
+        mtimes: list[float] = []
+        for meta in metas[start : start + batch_size]:
+            content: str | None = source.read(stem=meta.stem)
+            if content is not None:
+                batch.append((meta.stem, meta.title, content))
+                mtimes.append(meta.mtime)
+        results: list[WriteResult] = target.write_many(
+            notes=batch, mode=CREATE, mtimes=mtimes
+        )
+        copied += sum(result.status == "created" for result in results)
+    return copied
+
+
+def iter_contents(store: NoteStore) -> Iterator[tuple[NoteMeta, str]]:
+    """
+    Yields every note with its content, reading one note at a time.
+    """
+    store.refresh()
+    for meta in store.entries():
+        content: str | None = store.read(stem=meta.stem)
+        if content is not None:
+            yield meta, content
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print(
+            "Usage: python storage.py migrate [notes_dir] [db_path | blob_dir]\n"
+            "Example: python storage.py migrate notes_data notes.sqlite3\n"
+            "         python storage.py migrate notes_data notes_blobs\n"
+        )
+        sys.exit(1)
+
+    here: Path = Path(__file__).parent
+    notes_dir: Path = Path(sys.argv[2]) if len(sys.argv) > 2 else here / "notes_data"
+    db_path: Path = Path(sys.argv[3]) if len(sys.argv) > 3 else here / "notes.sqlite3"
+    store: SQLiteStore = (
+        SQLiteStore(path=db_path) if db_path.suffix else BlobStore(directory=db_path)
+    )
+    try:
+        copied: int = migrate(source=FileStore(directory=notes_dir), target=store)
+    finally:
+        store.close()
+    print(f"Migrated {copied} note(s) from {notes_dir} to {db_path}.")
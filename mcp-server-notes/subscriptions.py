@@ -0,0 +1,260 @@
+# subscriptions.py
+
+"""
+Resource subscriptions for the notes server.
+
+- ResourceSubscriptions: which client sessions subscribed to which resource
+  URIs, and debounced `resources/updated` and `resources/list_changed`
+  notifications to them.
+- StoreWatcher: polls a note store for changes made by other processes and
+  reports the notes they touched.
+- enable_subscriptions: wires subscriptions into a FastMCP server, which
+  otherwise advertises no subscription support.
+"""
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+import anyio
+from mcp.server import FastMCP
+from mcp.server.session import ServerSession
+from mcp.types import ServerCapabilities
+from pydantic import AnyUrl
+from storage import NoteMeta, NoteStore
+
+
+class ResourceSubscriptions:
+    """
+    Tracks resource subscriptions per session and notifies them of changes.
+
+    Changes are reported by key (see `key`, which maps a subscribed URI to
+    the key its changes are reported under, so that differently spelled
+    URIs of one note share a key). They are collected for `debounce`
+    seconds after the first one, then each subscriber gets at most one
+    notification per URI, however many writes happened in between.
+    """
+
+    def __init__(
+        self, debounce: float = 0.2, key: Callable[[str], str] | None = None
+    ) -> None:
+        self.debounce: float = debounce
+        self.sent: int = 0
+        self._key: Callable[[str], str] = key or (lambda uri: uri)
+        # session -> {subscribed URI: its key}
+        self._subscribers: dict[ServerSession, dict[str, str]] = {}
+        self._pending_keys: set[str] = set()
+        self._pending_list_changed: bool = False
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._flush_task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return sum(len(uris) for uris in self._subscribers.values())
+
+    def subscribed_keys(self) -> set[str]:
+        """The keys of every subscribed URI. Safe to call from any thread."""
+        return {
+            key
+            for uris in list(self._subscribers.values())
+            for key in list(uris.values())
+        }
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self._loop = None
+
+    def subscribe(self, session: ServerSession, uri: str) -> None:
+        self._subscribers.setdefault(session, {})[uri] = self._key(uri)
+
+    def unsubscribe(self, session: ServerSession, uri: str) -> None:
+        uris: dict[str, str] | None = self._subscribers.get(session)
+        if uris is not None:
+            uris.pop(uri, None)
+            if not uris:
+                del self._subscribers[session]
+
+    def changed(self, keys: Iterable[str], list_changed: bool = False) -> None:
+        """
+        Records changed resources and schedules a notification round.
+
+        Safe to call from the I/O worker threads. Does nothing while no
+        session is subscribed.
+        """
+        if not self._subscribers:
+            return
+        with self._lock:
+            self._pending_keys.update(keys)
+            self._pending_list_changed |= list_changed
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self) -> None:
+        if self._flush_task is None and self._loop is not None:
+            self._flush_task = self._loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.debounce)
+        # Changes arriving while notifications go out start a new round
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Send notifications for every change recorded so far."""
+        with self._lock:
+            keys: set[str] = self._pending_keys
+            list_changed: bool = self._pending_list_changed
+            self._pending_keys, self._pending_list_changed = set(), False
+
+        for session, uris in list(self._subscribers.items()):
+            try:
+                if list_changed:
+                    await session.send_resource_list_changed()
+                    self.sent += 1
+                for uri, key in list(uris.items()):
+                    if key in keys:
+                        await session.send_resource_updated(uri=AnyUrl(uri))
+                        self.sent += 1
+            except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+                # The client went away without unsubscribing
+                self._subscribers.pop(session, None)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sessions": len(self._subscribers),
+            "subscriptions": len(self),
+            "notifications_sent": self.sent,
+        }
+
+
+class StoreWatcher:
+    """
+    Detects notes changed by other processes by polling a note store.
+
+    Each poll only asks the store whether it changed (a directory stat for
+    the file store, a pragma for SQLite) and rechecks the `watched()` notes,
+    which another process may have rewritten in place without the store
+    noticing; the notes are listed and compared with the previous listing
+    only when something changed. The server's own writes are reported
+    through `seen` and `forget`, so they are not detected twice.
+    Polling only happens while `active()` is true; the listing is dropped
+    in between, since nobody needs to hear about those changes.
+    """
+
+    def __init__(
+        self,
+        store: NoteStore,
+        on_change: Callable[[set[str], bool], None],
+        active: Callable[[], bool],
+        run: Callable[[Callable[[], None]], Awaitable[None]],
+        interval: float = 1.0,
+        watched: Callable[[], Iterable[str]] = lambda: (),
+    ) -> None:
+        self.store: NoteStore = store
+        self.interval: float = interval
+        self._on_change: Callable[[set[str], bool], None] = on_change
+        self._active: Callable[[], bool] = active
+        self._run: Callable[[Callable[[], None]], Awaitable[None]] = run
+        self._watched: Callable[[], Iterable[str]] = watched
+        self._known: dict[str, tuple[int, float]] | None = None
+        self._version: int | None = None
+        self._lock = threading.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if self._active():
+                await self._run(self.poll)
+            else:
+                with self._lock:
+                    self._known = None
+
+    def poll(self) -> None:
+        """
+        Compares the store with the last poll and reports changed notes,
+        and whether notes were added or removed. Blocking.
+        """
+        self.store.refresh()
+        self.store.recheck(stems=self._watched())
+        version: int = self.store.version
+        with self._lock:
+            if self._known is not None and version == self._version:
+                return
+            current: dict[str, tuple[int, float]] = {
+                meta.stem: (meta.size, meta.mtime) for meta in self.store.entries()
+            }
+            known: dict[str, tuple[int, float]] | None = self._known
+            self._known, self._version = current, version
+        if known is None:
+            return
+
+        changed: set[str] = {
+            stem for stem, signature in current.items() if known.get(stem) != signature
+        }
+        changed |= known.keys() - current.keys()
+        if changed:
+            self._on_change(changed, current.keys() != known.keys())
+
+    def seen(self, meta: NoteMeta) -> None:
+        with self._lock:
+            if self._known is not None:
+                self._known[meta.stem] = (meta.size, meta.mtime)
+
+    def forget(self, stem: str) -> None:
+        with self._lock:
+            if self._known is not None:
+                self._known.pop(stem, None)
+
+
+def enable_subscriptions(server: FastMCP, subscriptions: ResourceSubscriptions) -> None:
+    """
+    Handles resources/subscribe and resources/unsubscribe for `server`, and
+    advertises subscription and list-changed support to clients.
+    """
+    lowlevel = server._mcp_server
+
+    @lowlevel.subscribe_resource()
+    async def subscribe(uri: AnyUrl) -> None:
+        subscriptions.subscribe(session=lowlevel.request_context.session, uri=str(uri))
+
+    @lowlevel.unsubscribe_resource()
+    async def unsubscribe(uri: AnyUrl) -> None:
+        subscriptions.unsubscribe(
+            session=lowlevel.request_context.session, uri=str(uri)
+        )
+
+    get_capabilities = lowlevel.get_capabilities
+
+    def capabilities(*args: Any, **kwargs: Any) -> ServerCapabilities:
+        # FastMCP always reports subscribe=False and listChanged=False
+        result: ServerCapabilities = get_capabilities(*args, **kwargs)
+        if result.resources is not None:
+            result.resources.subscribe = True
+            result.resources.listChanged = True
+        return result
+
+    lowlevel.get_capabilities = capabilities
@@ -0,0 +1,589 @@
+import asyncio
+import json
+import os
+import tarfile
+import time
+import zipfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import notes
+import pytest
+from io_executor import LoopLagMonitor
+from note_archive import export_note_files
+from notes import (
+    ExtractCache,
+    add_note,
+    add_notes,
+    delete_note,
+    edit_note,
+    export_notes,
+    get_io_stats,
+    get_latest_notes,
+    get_note_resource,
+    get_storage_stats,
+    import_notes,
+    list_notes,
+    notes_summary_prompt,
+    read_note,
+    read_notes,
+    search_notes,
+)
+from search_index import SearchIndex, build_match_query
+from storage import (
+    CREATE,
+    UPSERT,
+    BlobStore,
+    FileStore,
+    NoteMeta,
+    SQLiteStore,
+    migrate,
+)
+from subscriptions import StoreWatcher
+
+
+@pytest.fixture(autouse=True)
+def notes_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """Point the notes server at an empty temporary directory."""
+    directory: Path = tmp_path / "notes_data"
+    monkeypatch.setattr(notes, "note_store", FileStore(directory=directory))
+    search_index = SearchIndex(path=tmp_path / "notes_search.sqlite3")
+    monkeypatch.setattr(notes, "search_index", search_index)
+    monkeypatch.setattr(notes, "_search_synced_version", None)
+    yield directory
+    search_index.close()
+
+
+@pytest.mark.asyncio
+async def test_add_list_and_read_notes():
+    assert "No notes found" in await list_notes()
+
+    assert "created successfully" in await add_note(title="Zebra", content="z")
+    assert "created successfully" in await add_note(title="Apple Pie", content="a")
+    assert "already exists" in await add_note(title="apple pie", content="b")
+
+    assert await list_notes() == "Available notes:\n- Apple Pie\n- Zebra"
+    assert await read_note(title="Apple Pie") == "a"
+
+
+@pytest.mark.asyncio
+async def test_edit_and_delete_keep_index_consistent():
+    await add_note(title="First", content="one")
+    await add_note(title="Second", content="two")
+
+    assert "not found" in await edit_note(title="Missing", new_content="x")
+    assert "edited successfully" in await edit_note(title="First", new_content="1")
+    assert notes.note_store.latest().stem == "first"
+    assert await get_latest_notes() == "1"
+
+    # The store's own writes and deletes are not mistaken for outside changes
+    version: int = notes.note_store.version
+    assert "deleted successfully" in await delete_note(title="First")
+    assert "not found" in await delete_note(title="First")
+    assert notes.note_store.version == version
+    assert await list_notes() == "Available notes:\n- Second"
+    assert await get_latest_notes() == "two"
+
+
+@pytest.mark.asyncio
+async def test_index_picks_up_external_changes(notes_dir: Path):
+    await add_note(title="Mine", content="server")
+
+    external: Path = notes_dir / "external.txt"
+    external.write_text("outside", encoding="utf-8")
+    # Make sure the directory mtime visibly changes on coarse filesystems
+    stat: os.stat_result = notes_dir.stat()
+    os.utime(notes_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert await list_notes() == "Available notes:\n- External\n- Mine"
+    assert "already exists" in await add_note(title="External", content="x")
+
+
+def _page_titles(listing: str) -> list[str]:
+    return [line[2:] for line in listing.splitlines() if line.startswith("- ")]
+
+
+def _next_cursor(listing: str) -> str:
+    return listing.rsplit("cursor='", 1)[1].rstrip("'")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["file", "sqlite"])
+async def test_list_notes_pages_by_name_and_mtime(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, backend: str
+):
+    if backend == "sqlite":
+        monkeypatch.setattr(
+            notes, "note_store", SQLiteStore(path=tmp_path / "notes.sqlite3")
+        )
+    titles: list[str] = [f"Note {i:02}" for i in range(7)] + ["Other"]
+    notes.note_store.write_many(
+        notes=[(notes._get_note_stem(title=t), t, "x") for t in titles],
+        mtimes=[float(i) for i in range(len(titles))],
+    )
+
+    seen: list[str] = []
+    listing: str = await list_notes(prefix="note", limit=3)
+    while "cursor=" in listing:
+        seen += _page_titles(listing=listing)
+        listing = await list_notes(prefix="note", limit=3, cursor=_next_cursor(listing))
+    seen += _page_titles(listing=listing)
+    assert seen == titles[:7]
+
+    listing = await list_notes(sort="mtime", limit=4)
+    assert _page_titles(listing=listing) == titles[::-1][:4]
+    listing = await list_notes(sort="mtime", limit=4, cursor=_next_cursor(listing))
+    assert _page_titles(listing=listing) == titles[::-1][4:]
+    assert "cursor=" not in listing
+
+    assert "Invalid cursor" in await list_notes(cursor="bogus")
+    first_page: str = await list_notes(limit=1)
+    assert "Invalid cursor" in await list_notes(
+        sort="mtime", cursor=_next_cursor(first_page)
+    )
+    assert "Error" in await list_notes(sort="size")
+    assert "No notes found" in await list_notes(prefix="zzz")
+    notes.note_store.close()
+
+
+@pytest.mark.asyncio
+async def test_file_store_keeps_original_titles(
+    notes_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    await add_note(title="McDonald's Menu", content="fries")
+    await edit_note(title="mcdonalds menu", new_content="burgers")
+    assert await list_notes() == "Available notes:\n- McDonald's Menu"
+    assert await get_note_resource(title="McDonald%27s%20Menu") == "burgers"
+    assert "not found" in await get_note_resource(title="Nope")
+
+    # Another process sees the same titles, and the log shrinks when compacted
+    monkeypatch.setattr(FileStore, "TITLES_SLACK", 10)
+    other = FileStore(directory=notes_dir)
+    other.refresh()
+    assert other.get(stem="mcdonalds-menu").title == "McDonald's Menu"
+    for i in range(30):
+        other.write(stem="temp", title=f"Temp {i}", content="x", mode=CREATE)
+        other.delete(stem="temp")
+    log: Path = notes_dir / FileStore.TITLES_FILE
+    assert len(log.read_text(encoding="utf-8").splitlines()) < 20
+    await add_note(title="Later Note", content="y")
+    other.refresh()
+    assert [meta.title for meta in other.entries()] == [
+        "Later Note",
+        "McDonald's Menu",
+    ]
+
+
+def test_build_match_query_quotes_terms():
+    assert build_match_query(query='mcp-server "AND" pok*') == (
+        '"mcp" "server" "AND" "pok"*'
+    )
+    assert build_match_query(query="  ?! ") == ""
+
+
+@pytest.mark.asyncio
+async def test_search_notes_ranks_and_tracks_writes(notes_dir: Path):
+    await add_note(title="Grocery List", content="milk, bread and eggs")
+    await add_note(title="Recipes", content="Pancakes need milk and flour.")
+    await add_note(title="Milk Facts", content="Cows produce it.")
+
+    results: str = await search_notes(query="milk")
+    titles: list[str] = [line.split(" (")[0] for line in results.splitlines()[1:]]
+    # Title matches rank first
+    assert titles[0] == "- Milk Facts"
+    assert set(titles) == {"- Milk Facts", "- Grocery List", "- Recipes"}
+    assert "[milk]" in results
+
+    await edit_note(title="Recipes", new_content="Waffles need flour.")
+    await delete_note(title="Milk Facts")
+    assert "Recipes" not in await search_notes(query="milk")
+    assert "Milk Facts" not in await search_notes(query="milk")
+    assert "- Recipes" in await search_notes(query="waff*")
+    assert "No notes found" in await search_notes(query="cows")
+
+    # Notes written by other processes are indexed on the next search
+    (notes_dir / "dairy.txt").write_text("cheese from milk", encoding="utf-8")
+    stat: os.stat_result = notes_dir.stat()
+    os.utime(notes_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert "- Dairy" in await search_notes(query="cheese")
+
+
+@pytest.mark.asyncio
+async def test_notes_rewritten_in_place_are_rechecked(notes_dir: Path):
+    await add_note(title="Old", content="old")
+    await add_note(title="Recipes", content="Pancakes need milk.")
+    await add_note(title="Zebra", content="z")
+    version: int = notes.note_store.version
+
+    # Another process rewrites notes without touching the directory
+    directory_mtime_ns: int = notes_dir.stat().st_mtime_ns
+    old: Path = notes_dir / "old.txt"
+    old.write_text("old, then rewritten", encoding="utf-8")
+    os.utime(old, times=(time.time() + 10, time.time() + 10))
+    (notes_dir / "recipes.txt").write_text("Waffles need flour.", encoding="utf-8")
+    assert notes_dir.stat().st_mtime_ns == directory_mtime_ns
+
+    # Listing a note re-reads its metadata
+    assert _page_titles(await list_notes()) == ["Old", "Recipes", "Zebra"]
+    assert notes.note_store.get(stem="old").size == old.stat().st_size
+    assert notes.note_store.version != version
+    assert _page_titles(await list_notes(sort="mtime", limit=1)) == ["Old"]
+
+    # So does finding it, and its new content is indexed
+    (notes_dir / "zebra.txt").write_text("Stripes and milk.", encoding="utf-8")
+    assert await search_notes(query="zebra")
+    assert "- Zebra" in await search_notes(query="stripes")
+
+
+@pytest.mark.asyncio
+async def test_summary_prompt_respects_budget_and_order():
+    await add_note(title="Old", content="old " * 10)
+    await add_note(title="Long", content="word " * 1000)
+    await add_note(title="New", content="fresh milk")
+    # Backdate a note through the store, so its recency order is updated too
+    notes.note_store.write_many(
+        notes=[("old", "Old", "old " * 10)], mode=UPSERT, mtimes=[1.0]
+    )
+
+    prompt: str = await notes_summary_prompt(max_tokens=8000, max_note_tokens=25)
+    assert prompt.index("Note: Long") < prompt.index("Note: New")
+    assert "[...]" in prompt
+    assert len(prompt) < 8000
+
+    # A note too long for the budget is skipped, but shorter ones after it fit
+    prompt = await notes_summary_prompt(order="recency", max_tokens=40)
+    assert "Note: New" in prompt and "Note: Old" in prompt
+    assert "Note: Long" not in prompt
+    assert "(1 more note(s) were left out" in prompt
+
+    # The first note is shortened to fit rather than left out
+    prompt = await notes_summary_prompt(max_tokens=40)
+    assert "--- Note: Long ---\nword word" in prompt
+    assert "[...]" in prompt
+    assert "(2 more note(s) were left out" in prompt
+    assert len(prompt.split("\n\n(")[0]) <= 160
+
+    prompt = await notes_summary_prompt(order="relevance", query="milk")
+    assert "Note: New" in prompt and "Note: Long" not in prompt
+    assert "Error" in await notes_summary_prompt(order="relevance")
+    assert "Error" in await notes_summary_prompt(order="size")
+
+
+def test_extract_cache_reuses_unchanged_notes(notes_dir: Path):
+    store = FileStore(directory=notes_dir)
+    note: NoteMeta = store.write(
+        stem="note", title="Note", content="alpha beta gamma", mode=CREATE
+    ).meta
+    cache = ExtractCache(maxsize=1)
+
+    assert cache.get(meta=note, max_bytes=12, store=store) == "alpha beta [...]"
+    (notes_dir / "note.txt").write_text("changed on disk", encoding="utf-8")
+    # Same size and mtime recorded, so the cached extract is reused
+    assert cache.get(meta=note, max_bytes=12, store=store) == "alpha beta [...]"
+    note = store.write(
+        stem="note", title="Note", content="changed again", mode=UPSERT
+    ).meta
+    assert cache.get(meta=note, max_bytes=100, store=store) == "changed again"
+    store.delete(stem="note")
+    assert cache.get(meta=note, max_bytes=10, store=store) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_are_atomic_and_locked(
+    notes_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    results: list[str] = await asyncio.gather(
+        *(add_note(title="Race", content=f"writer {i}") for i in range(10))
+    )
+    assert sum("created successfully" in result for result in results) == 1
+
+    await asyncio.gather(
+        *(add_note(title=f"Note {i}", content="x") for i in range(5)),
+        *(edit_note(title="Race", new_content=f"edit {i}") for i in range(5)),
+    )
+    assert (await read_note(title="Race")).startswith("edit ")
+    assert notes.note_store.count() == 6
+    assert not list(notes_dir.glob("*.tmp"))
+    assert not len(notes.note_locks)
+
+    # Another process created the note behind the index's back
+    (notes_dir / "sneaky.txt").write_text("theirs", encoding="utf-8")
+    monkeypatch.setattr(notes.note_store, "refresh", lambda: None)
+    assert "already exists" in await add_note(title="Sneaky", content="mine")
+    assert (notes_dir / "sneaky.txt").read_text(encoding="utf-8") == "theirs"
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_and_io_stats():
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    time.sleep(0.05)  # noqa: ASYNC251 - block the loop on purpose
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+
+    stats: dict = monitor.stats()
+    assert stats["samples"] >= 2 and not stats["running"]
+    assert stats["max_ms"] >= 30
+
+    await add_note(title="Stats", content="x")
+    io_stats: dict = json.loads(await get_io_stats())
+    assert io_stats["io_pool"]["completed"] >= 1
+    assert io_stats["io_pool"]["pending"] == 0
+    assert "p99_ms" in io_stats["event_loop_lag"]
+
+
+@pytest.mark.asyncio
+async def test_lifespan_outlives_a_single_session():
+    try:
+        async with notes.lifespan(notes.mcp):
+            async with notes.lifespan(notes.mcp):
+                await add_note(title="First", content="one")
+            # Another session ending leaves the shared resources running
+            assert json.loads(await get_io_stats())["event_loop_lag"]["running"]
+            assert "created successfully" in await add_note(title="Second", content="2")
+            assert await search_notes(query="one")
+    finally:
+        await notes.store_watcher.stop()
+        await notes.subscriptions.stop()
+        await notes.loop_lag.stop()
+
+
+@pytest.mark.asyncio
+async def test_bulk_add_and_read_notes():
+    await add_note(title="Existing", content="old")
+    report: dict = json.loads(
+        await add_notes(
+            notes=[
+                {"title": "One", "content": "first"},
+                {"title": "Existing", "content": "new"},
+                {"title": "one", "content": "duplicate"},
+                {"title": "Empty", "content": " "},
+            ]
+        )
+    )
+    assert report["counts"] == {"created": 1, "exists": 2, "error": 1}
+    assert [item["status"] for item in report["items"]] == [
+        "created",
+        "exists",
+        "exists",
+        "error",
+    ]
+
+    report = json.loads(
+        await add_notes(notes=[{"title": "Existing", "content": "new"}], overwrite=True)
+    )
+    assert report["counts"] == {"updated": 1}
+    assert "- Existing" in await search_notes(query="new")
+
+    rows: list[dict] = json.loads(await read_notes(titles=["One", "Existing", "Nope"]))
+    assert rows == [
+        {"title": "One", "content": "first"},
+        {"title": "Existing", "content": "new"},
+        {"title": "Nope", "error": "Note not found."},
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("archive_name", ["export", "export.tar.gz", "export.zip"])
+async def test_export_and_import_round_trip(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, archive_name: str
+):
+    await add_notes(
+        notes=[{"title": f"Note {i}", "content": f"body {i}"} for i in range(2)]
+        + [{"title": "McDonald's Menu", "content": "fries"}]
+    )
+    archive: Path = tmp_path / archive_name
+    assert "Exported 3 note(s)" in await export_notes(destination=str(archive))
+    if archive_name != "export":
+        assert "already exists" in await export_notes(destination=str(archive))
+
+    # Import into a fresh, empty notes directory
+    monkeypatch.setattr(notes, "note_store", FileStore(directory=tmp_path / "other"))
+    monkeypatch.setattr(notes, "IMPORT_BATCH_SIZE", 2)
+    report: dict = json.loads(await import_notes(source=str(archive)))
+    assert report["counts"] == {"created": 3}
+    assert await read_note(title="Note 1") == "body 1"
+    # Titles come from the manifest, not from the filenames
+    assert "- McDonald's Menu" in await list_notes()
+
+    report = json.loads(await import_notes(source=str(archive)))
+    assert report["counts"] == {"exists": 3}
+    assert "Error" in await import_notes(source=str(tmp_path / "missing"))
+
+    # Without a manifest, notes are titled after their filenames
+    loose: Path = tmp_path / "loose"
+    loose.mkdir()
+    (loose / "shopping list.md").write_text("eggs", encoding="utf-8")
+    report = json.loads(await import_notes(source=str(loose)))
+    assert report["items"] == [{"title": "shopping list", "status": "created"}]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("archive_name", ["export", "export.tar.gz", "export.zip"])
+async def test_import_limits_file_size_and_member_count(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, archive_name: str
+):
+    archive: Path = tmp_path / archive_name
+    files = [("a-small.txt", b"tiny", 0.0), ("b-huge.txt", b"x" * 100, 0.0)]
+    files += [(f"c-extra-{i}.txt", b"more", 0.0) for i in range(3)]
+    export_note_files(files=files, destination=archive)
+    monkeypatch.setattr(notes, "IMPORT_MAX_BYTES", 20)
+    monkeypatch.setattr(notes, "IMPORT_MAX_MEMBERS", 4)
+
+    report: dict = json.loads(await import_notes(source=str(archive)))
+    assert report["counts"] == {"created": 2, "error": 2}
+    errors: list[dict] = [i for i in report["items"] if i["status"] == "error"]
+    assert "import limit" in errors[0]["error"]
+    assert "archive members" in errors[1]["error"]
+    assert await read_note(title="a-small") == "tiny"
+
+
+@pytest.mark.parametrize("archive_name", ["export", "export.tar", "export.zip"])
+def test_export_keeps_modification_times(tmp_path: Path, archive_name: str):
+    mtime: float = 1_000_000_000.0  # 2001-09-09
+    archive: Path = tmp_path / archive_name
+    assert export_note_files(files=[("a.txt", b"a", mtime)], destination=archive) == 1
+
+    if archive_name.endswith(".tar"):
+        with tarfile.open(name=archive) as tar:
+            assert tar.getmember("a.txt").mtime == mtime
+    elif archive_name.endswith(".zip"):
+        with zipfile.ZipFile(file=archive) as zip_file:
+            assert zip_file.getinfo("a.txt").date_time == time.localtime(mtime)[:6]
+    else:
+        assert (archive / "a.txt").stat().st_mtime == mtime
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_and_migration(
+    tmp_path: Path, notes_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    await add_note(title="Old Note", content="from a text file")
+    await add_note(title="Other", content="second file")
+
+    store = SQLiteStore(path=tmp_path / "notes.sqlite3")
+    assert migrate(source=notes.note_store, target=store) == 2
+    assert migrate(source=notes.note_store, target=store) == 0
+    assert store.get(stem="old-note").mtime == notes.note_store.get("old-note").mtime
+
+    monkeypatch.setattr(notes, "note_store", store)
+    assert await read_note(title="Old Note") == "from a text file"
+    assert "created successfully" in await add_note(
+        title="McDonald's Menu", content="fries"
+    )
+    assert "already exists" in await add_note(title="mcdonalds menu", content="x")
+    assert "edited successfully" in await edit_note(
+        title="mcdonalds menu", new_content="burgers and fries"
+    )
+    # The SQLite store keeps titles as they were written
+    assert "- McDonald's Menu" in await list_notes()
+    assert await get_latest_notes() == "burgers and fries"
+    assert "- McDonald's Menu" in await search_notes(query="burgers")
+    assert store.read_prefix(stem="mcdonalds-menu", max_bytes=7) == b"burgers"
+
+    assert "deleted successfully" in await delete_note(title="Other")
+    assert "not found" in await read_note(title="Other")
+    assert store.count() == 2
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_blob_backend_dedupes_and_compresses(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    store = BlobStore(directory=tmp_path / "blobs", compress_min_bytes=1024)
+    monkeypatch.setattr(store, "CHUNK_SIZE", 256)
+    monkeypatch.setattr(notes, "note_store", store)
+    transcript: str = "".join(f"line {i}: the same words again\n" for i in range(2000))
+
+    await add_note(title="Transcript", content=transcript)
+    await add_note(title="Transcript Copy", content=transcript)
+    await add_note(title="Short", content="tiny")
+    assert sum(p.is_file() for p in (tmp_path / "blobs").rglob("objects/*/*")) == 2
+
+    assert await read_note(title="Transcript Copy") == transcript.strip()
+    assert store.read_prefix(stem="transcript", max_bytes=12) == b"line 0: the "
+    usage: dict = json.loads(await get_storage_stats())
+    assert usage["notes"] == 3 and usage["unique_contents"] == 2
+    assert usage["stored_bytes"] * 10 < usage["logical_bytes"]
+
+    # Objects go away once no note refers to them
+    await edit_note(title="Transcript", new_content="rewritten")
+    assert await read_note(title="Transcript Copy") == transcript.strip()
+    await delete_note(title="Transcript Copy")
+    await delete_note(title="Short")
+    assert json.loads(await get_storage_stats())["unique_contents"] == 1
+    assert sum(p.is_file() for p in (tmp_path / "blobs").rglob("objects/*/*")) == 1
+    assert await read_note(title="Transcript") == "rewritten"
+    store.close()
+
+
+class FakeSession:
+    """Records the notifications a subscribed client would receive."""
+
+    def __init__(self) -> None:
+        self.received: list[str] = []
+
+    async def send_resource_updated(self, uri) -> None:
+        self.received.append(str(uri))
+
+    async def send_resource_list_changed(self) -> None:
+        self.received.append("list_changed")
+
+
+@pytest.mark.asyncio
+async def test_subscribers_are_notified_of_changes(
+    notes_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    capabilities = notes.mcp._mcp_server.create_initialization_options().capabilities
+    assert capabilities.resources.subscribe and capabilities.resources.listChanged
+
+    subscriptions = notes.subscriptions
+    monkeypatch.setattr(subscriptions, "debounce", 0.01)
+    watcher = StoreWatcher(
+        store=notes.note_store,
+        on_change=notes._announce_external,
+        active=lambda: True,
+        run=notes.io_executor.run,
+        watched=notes._subscribed_stems,
+    )
+    monkeypatch.setattr(notes, "store_watcher", watcher)
+    session = FakeSession()
+    subscriptions.start()
+    subscriptions.subscribe(session=session, uri="notes://Apple%20Pie")
+    subscriptions.subscribe(session=session, uri="notes://latest")
+    try:
+        await add_note(title="Unwatched", content="x")
+        await asyncio.sleep(0.1)
+        assert sorted(session.received) == ["list_changed", "notes://latest"]
+
+        # Changes within the debounce window yield one notification per URI
+        session.received.clear()
+        subscriptions.debounce = 60
+        await add_note(title="Apple Pie", content="v1")
+        await edit_note(title="apple pie", new_content="v2")
+        await edit_note(title="Unwatched", new_content="y")
+        await subscriptions.flush()
+        assert sorted(session.received) == [
+            "list_changed",
+            "notes://Apple%20Pie",
+            "notes://latest",
+        ]
+
+        # Another process edits the note in place, which leaves the directory
+        # unchanged; the server's own writes are not reported again
+        watcher.poll()
+        await edit_note(title="Unwatched", new_content="z")
+        await subscriptions.flush()
+        session.received.clear()
+        (notes_dir / "apple-pie.txt").write_text("v3 from elsewhere", encoding="utf-8")
+        watcher.poll()
+        await subscriptions.flush()
+        assert sorted(session.received) == ["notes://Apple%20Pie", "notes://latest"]
+
+        subscriptions.unsubscribe(session=session, uri="notes://Apple%20Pie")
+        subscriptions.unsubscribe(session=session, uri="notes://latest")
+        assert not len(subscriptions)
+    finally:
+        await subscriptions.stop()
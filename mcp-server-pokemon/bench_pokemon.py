@@ -0,0 +1,393 @@
+# bench_pokemon.py
+
+"""
+Benchmark and load-test harness for the pokemon MCP server.
+
+A local stub of the PokeAPI /pokemon endpoint runs in this process, with
+configurable latency and error injection. The server is driven through a
+real MCP session, either over stdio (the server runs as a subprocess, as it
+does under an MCP host) or over in-memory streams (the server runs in this
+process, so allocations can be traced too). Calls are issued at a fixed
+concurrency and the run reports throughput, latency percentiles, errors and
+how many requests reached the stub.
+
+Usage:
+    python bench_pokemon.py --tool get_pokemon_info --requests 500 --concurrency 20
+    python bench_pokemon.py --transport memory --latency 0.05 --error-rate 0.1 --json
+    python bench_pokemon.py --max-p95-ms 250  # exit with status 1 if p95 is slower
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from mcp import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp.shared.memory import create_connected_server_and_client_session
+
+# Current file path and the canned PokeAPI response served by the stub
+current_dir: Path = Path(__file__).parent
+STUB_RESPONSE_PATH: Path = current_dir / "dummy-pokemon-api-response.json"
+
+# Base stats added to the canned response, which only has types and abilities
+STUB_STATS: tuple[str, ...] = (
+    "hp",
+    "attack",
+    "defense",
+    "special-attack",
+    "special-defense",
+    "speed",
+)
+
+# Tools the harness knows how to call, with arguments for the i-th call
+TOOLS: tuple[str, ...] = (
+    "get_pokemon_info",
+    "create_tournament_squad",
+    "list_popular_pokemon",
+)
+
+
+class PokeAPIStub:
+    """
+    A minimal HTTP/1.1 keep-alive server answering GET /api/v2/pokemon/{name}.
+
+    Every response is delayed by `latency` seconds (plus up to `jitter`), and
+    a share `error_rate` of requests is answered with 503 instead.
+    """
+
+    def __init__(
+        self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0
+    ) -> None:
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.error_rate: float = error_rate
+        self.requests: int = 0
+        self.errors: int = 0
+        self._template: dict[str, Any] = json.loads(
+            STUB_RESPONSE_PATH.read_text(encoding="utf-8")
+        )
+        self._server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "The stub is not running."
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/api/v2/pokemon/"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            client_connected_cb=self._handle, host="127.0.0.1", port=0
+        )
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _body(self, name: str) -> bytes:
+        pokemon_id: int = int(name) if name.isdigit() else sum(map(ord, name))
+        return json.dumps(
+            {
+                **self._template,
+                "id": pokemon_id,
+                "name": name,
+                "height": 7,
+                "weight": 69,
+                "stats": [
+                    {"stat": {"name": stat}, "base_stat": 50 + pokemon_id % 50}
+                    for stat in STUB_STATS
+                ],
+            },
+            separators=(",", ":"),
+        ).encode()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while request_line := await reader.readline():
+                # Skip the request headers; the stub never reads a body
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+
+                self.requests += 1
+                path: str = request_line.split()[1].decode()
+                await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+
+                if random.random() < self.error_rate:
+                    self.errors += 1
+                    status, body = "503 Service Unavailable", b"{}"
+                elif path.startswith("/api/v2/pokemon/"):
+                    name: str = path.removeprefix("/api/v2/pokemon/").strip("/")
+                    status, body = "200 OK", self._body(name=name)
+                else:
+                    status, body = "404 Not Found", b"{}"
+
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (ConnectionError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+
+@dataclass
+class BenchResult:
+    """Summary of one benchmark run."""
+
+    tool: str
+    transport: str
+    requests: int
+    concurrency: int
+    errors: int
+    duration_s: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    upstream_requests: int
+    upstream_errors: int
+    allocated_kib: float | None = None
+    peak_kib: float | None = None
+
+
+def tool_arguments(tool: str, i: int, names: int) -> dict[str, Any]:
+    """Return the arguments for the i-th call of `tool`, cycling over `names` Pokemon."""
+    if tool == "get_pokemon_info":
+        return {"pokemon_name": f"pokemon-{i % names}"}
+    if tool == "create_tournament_squad":
+        return {
+            "pokemon_names": ", ".join(
+                f"pokemon-{(i * 10 + j) % names}" for j in range(10)
+            )
+        }
+    return {}
+
+
+@asynccontextmanager
+async def stdio_session(stub: PokeAPIStub, cache: bool) -> AsyncIterator[ClientSession]:
+    """Start pokemon.py as a stdio subprocess pointed at the stub."""
+    env: dict[str, str] = {
+        **os.environ,
+        "POKEAPI_URL": stub.url,
+        "POKEAPI_CACHE_PATH": "",
+        "POKEAPI_CACHE_SIZE": "512" if cache else "0",
+        "POKEAPI_RATE_LIMIT": "0",
+        "POKEDEX_SNAPSHOT_PATH": str(current_dir / "no-pokedex-snapshot"),
+    }
+    server = StdioServerParameters(
+        command=sys.executable, args=[str(current_dir / "pokemon.py")], env=env
+    )
+    async with (
+        stdio_client(server=server) as (read_stream, write_stream),
+        ClientSession(read_stream=read_stream, write_stream=write_stream) as session,
+    ):
+        await session.initialize()
+        yield session
+
+
+@asynccontextmanager
+async def memory_session(
+    stub: PokeAPIStub, cache: bool
+) -> AsyncIterator[ClientSession]:
+    """
+    Run the pokemon server in this process, pointed at the stub. The module
+    globals it swaps out are restored afterwards.
+    """
+    import pokemon
+    from cache import MemoryCache, TieredCache
+    from resilience import CircuitBreaker, TokenBucket
+
+    overrides: dict[str, Any] = {
+        "POKEAPI_URL": stub.url,
+        "pokemon_cache": TieredCache(memory=MemoryCache(maxsize=512 if cache else 0)),
+        "pokeapi_rate_limiter": TokenBucket(rate=0, capacity=1),
+        "pokeapi_breaker": CircuitBreaker(
+            failure_threshold=pokemon.POKEAPI_BREAKER_THRESHOLD,
+            reset_timeout=pokemon.POKEAPI_BREAKER_RESET,
+        ),
+        "POKEDEX_SNAPSHOT_PATH": current_dir / "no-pokedex-snapshot",
+        "pokedex": None,
+        "_http_client": None,
+    }
+    saved: dict[str, Any] = {name: getattr(pokemon, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(pokemon, name, value)
+    try:
+        async with create_connected_server_and_client_session(
+            server=pokemon.mcp._mcp_server
+        ) as session:
+            yield session
+    finally:
+        await pokemon.close_http_client()
+        for name, value in saved.items():
+            setattr(pokemon, name, value)
+
+
+async def run_benchmark(
+    tool: str = "get_pokemon_info",
+    transport: str = "stdio",
+    requests: int = 200,
+    concurrency: int = 10,
+    names: int = 50,
+    latency: float = 0.01,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    cache: bool = False,
+    warmup: int = 5,
+) -> BenchResult:
+    """Drive `tool` through an MCP session against a fresh stub and summarize it."""
+    stub = PokeAPIStub(latency=latency, jitter=jitter, error_rate=error_rate)
+    await stub.start()
+
+    open_session = stdio_session if transport == "stdio" else memory_session
+    try:
+        async with open_session(stub=stub, cache=cache) as session:
+            for i in range(warmup):
+                await session.call_tool(
+                    name=tool, arguments=tool_arguments(tool=tool, i=i, names=names)
+                )
+            stub.requests = stub.errors = 0
+
+            latencies: list[float] = []
+            errors: int = 0
+            next_call: int = 0
+
+            async def worker() -> None:
+                nonlocal errors, next_call
+                while next_call < requests:
+                    i: int = next_call
+                    next_call += 1
+                    started: float = time.perf_counter()
+                    result = await session.call_tool(
+                        name=tool,
+                        arguments=tool_arguments(tool=tool, i=i, names=names),
+                    )
+                    latencies.append(time.perf_counter() - started)
+                    text: str = result.content[0].text if result.content else ""
+                    if result.isError or "Error" in text:
+                        errors += 1
+
+            trace: bool = transport == "memory"
+            allocated: int = 0
+            peak: int = 0
+            if trace:
+                tracemalloc.start()
+            started: float = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+            duration: float = time.perf_counter() - started
+            if trace:
+                allocated, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+    finally:
+        await stub.stop()
+
+    percentiles: list[float] = statistics.quantiles(
+        latencies, n=100, method="inclusive"
+    )
+    return BenchResult(
+        tool=tool,
+        transport=transport,
+        requests=requests,
+        concurrency=concurrency,
+        errors=errors,
+        duration_s=round(duration, 3),
+        throughput_rps=round(requests / duration, 1),
+        p50_ms=round(percentiles[49] * 1000, 2),
+        p95_ms=round(percentiles[94] * 1000, 2),
+        p99_ms=round(percentiles[98] * 1000, 2),
+        max_ms=round(max(latencies) * 1000, 2),
+        upstream_requests=stub.requests,
+        upstream_errors=stub.errors,
+        allocated_kib=round(allocated / 1024, 1) if trace else None,
+        peak_kib=round(peak / 1024, 1) if trace else None,
+    )
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pokemon MCP server against a local PokeAPI stub."
+    )
+    parser.add_argument("--tool", choices=(*TOOLS, "all"), default="all")
+    parser.add_argument("--transport", choices=("stdio", "memory"), default="stdio")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--names", type=int, default=50, help="distinct Pokemon to cycle over"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.01, help="stub latency in seconds"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="extra random stub latency"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of 503 responses"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="keep the in-memory response cache on"
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument(
+        "--max-p95-ms",
+        type=float,
+        default=None,
+        help="exit with status 1 if any tool's p95 latency exceeds this",
+    )
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace) -> int:
+    tools: tuple[str, ...] = TOOLS if args.tool == "all" else (args.tool,)
+    results: list[BenchResult] = []
+    for tool in tools:
+        results.append(
+            await run_benchmark(
+                tool=tool,
+                transport=args.transport,
+                requests=args.requests,
+                concurrency=args.concurrency,
+                names=args.names,
+                latency=args.latency,
+                jitter=args.jitter,
+                error_rate=args.error_rate,
+                cache=args.cache,
+            )
+        )
+
+    if args.json:
+        print(json.dumps([asdict(result) for result in results], indent=2))
+    else:
+        for result in results:
+            print(f"\n=== {result.tool} ({result.transport}) ===")
+            for field, value in asdict(result).items():
+                if field not in ("tool", "transport") and value is not None:
+                    print(f"  {field}: {value}")
+
+    if args.max_p95_ms is not None and any(
+        result.p95_ms > args.max_p95_ms for result in results
+    ):
+        print(f"\np95 latency above {args.max_p95_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main=main(args=parse_args(argv=sys.argv[1:]))))
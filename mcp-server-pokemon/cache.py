@@ -0,0 +1,344 @@
+# cache.py
+
+"""
+Tiered response cache for the pokemon server.
+
+A bounded in-process LRU tier with a TTL sits in front of an optional SQLite
+tier, so entries survive server restarts. Expired entries can still be read
+as stale data when the upstream is unavailable. Both tiers keep hit/miss/eviction
+counters, and keys can be aliased (e.g. a Pokemon's ID to its name) so
+different spellings of the same lookup share one entry. Concurrent misses
+for the same key can be coalesced into a single upstream call.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class CacheStats:
+    """Hit, miss and eviction counters for one cache tier."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class MemoryCache:
+    """
+    A size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Expired entries are kept until evicted or replaced, so they can still be
+    served stale. `on_evict` is called with the key of every evicted entry.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        ttl: float = 86400.0,
+        on_evict: Callable[[str], None] | None = None,
+    ) -> None:
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.on_evict: Callable[[str], None] | None = on_evict
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for `key`, or None if missing or expired."""
+        entry: tuple[float, Any] | None = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            # Expired entries stay until evicted, so they can be served stale
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    def get_stale(self, key: str) -> Any | None:
+        """Return the value for `key` even if it has expired, or None if missing."""
+        entry: tuple[float, Any] | None = self._entries.get(key)
+        return None if entry is None else entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key`, evicting the least recently used entries."""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self.stats.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SQLiteCache:
+    """
+    A persistent JSON cache stored in a single SQLite file.
+
+    The database is opened lazily on first use and may be used from worker
+    threads. Entries expire after `ttl` seconds of wall-clock time and the
+    oldest ones are evicted once more than `max_entries` are stored. Expired
+    entries are kept until evicted or replaced, so they can still be served
+    stale.
+    """
+
+    def __init__(
+        self, path: Path, ttl: float = 30 * 86400.0, max_entries: int = 10_000
+    ) -> None:
+        self.path: Path = path
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        self.stats = CacheStats()
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(database=self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS aliases ("
+                "alias TEXT PRIMARY KEY, key TEXT NOT NULL)"
+            )
+        return self._conn
+
+    def resolve(self, key: str) -> str:
+        """Return the key `key` is an alias of, or `key` itself."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT key FROM aliases WHERE alias = ?", (key,))
+                .fetchone()
+            )
+        return row[0] if row else key
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for `key`, or None if missing or expired."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT value FROM entries WHERE key = ? AND expires_at >= ?",
+                    (key, time.time()),
+                )
+                .fetchone()
+            )
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            self.stats.hits += 1
+        return json.loads(row[0])
+
+    def get_stale(self, key: str) -> Any | None:
+        """Return the value for `key` even if it has expired, or None if missing."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT value FROM entries WHERE key = ?", (key,))
+                .fetchone()
+            )
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any, aliases: tuple[str, ...] = ()) -> None:
+        """Store `value` under `key` and point every alias at it."""
+        now: float = time.time()
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                    (
+                        key,
+                        json.dumps(value, separators=(",", ":")),
+                        now,
+                        now + self.ttl,
+                    ),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO aliases VALUES (?, ?)",
+                    [(alias, key) for alias in aliases if alias != key],
+                )
+                evicted: int = conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    "SELECT key FROM entries ORDER BY stored_at DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+            self.stats.evictions += max(evicted, 0)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class TieredCache:
+    """
+    An in-memory LRU tier backed by an optional SQLite tier.
+
+    Memory misses fall through to disk and disk hits are promoted back into
+    memory. Aliases map alternative keys onto the canonical key they were
+    stored under; in memory they live as long as that key's entry, while the
+    disk tier keeps its own. The `a`-prefixed methods do their disk work in a
+    worker thread, so a memory miss does not block the event loop.
+    """
+
+    def __init__(self, memory: MemoryCache, disk: SQLiteCache | None = None) -> None:
+        self.memory: MemoryCache = memory
+        self.disk: SQLiteCache | None = disk
+        self._aliases: dict[str, str] = {}
+        # Canonical key -> the aliases pointing at it
+        self._aliased_by: dict[str, set[str]] = {}
+        memory.on_evict = self._drop_aliases
+
+    def _add_alias(self, alias: str, key: str) -> None:
+        previous: str | None = self._aliases.get(alias)
+        if previous is not None and previous != key:
+            self._aliased_by.get(previous, set()).discard(alias)
+        self._aliases[alias] = key
+        self._aliased_by.setdefault(key, set()).add(alias)
+
+    def _drop_aliases(self, key: str) -> None:
+        for alias in self._aliased_by.pop(key, ()):
+            self._aliases.pop(alias, None)
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for `key` (or the key it aliases), or None."""
+        key = self._aliases.get(key, key)
+        value: Any | None = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        return self._promote(key, *self._disk_get(self.disk, key))
+
+    async def aget(self, key: str) -> Any | None:
+        """Like `get`, reading the disk tier in a worker thread."""
+        key = self._aliases.get(key, key)
+        value: Any | None = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        return self._promote(
+            key, *await asyncio.to_thread(self._disk_get, self.disk, key)
+        )
+
+    @staticmethod
+    def _disk_get(disk: SQLiteCache, key: str) -> tuple[str, Any | None]:
+        canonical_key: str = disk.resolve(key)
+        return canonical_key, disk.get(canonical_key)
+
+    def _promote(self, key: str, canonical_key: str, value: Any | None) -> Any | None:
+        if value is not None:
+            if canonical_key != key:
+                self._add_alias(alias=key, key=canonical_key)
+            self.memory.set(canonical_key, value)
+        return value
+
+    def get_stale(self, key: str) -> Any | None:
+        """Return the value for `key` even if it has expired, or None if missing."""
+        key = self._aliases.get(key, key)
+        value: Any | None = self.memory.get_stale(key)
+        if value is None and self.disk is not None:
+            value = self._disk_get_stale(self.disk, key)
+        return value
+
+    async def aget_stale(self, key: str) -> Any | None:
+        """Like `get_stale`, reading the disk tier in a worker thread."""
+        key = self._aliases.get(key, key)
+        value: Any | None = self.memory.get_stale(key)
+        if value is None and self.disk is not None:
+            value = await asyncio.to_thread(self._disk_get_stale, self.disk, key)
+        return value
+
+    @staticmethod
+    def _disk_get_stale(disk: SQLiteCache, key: str) -> Any | None:
+        return disk.get_stale(disk.resolve(key))
+
+    def set(self, key: str, value: Any, aliases: tuple[str, ...] = ()) -> None:
+        """Store `value` in every tier under `key`, reachable through `aliases`."""
+        self._memory_set(key, value, aliases)
+        if self.disk is not None:
+            self.disk.set(key, value, aliases=aliases)
+
+    async def aset(self, key: str, value: Any, aliases: tuple[str, ...] = ()) -> None:
+        """Like `set`, writing the disk tier in a worker thread."""
+        self._memory_set(key, value, aliases)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, aliases)
+
+    def _memory_set(self, key: str, value: Any, aliases: tuple[str, ...]) -> None:
+        for alias in aliases:
+            if alias != key:
+                self._add_alias(alias=alias, key=key)
+        self.memory.set(key, value)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return the hit/miss/eviction counters of each tier."""
+        stats: dict[str, dict[str, int]] = {"memory": asdict(self.memory.stats)}
+        if self.disk is not None:
+            stats["disk"] = asdict(self.disk.stats)
+        return stats
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one shared task.
+
+    The first caller for a key starts the task and later callers await the
+    same one until it finishes. Results and exceptions reach every waiter.
+    A waiter that is cancelled stops waiting without cancelling the shared
+    task for the others.
+    """
+
+    def __init__(self) -> None:
+        self.coalesced: int = 0
+        self._calls: dict[str, asyncio.Task[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `func` for `key`, or join the call already in flight for it."""
+        task: asyncio.Task[Any] | None = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key=key, task=done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task[Any]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
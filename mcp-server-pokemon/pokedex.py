@@ -0,0 +1,277 @@
+# pokedex.py
+
+"""
+Offline Pokedex snapshot for the pokemon server.
+
+The snapshot holds every Pokemon from the PokeAPI in columnar form: one
+compact `array` per numeric field plus per-row type and ability tuples.
+Indexes by type, ability and generation, and a pre-sorted order per stat,
+are built once at load time so filtering and ranking never touch the network.
+
+Build a snapshot with:
+    python pokedex.py build [snapshot_path]
+"""
+
+import asyncio
+import gzip
+import heapq
+import json
+import sys
+from array import array
+from pathlib import Path
+from typing import Any
+
+from httpx import AsyncClient
+
+# PokeAPI root and the default snapshot location
+POKEAPI_ROOT = "https://pokeapi.co/api/v2/"
+DEFAULT_SNAPSHOT_PATH: Path = Path(__file__).parent / "pokedex_snapshot.json.gz"
+
+# Base stats stored as columns, in PokeAPI order, plus their total
+STAT_NAMES: tuple[str, ...] = (
+    "hp",
+    "attack",
+    "defense",
+    "special-attack",
+    "special-defense",
+    "speed",
+)
+RANKABLE_FIELDS: tuple[str, ...] = (*STAT_NAMES, "total", "height", "weight", "id")
+
+SNAPSHOT_VERSION = 1
+
+
+class Pokedex:
+    """
+    An in-memory, array-backed Pokedex with precomputed lookup indexes.
+    """
+
+    def __init__(self, columns: dict[str, list[Any]]) -> None:
+        self.names: list[str] = columns["name"]
+        self.types: list[tuple[str, ...]] = [tuple(t) for t in columns["types"]]
+        self.abilities: list[tuple[str, ...]] = [tuple(a) for a in columns["abilities"]]
+        self.numeric: dict[str, array] = {
+            "id": array("I", columns["id"]),
+            "generation": array("B", columns["generation"]),
+            "height": array("I", columns["height"]),
+            "weight": array("I", columns["weight"]),
+        }
+        for stat in STAT_NAMES:
+            self.numeric[stat] = array("H", columns[stat])
+        self.numeric["total"] = array(
+            "H", map(sum, zip(*(self.numeric[stat] for stat in STAT_NAMES)))
+        )
+
+        self.by_name: dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.by_id: dict[int, int] = {
+            pokemon_id: i for i, pokemon_id in enumerate(self.numeric["id"])
+        }
+        self.by_type: dict[str, array] = self._index(self.types)
+        self.by_ability: dict[str, array] = self._index(self.abilities)
+        self.by_generation: dict[int, array] = self._index(
+            [(generation,) for generation in self.numeric["generation"]]
+        )
+
+        # Rows sorted by each rankable field, highest first
+        self.order: dict[str, array] = {
+            field: array(
+                "I",
+                sorted(
+                    range(len(self)), key=self.numeric[field].__getitem__, reverse=True
+                ),
+            )
+            for field in RANKABLE_FIELDS
+        }
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _index(values: list[tuple[Any, ...]]) -> dict[Any, array]:
+        index: dict[Any, list[int]] = {}
+        for row, keys in enumerate(values):
+            for key in keys:
+                index.setdefault(key, []).append(row)
+        return {key: array("I", rows) for key, rows in index.items()}
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_SNAPSHOT_PATH) -> "Pokedex":
+        """Load a snapshot written by `save_snapshot`."""
+        with gzip.open(filename=path, mode="rt", encoding="utf-8") as f:
+            snapshot: dict[str, Any] = json.load(fp=f)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported Pokedex snapshot version in {path}.")
+        return cls(columns=snapshot["columns"])
+
+    def find(self, pokemon_name: str) -> int | None:
+        """Return the row of a normalized Pokemon name or ID, if present."""
+        if pokemon_name.isdigit():
+            return self.by_id.get(int(pokemon_name))
+        return self.by_name.get(pokemon_name)
+
+    def filter(
+        self, type: str = "", ability: str = "", generation: int = 0
+    ) -> list[int] | None:
+        """
+        Return the rows matching every given criterion, in ascending order,
+        or None when no criterion was given (i.e. every row matches).
+        """
+        candidates: list[array] = []
+        if type:
+            candidates.append(self.by_type.get(type.lower().strip(), array("I")))
+        if ability:
+            candidates.append(self.by_ability.get(ability.lower().strip(), array("I")))
+        if generation:
+            candidates.append(self.by_generation.get(generation, array("I")))
+        if not candidates:
+            return None
+
+        candidates.sort(key=len)
+        rows: set[int] = set(candidates[0])
+        for other in candidates[1:]:
+            rows.intersection_update(other)
+        return sorted(rows)
+
+    def rank(
+        self,
+        sort_by: str = "total",
+        rows: list[int] | None = None,
+        limit: int = 10,
+        descending: bool = True,
+    ) -> list[int]:
+        """Return up to `limit` rows ordered by a stat or other numeric field."""
+        if sort_by not in RANKABLE_FIELDS:
+            raise ValueError(f"sort_by must be one of {', '.join(RANKABLE_FIELDS)}.")
+        limit = max(0, limit)
+
+        if rows is None:
+            order: array = self.order[sort_by]
+            return list(order[:limit] if descending else order[::-1][:limit])
+
+        column: array = self.numeric[sort_by]
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(limit, rows, key=column.__getitem__)
+
+    def record(self, row: int) -> dict[str, Any]:
+        """Return a compact row of id, name, generation, types, abilities and stats."""
+        return {
+            "id": self.numeric["id"][row],
+            "name": self.names[row],
+            "generation": self.numeric["generation"][row],
+            "types": list(self.types[row]),
+            "abilities": list(self.abilities[row]),
+            "stats": {stat: self.numeric[stat][row] for stat in STAT_NAMES},
+            "total": self.numeric["total"][row],
+        }
+
+    def pokeapi_data(self, row: int) -> dict[str, Any]:
+        """Return a row in the compact PokeAPI shape the pokemon tools read."""
+        return {
+            "id": self.numeric["id"][row],
+            "name": self.names[row],
+            "height": self.numeric["height"][row],
+            "weight": self.numeric["weight"][row],
+            "stats": [
+                {"stat": {"name": stat}, "base_stat": self.numeric[stat][row]}
+                for stat in STAT_NAMES
+            ],
+            "types": [{"type": {"name": t}} for t in self.types[row]],
+            "abilities": [{"ability": {"name": a}} for a in self.abilities[row]],
+        }
+
+
+# --- Snapshot building ---
+
+
+async def build_snapshot(
+    client: AsyncClient, max_concurrency: int = 10
+) -> dict[str, list[Any]]:
+    """
+    Download every Pokemon from the PokeAPI into snapshot columns.
+
+    Generations come from the /generation endpoints (one request each), so
+    only one request per Pokemon is needed on top of them.
+    """
+    species_generation: dict[str, int] = {}
+    generations: dict[str, Any] = (
+        await client.get(url=f"{POKEAPI_ROOT}generation?limit=100")
+    ).json()
+    for generation in generations["results"]:
+        data: dict[str, Any] = (await client.get(url=generation["url"])).json()
+        for species in data["pokemon_species"]:
+            species_generation[species["name"]] = data["id"]
+
+    listing: dict[str, Any] = (
+        await client.get(url=f"{POKEAPI_ROOT}pokemon?limit=100000")
+    ).json()
+    semaphore = asyncio.Semaphore(value=max_concurrency)
+
+    async def fetch(url: str) -> dict[str, Any]:
+        async with semaphore:
+            response = await client.get(url=url)
+            response.raise_for_status()
+            return response.json()
+
+    pokemon: list[dict[str, Any]] = await asyncio.gather(
+        *(fetch(url=entry["url"]) for entry in listing["results"])
+    )
+    pokemon.sort(key=lambda data: data["id"])
+
+    columns: dict[str, list[Any]] = {
+        field: []
+        for field in (
+            "id",
+            "name",
+            "generation",
+            "height",
+            "weight",
+            *STAT_NAMES,
+            "types",
+            "abilities",
+        )
+    }
+    for data in pokemon:
+        stats: dict[str, int] = {
+            s["stat"]["name"]: s["base_stat"] for s in data["stats"]
+        }
+        columns["id"].append(data["id"])
+        columns["name"].append(data["name"])
+        columns["generation"].append(species_generation.get(data["species"]["name"], 0))
+        columns["height"].append(data.get("height") or 0)
+        columns["weight"].append(data.get("weight") or 0)
+        for stat in STAT_NAMES:
+            columns[stat].append(stats.get(stat, 0))
+        columns["types"].append([t["type"]["name"] for t in data["types"]])
+        columns["abilities"].append([a["ability"]["name"] for a in data["abilities"]])
+    return columns
+
+
+def save_snapshot(columns: dict[str, list[Any]], path: Path) -> None:
+    """Write snapshot columns as gzipped JSON."""
+    with gzip.open(filename=path, mode="wt", encoding="utf-8") as f:
+        json.dump(
+            obj={"version": SNAPSHOT_VERSION, "columns": columns},
+            fp=f,
+            separators=(",", ":"),
+        )
+
+
+async def main(path: Path) -> None:
+    async with AsyncClient(timeout=30.0) as client:
+        columns: dict[str, list[Any]] = await build_snapshot(client=client)
+    save_snapshot(columns=columns, path=path)
+    print(f"Saved {len(columns['id'])} Pokemon to {path}.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print(
+            "Usage: python pokedex.py build [snapshot_path]\n"
+            f"Example: python pokedex.py build {DEFAULT_SNAPSHOT_PATH.name}\n"
+        )
+        sys.exit(1)
+
+    snapshot_path: Path = (
+        Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SNAPSHOT_PATH
+    )
+    asyncio.run(main=main(path=snapshot_path))
@@ -1,41 +1,372 @@
+import asyncio
+import itertools
+import json
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
 from typing import Any
 
-from httpx import AsyncClient, HTTPStatusError, RequestError, Response
+import numpy as np
+from cache import MemoryCache, SingleFlight, SQLiteCache, TieredCache
+from httpx import (
+    AsyncClient,
+    HTTPStatusError,
+    Limits,
+    RequestError,
+    Response,
+    Timeout,
+)
 from mcp.server import FastMCP
+from pokedex import DEFAULT_SNAPSHOT_PATH, RANKABLE_FIELDS, Pokedex
+from resilience import (
+    RETRYABLE_STATUS_CODES,
+    CircuitBreaker,
+    RetryPolicy,
+    TokenBucket,
+    parse_retry_after,
+)
+from team_analysis import TeamMatrix, candidate_squads
+
+# Pokemon API endpoint (overridable, e.g. to point benchmarks at a local stub)
+POKEAPI_URL: str = os.getenv(
+    key="POKEAPI_URL", default="https://pokeapi.co/api/v2/pokemon/"
+)
+
+# HTTP client settings (overridable through the environment); timeouts are per attempt
+POKEAPI_HTTP2: bool = os.getenv(key="POKEAPI_HTTP2", default="true").lower() == "true"
+POKEAPI_LIMITS = Limits(
+    max_connections=int(os.getenv(key="POKEAPI_MAX_CONNECTIONS", default="20")),
+    max_keepalive_connections=int(
+        os.getenv(key="POKEAPI_MAX_KEEPALIVE_CONNECTIONS", default="10")
+    ),
+    keepalive_expiry=float(os.getenv(key="POKEAPI_KEEPALIVE_EXPIRY", default="30")),
+)
+POKEAPI_TIMEOUT = Timeout(
+    timeout=float(os.getenv(key="POKEAPI_TIMEOUT", default="10")),
+    connect=float(os.getenv(key="POKEAPI_CONNECT_TIMEOUT", default="5")),
+)
+
+# Upstream resilience settings; a POKEAPI_RATE_LIMIT of 0 disables rate limiting
+POKEAPI_MAX_ATTEMPTS: int = int(os.getenv(key="POKEAPI_MAX_ATTEMPTS", default="3"))
+POKEAPI_RETRY_BASE_DELAY: float = float(
+    os.getenv(key="POKEAPI_RETRY_BASE_DELAY", default="0.5")
+)
+POKEAPI_RETRY_MAX_DELAY: float = float(
+    os.getenv(key="POKEAPI_RETRY_MAX_DELAY", default="5")
+)
+POKEAPI_BREAKER_THRESHOLD: int = int(
+    os.getenv(key="POKEAPI_BREAKER_THRESHOLD", default="5")
+)
+POKEAPI_BREAKER_RESET: float = float(
+    os.getenv(key="POKEAPI_BREAKER_RESET", default="30")
+)
+POKEAPI_RATE_LIMIT: float = float(os.getenv(key="POKEAPI_RATE_LIMIT", default="20"))
+POKEAPI_RATE_BURST: float = float(os.getenv(key="POKEAPI_RATE_BURST", default="20"))
+
+# Fan-out settings for multi-Pokemon tools
+POKEAPI_MAX_CONCURRENCY: int = int(
+    os.getenv(key="POKEAPI_MAX_CONCURRENCY", default="5")
+)
+POKEAPI_REQUEST_DEADLINE: float = float(
+    os.getenv(key="POKEAPI_REQUEST_DEADLINE", default="15")
+)
+
+# Response cache settings; an empty POKEAPI_CACHE_PATH disables the disk tier
+POKEAPI_CACHE_SIZE: int = int(os.getenv(key="POKEAPI_CACHE_SIZE", default="512"))
+POKEAPI_CACHE_TTL: float = float(os.getenv(key="POKEAPI_CACHE_TTL", default="86400"))
+POKEAPI_DISK_CACHE_TTL: float = float(
+    os.getenv(key="POKEAPI_DISK_CACHE_TTL", default=str(30 * 86400))
+)
+POKEAPI_CACHE_PATH: str = os.getenv(
+    key="POKEAPI_CACHE_PATH",
+    default=str(Path(__file__).parent / "pokeapi_cache.sqlite3"),
+)
+
+# Offline Pokedex snapshot, built with `python pokedex.py build`
+POKEDEX_SNAPSHOT_PATH: Path = Path(
+    os.getenv(key="POKEDEX_SNAPSHOT_PATH", default=str(DEFAULT_SNAPSHOT_PATH))
+)
+
+# Most popular tournament Pokemon, also the default squad
+POPULAR_POKEMON: list[str] = [
+    "charizard",
+    "garchomp",
+    "lucario",
+    "dragonite",
+    "metagross",
+    "gardevoir",
+    "tyranitar",
+    "entei",
+    "suicune",
+    "raikou",
+]
+
+# Cache of compact PokeAPI records, keyed by normalized name with ID aliases
+pokemon_cache = TieredCache(
+    memory=MemoryCache(maxsize=POKEAPI_CACHE_SIZE, ttl=POKEAPI_CACHE_TTL),
+    disk=SQLiteCache(path=Path(POKEAPI_CACHE_PATH), ttl=POKEAPI_DISK_CACHE_TTL)
+    if POKEAPI_CACHE_PATH
+    else None,
+)
+
+# Upstream fetches currently in flight, keyed like the cache
+pokemon_inflight = SingleFlight()
+
+# Retries, circuit breaker and rate limiter guarding every PokeAPI request
+pokeapi_retry = RetryPolicy(
+    max_attempts=POKEAPI_MAX_ATTEMPTS,
+    base_delay=POKEAPI_RETRY_BASE_DELAY,
+    max_delay=POKEAPI_RETRY_MAX_DELAY,
+)
+pokeapi_breaker = CircuitBreaker(
+    failure_threshold=POKEAPI_BREAKER_THRESHOLD, reset_timeout=POKEAPI_BREAKER_RESET
+)
+pokeapi_rate_limiter = TokenBucket(rate=POKEAPI_RATE_LIMIT, capacity=POKEAPI_RATE_BURST)
+
+# Offline Pokedex, loaded with the server lifespan when a snapshot exists
+pokedex: Pokedex | None = None
+
+# Shared HTTP client, created lazily and closed with the server lifespan
+_http_client: AsyncClient | None = None
+
+
+def get_http_client() -> AsyncClient:
+    """
+    Return the shared PokeAPI client, creating it on first use.
+
+    The client keeps a pool of keep-alive (HTTP/2 when available) connections
+    so consecutive lookups reuse the same TCP+TLS session.
+    """
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        _http_client = AsyncClient(
+            http2=POKEAPI_HTTP2,
+            limits=POKEAPI_LIMITS,
+            timeout=POKEAPI_TIMEOUT,
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared PokeAPI client and release its pooled connections."""
+    global _http_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def load_pokedex(path: Path = POKEDEX_SNAPSHOT_PATH) -> Pokedex | None:
+    """Load the offline Pokedex snapshot, if one has been built."""
+    global pokedex
+
+    if pokedex is None and path.exists():
+        pokedex = Pokedex.load(path=path)
+    return pokedex
+
+
+# Server lifespan: open the shared client and Pokedex on startup, close on shutdown
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    get_http_client()
+    load_pokedex()
+    try:
+        yield
+    finally:
+        await close_http_client()
+        pokemon_cache.close()
+
 
 # Initialize the FastMCP server
-mcp = FastMCP(name="pokemon")
+mcp = FastMCP(name="pokemon", lifespan=lifespan)
+
 
-# Pokemon API endpoint
-POKEAPI_URL = "https://pokeapi.co/api/v2/pokemon/"
+def normalize_pokemon_key(pokemon_name: str) -> str:
+    """
+    Normalize a Pokemon name or ID so equivalent lookups share a cache entry
+    (e.g. 'Pikachu', ' pikachu ' -> 'pikachu' and '025' -> '25').
+    """
+    key: str = pokemon_name.lower().strip()
+    return str(int(key)) if key.isdigit() else key
+
+
+def _compact_pokemon_data(data: dict[Any, Any]) -> dict[Any, Any]:
+    """
+    Keep only the fields the tools use, in the PokeAPI's own shape.
+    Full responses carry moves, sprites and game indices that are never read.
+    """
+    compact: dict[Any, Any] = {
+        key: data[key] for key in ("id", "name", "height", "weight") if key in data
+    }
+    if "stats" in data:
+        compact["stats"] = [
+            {"stat": {"name": s["stat"]["name"]}, "base_stat": s["base_stat"]}
+            for s in data["stats"]
+        ]
+    if "types" in data:
+        compact["types"] = [
+            {"type": {"name": t["type"]["name"]}} for t in data["types"]
+        ]
+    if "abilities" in data:
+        compact["abilities"] = [
+            {"ability": {"name": a["ability"]["name"]}} for a in data["abilities"]
+        ]
+    return compact
 
 
 # Fetch data from the PokeAPI
 async def fetch_pokemon_data(pokemon_name: str) -> dict:
-    """Fetch data from the PokeAPI."""
+    """
+    Fetch data from the PokeAPI.
+
+    Requests pass through the circuit breaker, and every attempt through the
+    client-side rate limiter. Connection errors, timeouts and 429/5xx
+    responses are retried with jittered exponential backoff, honoring
+    Retry-After; the breaker counts a failure only once retries are
+    exhausted. Errors caused by an unavailable upstream are flagged with
+    "unavailable": True.
+    """
+
+    pokemon_name = normalize_pokemon_key(pokemon_name=pokemon_name)
+    client: AsyncClient = get_http_client()
+
+    if not pokeapi_breaker.allow_request():
+        return {
+            "error": f"Circuit Open: the PokeAPI is unavailable, retrying in {pokeapi_breaker.retry_in():.0f}s.",
+            "unavailable": True,
+        }
 
-    pokemon_name = pokemon_name.lower().strip()
+    for attempt in itertools.count(start=1):
+        await pokeapi_rate_limiter.acquire()
 
-    async with AsyncClient() as client:
         try:
             response: Response = await client.get(url=f"{POKEAPI_URL}{pokemon_name}")
+
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                delay: float | None = pokeapi_retry.delay(
+                    attempt=attempt,
+                    retry_after=parse_retry_after(
+                        value=response.headers.get("Retry-After")
+                    ),
+                )
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    continue
+
             response.raise_for_status()
+            pokeapi_breaker.record_success()
 
             if response.status_code == 200:
                 return response.json()
+            return {}
 
         except RequestError as exc:
-            return {"error": f"Request Error: {exc.request.url!r}."}
+            delay = pokeapi_retry.delay(attempt=attempt)
+            if delay is None:
+                pokeapi_breaker.record_failure()
+                return {
+                    "error": f"Request Error: {exc.request.url!r}.",
+                    "unavailable": True,
+                }
+            await asyncio.sleep(delay)
 
         except HTTPStatusError as exc:
+            retryable: bool = exc.response.status_code in RETRYABLE_STATUS_CODES
+            if retryable:
+                pokeapi_breaker.record_failure()
+            else:
+                # The upstream answered (e.g. 404 for an unknown Pokemon)
+                pokeapi_breaker.record_success()
             return {
-                "error": f"Response Error: {exc.response.status_code} while requesting {exc.request.url!r}."
+                "error": f"Response Error: {exc.response.status_code} while requesting {exc.request.url!r}.",
+                "unavailable": retryable,
             }
 
         except Exception as exc:
+            pokeapi_breaker.record_failure()
             return {"error": f"Exception Error: {exc}"}
 
-    return {}
+
+# Look up Pokemon data through the cache
+async def lookup_pokemon_data(pokemon_name: str) -> dict:
+    """
+    Return Pokemon data from the cache or the offline Pokedex, fetching it
+    from the PokeAPI only when neither has it.
+
+    Concurrent misses for the same normalized key share one upstream fetch.
+    Successful responses are stored in compact form under the Pokemon's name,
+    with the requested key and its ID as aliases. Errors are never cached;
+    when the upstream is unavailable an expired entry is served instead.
+    """
+    key: str = normalize_pokemon_key(pokemon_name=pokemon_name)
+
+    cached: dict | None = await pokemon_cache.aget(key)
+    if cached is not None:
+        return cached
+
+    if pokedex is not None:
+        row: int | None = pokedex.find(pokemon_name=key)
+        if row is not None:
+            return pokedex.pokeapi_data(row=row)
+
+    return await pokemon_inflight.do(key, lambda: _fetch_and_cache(key=key))
+
+
+async def _fetch_and_cache(key: str) -> dict:
+    """Fetch a normalized key from the PokeAPI and cache a successful result."""
+    data: dict[Any, Any] = await fetch_pokemon_data(pokemon_name=key)
+    if data.get("unavailable"):
+        stale: dict | None = await pokemon_cache.aget_stale(key)
+        if stale is not None:
+            return stale
+    if "error" in data or "name" not in data:
+        return data
+
+    record: dict[Any, Any] = _compact_pokemon_data(data=data)
+    aliases: tuple[str, ...] = (key, str(record["id"])) if "id" in record else (key,)
+    await pokemon_cache.aset(record["name"], record, aliases=aliases)
+    return record
+
+
+def pokemon_record(data: dict[Any, Any]) -> dict[str, Any]:
+    """Flatten PokeAPI data into a compact row of id, name, types, abilities and stats."""
+    return {
+        "id": data.get("id"),
+        "name": data.get("name"),
+        "types": [t["type"]["name"] for t in data.get("types", [])],
+        "abilities": [a["ability"]["name"] for a in data.get("abilities", [])],
+        "stats": {s["stat"]["name"]: s["base_stat"] for s in data.get("stats", [])},
+    }
+
+
+# Fetch several Pokemon concurrently from the PokeAPI
+async def fetch_pokemon_batch(
+    pokemon_names: list[str],
+    max_concurrency: int = POKEAPI_MAX_CONCURRENCY,
+    deadline: float = POKEAPI_REQUEST_DEADLINE,
+) -> list[dict]:
+    """
+    Fetch data for several Pokemon concurrently, in the order given.
+
+    At most `max_concurrency` requests are in flight at once and each one must
+    finish within `deadline` seconds. A failed lookup yields an {"error": ...}
+    entry instead of aborting the rest of the batch.
+    """
+    semaphore = asyncio.Semaphore(value=max(1, max_concurrency))
+
+    async def fetch_one(pokemon_name: str) -> dict:
+        async with semaphore:
+            try:
+                async with asyncio.timeout(delay=deadline):
+                    return await lookup_pokemon_data(pokemon_name=pokemon_name)
+            except TimeoutError:
+                return {
+                    "error": f"Timeout Error: no response for '{pokemon_name}' within {deadline}s."
+                }
+
+    return await asyncio.gather(*(fetch_one(name) for name in pokemon_names))
 
 
 # Tool: Get information about a Pokemon
@@ -48,7 +379,7 @@ async def get_pokemon_info(pokemon_name: str) -> str:
     Returns:
         str: A formatted string containing the Pokemon's information, or an error message if not found or an error occurs.
     """
-    data: dict[Any, Any] = await fetch_pokemon_data(pokemon_name=pokemon_name)
+    data: dict[Any, Any] = await lookup_pokemon_data(pokemon_name=pokemon_name)
 
     if "error" in data:
         return data["error"]
@@ -84,38 +415,178 @@ async def get_pokemon_info(pokemon_name: str) -> str:
     """
 
 
+# Tool: Get information about many Pokemon at once
+@mcp.tool()
+async def get_pokemon_info_batch(pokemon_names: str) -> str:
+    """
+    Get compact information about many Pokemon in one call, fetched concurrently.
+    Args:
+        pokemon_names (str): Comma-separated list of Pokemon names or IDs (e.g., 'pikachu, 6, bulbasaur').
+    Returns:
+        str: A JSON object with a "pokemon" list of rows (id, name, types, abilities, stats)
+            and an "errors" list of {"query", "error"} entries for lookups that failed.
+    """
+    names: list[str] = list(
+        dict.fromkeys(
+            normalize_pokemon_key(pokemon_name=name)
+            for name in pokemon_names.split(",")
+            if name.strip()
+        )
+    )
+    if not names:
+        return json.dumps({"pokemon": [], "errors": []})
+
+    results: list[dict] = await fetch_pokemon_batch(pokemon_names=names)
+
+    rows: list[dict[str, Any]] = []
+    errors: list[dict[str, str]] = []
+
+    for name, data in zip(names, results):
+        if "error" in data or "name" not in data:
+            errors.append(
+                {"query": name, "error": data.get("error", "No data returned")}
+            )
+            continue
+        try:
+            rows.append(pokemon_record(data=data))
+        except (KeyError, TypeError) as exc:
+            errors.append(
+                {"query": name, "error": f"Pokemon data processing Error: {exc}"}
+            )
+
+    return json.dumps({"pokemon": rows, "errors": errors}, separators=(",", ":"))
+
+
+# Fetch Pokemon into a team matrix, collecting the ones that failed
+async def _load_team_matrix(
+    pokemon_names: str,
+) -> tuple[TeamMatrix, list[dict[str, str]]]:
+    names: list[str] = list(
+        dict.fromkeys(
+            normalize_pokemon_key(pokemon_name=name)
+            for name in pokemon_names.split(",")
+            if name.strip()
+        )
+    )
+    results: list[dict] = await fetch_pokemon_batch(pokemon_names=names)
+
+    records: list[dict[str, Any]] = []
+    errors: list[dict[str, str]] = []
+    for name, data in zip(names, results):
+        if "error" in data or "name" not in data:
+            errors.append(
+                {"query": name, "error": data.get("error", "No data returned")}
+            )
+            continue
+        try:
+            records.append(pokemon_record(data=data))
+        except (KeyError, TypeError) as exc:
+            errors.append(
+                {"query": name, "error": f"Pokemon data processing Error: {exc}"}
+            )
+    return TeamMatrix(records=records), errors
+
+
+# Tool: Analyze a team
+@mcp.tool()
+async def analyze_team(pokemon_names: str) -> str:
+    """
+    Analyze a team's type matchups, offensive coverage gaps and base stats.
+    Args:
+        pokemon_names (str): Comma-separated list of Pokemon names or IDs (e.g., 'charizard, garchomp, lucario').
+    Returns:
+        str: A JSON object with the members, per-attacking-type weak/resist/immune counts,
+            shared weaknesses, offensive coverage and gaps, stat aggregates (total, mean, min,
+            max, normalized mean), a team score in [0, 1], and any lookups that failed.
+    """
+    team, errors = await _load_team_matrix(pokemon_names=pokemon_names)
+    if not len(team):
+        return json.dumps({"error": "No valid Pokemon to analyze.", "errors": errors})
+
+    analysis: dict[str, Any] = team.analyze(squad=np.arange(len(team)))
+    return json.dumps({**analysis, "errors": errors}, separators=(",", ":"))
+
+
+# Tool: Find the best team from a pool of Pokemon
+@mcp.tool()
+async def find_best_team(
+    pokemon_names: str, team_size: int = 6, max_candidates: int = 20000, top: int = 3
+) -> str:
+    """
+    Search team compositions drawn from a pool of Pokemon and return the best-scoring ones.
+    Every combination is scored when there are at most max_candidates, otherwise a random sample.
+    Args:
+        pokemon_names (str): Comma-separated pool of Pokemon names or IDs to pick from.
+        team_size (int): Number of Pokemon per team (1-6). Defaults to 6.
+        max_candidates (int): Maximum number of candidate teams to score (at most
+            200000). Defaults to 20000.
+        top (int): Number of best teams to return. Defaults to 3.
+    Returns:
+        str: A JSON object with the number of teams scored, the best teams with their
+            analysis, and any lookups that failed.
+    """
+    team_size = min(max(1, team_size), 6)
+    pool, errors = await _load_team_matrix(pokemon_names=pokemon_names)
+    if len(pool) < team_size:
+        return json.dumps(
+            {
+                "error": f"Need at least {team_size} valid Pokemon, got {len(pool)}.",
+                "errors": errors,
+            }
+        )
+
+    squads: np.ndarray = candidate_squads(
+        pool_size=len(pool),
+        team_size=team_size,
+        max_candidates=max(1, max_candidates),
+    )
+    scores: np.ndarray = pool.score(squads=squads)
+    best: np.ndarray = np.argsort(-scores, kind="stable")[: max(1, top)]
+
+    return json.dumps(
+        {
+            "scored": len(squads),
+            "teams": [pool.analyze(squad=squads[i]) for i in best],
+            "errors": errors,
+        },
+        separators=(",", ":"),
+    )
+
+
 # Tool: Create a tournament squad
 @mcp.tool()
-async def create_tournament_squad() -> str:
+async def create_tournament_squad(pokemon_names: str = "") -> str:
     """
     Create a tournament squad with the specified Pokemon names.
     Args:
         pokemon_names (str): Comma-separated list of Pokemon names (e.g., 'pikachu, charizard, bulbasaur').
+            Defaults to the most popular tournament Pokemon when empty.
     Returns:
-        str: A formatted string listing the Pokemon in the tournament squad.
+        str: A formatted string listing the Pokemon in the tournament squad,
+            followed by any members that could not be fetched.
     """
-    top_pokemon: list[str] = [
-        "charizard",
-        "garchomp",
-        "lucario",
-        "dragonite",
-        "metagross",
-        "gardevoir",
-        "tyranitar",
-        "entei",
-        "suicune",
-        "raikou",
-    ]
+    names: list[str] = [
+        name.strip() for name in pokemon_names.split(",") if name.strip()
+    ] or POPULAR_POKEMON
+
+    results: list[dict] = await fetch_pokemon_batch(pokemon_names=names)
+
+    squad: list[str] = []
+    failed: list[str] = []
 
-    squd: list[str] = []
+    for name, data in zip(names, results):
+        if "error" in data or "name" not in data:
+            failed.append(f"{name} ({data.get('error', 'No data returned')})")
+        else:
+            squad.append(data["name"].capitalize())
 
-    for pokemon in top_pokemon:
-        data: dict[Any, Any] = await fetch_pokemon_data(pokemon_name=pokemon)
-        if "error" in data:
-            return data["error"]
-        squd.append(data["name"].capitalize())
+    if not squad:
+        return "Could not build a tournament squad:\n\n " + "\n ".join(failed)
 
-    return f"Your tournament squad: \n\n {', '.join(squd)}"
+    result: str = f"Your tournament squad: \n\n {', '.join(squad)}"
+    if failed:
+        result += "\n\nFailed to fetch: \n\n " + "\n ".join(failed)
+    return result
 
 
 # Tool: List popular Pokemon
@@ -126,20 +597,70 @@ async def list_popular_pokemon() -> str:
     Returns:
         str: A formatted string listing the top 10 popular Pokemon.
     """
-    top_pokemon: list[str] = [
-        "charizard",
-        "garchomp",
-        "lucario",
-        "dragonite",
-        "metagross",
-        "gardevoir",
-        "tyranitar",
-        "entei",
-        "suicune",
-        "raikou",
-    ]
-
-    return f"Top 10 popular Pokemon: \n\n {', '.join(top_pokemon)}"
+    return f"Top 10 popular Pokemon: \n\n {', '.join(POPULAR_POKEMON)}"
+
+
+# Tool: Search the offline Pokedex
+@mcp.tool()
+async def search_pokedex(
+    type: str = "",
+    ability: str = "",
+    generation: int = 0,
+    sort_by: str = "total",
+    limit: int = 10,
+    ascending: bool = False,
+) -> str:
+    """
+    Filter and rank every Pokemon in the offline Pokedex snapshot, without calling the PokeAPI.
+    Example: the top 10 dragon types by speed is type='dragon', sort_by='speed', limit=10.
+    Args:
+        type (str): Only include Pokemon with this type (e.g., 'dragon'). Empty for any.
+        ability (str): Only include Pokemon with this ability (e.g., 'levitate'). Empty for any.
+        generation (int): Only include Pokemon introduced in this generation (1-9). 0 for any.
+        sort_by (str): Field to rank by: a base stat ('hp', 'attack', 'defense', 'special-attack',
+            'special-defense', 'speed'), 'total', 'height', 'weight' or 'id'. Defaults to 'total'.
+        limit (int): Maximum number of Pokemon to return. Defaults to 10.
+        ascending (bool): Rank lowest first instead of highest first. Defaults to False.
+    Returns:
+        str: A JSON object with the number of matches and the ranked rows, or an error message.
+    """
+    if pokedex is None:
+        return "No Pokedex snapshot loaded. Build one with 'python pokedex.py build'."
+    if sort_by not in RANKABLE_FIELDS:
+        return f"Invalid sort_by: must be one of {', '.join(RANKABLE_FIELDS)}."
+
+    rows: list[int] | None = pokedex.filter(
+        type=type, ability=ability, generation=generation
+    )
+    ranked: list[int] = pokedex.rank(
+        sort_by=sort_by, rows=rows, limit=limit, descending=not ascending
+    )
+    return json.dumps(
+        {
+            "count": len(pokedex) if rows is None else len(rows),
+            "pokemon": [pokedex.record(row=row) for row in ranked],
+        },
+        separators=(",", ":"),
+    )
+
+
+# Resource: Cache statistics
+@mcp.resource(uri="pokemon://cache/stats")
+async def get_cache_stats() -> str:
+    """
+    Report hit, miss and eviction counters for each PokeAPI cache tier.
+    Returns:
+        str: A JSON object with the counters of the memory and disk tiers,
+            how many lookups joined an upstream fetch already in flight,
+            and the state of the PokeAPI circuit breaker.
+    """
+    return json.dumps(
+        {
+            **pokemon_cache.stats(),
+            "coalesced": pokemon_inflight.coalesced,
+            "circuit": pokeapi_breaker.state,
+        }
+    )
 
 
 # Entry point for the FastMCP server
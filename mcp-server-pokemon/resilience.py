@@ -0,0 +1,153 @@
+# resilience.py
+
+"""
+Upstream resilience helpers for the pokemon server.
+
+- RetryPolicy: exponential backoff with full jitter, honoring Retry-After.
+- CircuitBreaker: fails fast after repeated upstream failures, then lets a
+  single probe request through once the reset timeout has passed.
+- TokenBucket: a client-side rate limiter that smooths bursts of requests.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+# HTTP status codes worth retrying
+RETRYABLE_STATUS_CODES: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header (delay in seconds or an HTTP date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at: datetime = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max(0.0, (retry_at - datetime.now(tz=UTC)).total_seconds())
+
+
+@dataclass
+class RetryPolicy:
+    """How many attempts to make and how long to wait between them."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 5.0
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float | None:
+        """
+        Return the delay before retrying after `attempt` (1-based) failed,
+        or None when no further attempt should be made.
+
+        A Retry-After longer than `max_delay` also stops retrying, since
+        waiting that long would hold the caller past any useful deadline.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+
+class CircuitBreaker:
+    """
+    A closed/open/half-open circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests are rejected for `reset_timeout` seconds. Then one probe request
+    is let through: success closes the circuit, failure opens it again. A
+    probe that never reports back (e.g. cancelled) is replaced after another
+    `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.failures: int = 0
+        self._opened_at: float | None = None
+        self._probe_started: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def retry_in(self) -> float:
+        """Seconds until the circuit lets a probe request through."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow_request(self) -> bool:
+        """Return whether a request may be sent to the upstream now."""
+        state: str = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+
+        now: float = time.monotonic()
+        if (
+            self._probe_started is None
+            or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probe_started = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probe_started is not None or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._probe_started = None
+
+
+class TokenBucket:
+    """
+    An async token-bucket rate limiter allowing `rate` requests per second
+    with bursts of up to `capacity`. A rate of 0 disables limiting.
+
+    Tokens are reserved before waiting, so concurrent callers queue up in
+    arrival order without needing a lock.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate: float = rate
+        self.capacity: float = max(1.0, capacity)
+        self._tokens: float = self.capacity
+        self._updated: float = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        if self.rate <= 0:
+            return
+
+        now: float = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        self._tokens -= 1
+
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
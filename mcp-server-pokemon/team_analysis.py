@@ -0,0 +1,361 @@
+# team_analysis.py
+
+"""
+Vectorized team analysis for the pokemon server.
+
+A roster of Pokemon is turned into NumPy arrays once: a base-stat matrix,
+each member's defensive multipliers against every attacking type, and the
+best STAB multiplier each member gets against every defending type. Squads
+are then analysed and scored as batched fancy-indexing operations over those
+arrays, so thousands of candidate squads can be scored in one call.
+"""
+
+import itertools
+import math
+from typing import Any
+
+import numpy as np
+from pokedex import STAT_NAMES
+
+# Pokemon types, in the order used by every type-indexed array
+TYPES: tuple[str, ...] = (
+    "normal",
+    "fire",
+    "water",
+    "electric",
+    "grass",
+    "ice",
+    "fighting",
+    "poison",
+    "ground",
+    "flying",
+    "psychic",
+    "bug",
+    "rock",
+    "ghost",
+    "dragon",
+    "dark",
+    "steel",
+    "fairy",
+)
+TYPE_INDEX: dict[str, int] = {name: i for i, name in enumerate(TYPES)}
+
+# Column used for a Pokemon's missing second type (always neutral)
+NO_TYPE: int = len(TYPES)
+
+# Highest base stat a Pokemon can have
+MAX_BASE_STAT: float = 255.0
+
+# Most candidate squads scored per search, however many are asked for
+MAX_CANDIDATES: int = 200_000
+
+# Rounds of drawing more squads when sampling turned up too few distinct ones
+SAMPLE_ROUNDS: int = 4
+
+# Weights of the squad score components (each component is in [0, 1])
+COVERAGE_WEIGHT: float = 0.4
+DEFENSE_WEIGHT: float = 0.3
+STATS_WEIGHT: float = 0.3
+
+# Attack multipliers that differ from 1x, by attacking type
+_EFFECTIVENESS: dict[str, dict[str, float]] = {
+    "normal": {"rock": 0.5, "ghost": 0.0, "steel": 0.5},
+    "fire": {
+        "fire": 0.5,
+        "water": 0.5,
+        "grass": 2.0,
+        "ice": 2.0,
+        "bug": 2.0,
+        "rock": 0.5,
+        "dragon": 0.5,
+        "steel": 2.0,
+    },
+    "water": {
+        "fire": 2.0,
+        "water": 0.5,
+        "grass": 0.5,
+        "ground": 2.0,
+        "rock": 2.0,
+        "dragon": 0.5,
+    },
+    "electric": {
+        "water": 2.0,
+        "electric": 0.5,
+        "grass": 0.5,
+        "ground": 0.0,
+        "flying": 2.0,
+        "dragon": 0.5,
+    },
+    "grass": {
+        "fire": 0.5,
+        "water": 2.0,
+        "grass": 0.5,
+        "poison": 0.5,
+        "ground": 2.0,
+        "flying": 0.5,
+        "bug": 0.5,
+        "rock": 2.0,
+        "dragon": 0.5,
+        "steel": 0.5,
+    },
+    "ice": {
+        "fire": 0.5,
+        "water": 0.5,
+        "grass": 2.0,
+        "ice": 0.5,
+        "ground": 2.0,
+        "flying": 2.0,
+        "dragon": 2.0,
+        "steel": 0.5,
+    },
+    "fighting": {
+        "normal": 2.0,
+        "ice": 2.0,
+        "poison": 0.5,
+        "flying": 0.5,
+        "psychic": 0.5,
+        "bug": 0.5,
+        "rock": 2.0,
+        "ghost": 0.0,
+        "dark": 2.0,
+        "steel": 2.0,
+        "fairy": 0.5,
+    },
+    "poison": {
+        "grass": 2.0,
+        "poison": 0.5,
+        "ground": 0.5,
+        "rock": 0.5,
+        "ghost": 0.5,
+        "steel": 0.0,
+        "fairy": 2.0,
+    },
+    "ground": {
+        "fire": 2.0,
+        "electric": 2.0,
+        "grass": 0.5,
+        "poison": 2.0,
+        "flying": 0.0,
+        "bug": 0.5,
+        "rock": 2.0,
+        "steel": 2.0,
+    },
+    "flying": {
+        "electric": 0.5,
+        "grass": 2.0,
+        "fighting": 2.0,
+        "bug": 2.0,
+        "rock": 0.5,
+        "steel": 0.5,
+    },
+    "psychic": {
+        "fighting": 2.0,
+        "poison": 2.0,
+        "psychic": 0.5,
+        "dark": 0.0,
+        "steel": 0.5,
+    },
+    "bug": {
+        "fire": 0.5,
+        "grass": 2.0,
+        "fighting": 0.5,
+        "poison": 0.5,
+        "flying": 0.5,
+        "psychic": 2.0,
+        "ghost": 0.5,
+        "dark": 2.0,
+        "steel": 0.5,
+        "fairy": 0.5,
+    },
+    "rock": {
+        "fire": 2.0,
+        "ice": 2.0,
+        "fighting": 0.5,
+        "ground": 0.5,
+        "flying": 2.0,
+        "bug": 2.0,
+        "steel": 0.5,
+    },
+    "ghost": {"normal": 0.0, "psychic": 2.0, "ghost": 2.0, "dark": 0.5},
+    "dragon": {"dragon": 2.0, "steel": 0.5, "fairy": 0.0},
+    "dark": {
+        "fighting": 0.5,
+        "psychic": 2.0,
+        "ghost": 2.0,
+        "dark": 0.5,
+        "fairy": 0.5,
+    },
+    "steel": {
+        "fire": 0.5,
+        "water": 0.5,
+        "electric": 0.5,
+        "ice": 2.0,
+        "rock": 2.0,
+        "steel": 0.5,
+        "fairy": 2.0,
+    },
+    "fairy": {
+        "fire": 0.5,
+        "fighting": 2.0,
+        "poison": 0.5,
+        "dragon": 2.0,
+        "dark": 2.0,
+        "steel": 0.5,
+    },
+}
+
+
+def _type_chart() -> np.ndarray:
+    """Build the attacking x defending multiplier matrix, plus a neutral column."""
+    chart: np.ndarray = np.ones((len(TYPES), len(TYPES) + 1), dtype=np.float32)
+    for attacking, row in _EFFECTIVENESS.items():
+        for defending, multiplier in row.items():
+            chart[TYPE_INDEX[attacking], TYPE_INDEX[defending]] = multiplier
+    return chart
+
+
+# TYPE_CHART[attacking, defending]; column NO_TYPE is 1x against everything
+TYPE_CHART: np.ndarray = _type_chart()
+
+
+class TeamMatrix:
+    """
+    A roster of Pokemon as NumPy arrays, for analysing and scoring squads.
+
+    Rows are built from `pokemon_record` dicts (id, name, types, abilities,
+    stats). Squads are integer arrays of row indices into the roster.
+    """
+
+    def __init__(self, records: list[dict[str, Any]]) -> None:
+        self.names: list[str] = [record["name"] for record in records]
+        self.stats: np.ndarray = np.array(
+            [[record["stats"].get(s, 0) for s in STAT_NAMES] for record in records],
+            dtype=np.float32,
+        ).reshape(len(records), len(STAT_NAMES))
+
+        types: np.ndarray = np.full((len(records), 2), NO_TYPE, dtype=np.intp)
+        for row, record in enumerate(records):
+            known: list[int] = [
+                TYPE_INDEX[t] for t in record["types"] if t in TYPE_INDEX
+            ]
+            types[row, : len(known[:2])] = known[:2]
+        self.types: np.ndarray = types
+
+        # defense[p, a]: damage multiplier member p takes from attacking type a
+        self.defense: np.ndarray = (
+            TYPE_CHART[:, types[:, 0]] * TYPE_CHART[:, types[:, 1]]
+        ).T
+
+        # offense[p, d]: best STAB multiplier member p deals to defending type d
+        stab: np.ndarray = np.vstack(
+            [TYPE_CHART[:, : len(TYPES)], np.ones((1, len(TYPES)), dtype=np.float32)]
+        )
+        self.offense: np.ndarray = np.maximum(stab[types[:, 0]], stab[types[:, 1]])
+
+        # Base stat totals scaled to [0, 1]
+        self.normalized_totals: np.ndarray = self.stats.sum(axis=1) / (
+            MAX_BASE_STAT * len(STAT_NAMES)
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def score(self, squads: np.ndarray) -> np.ndarray:
+        """
+        Score a (k, m) batch of squads; higher is better.
+
+        The score mixes offensive coverage (share of types hit super
+        effectively by some member's STAB), defensive balance (share of
+        attacking types that do not hit more members weakly than resisted),
+        and the squad's mean normalized base stat total.
+        """
+        defense: np.ndarray = self.defense[squads]
+        weak: np.ndarray = (defense > 1).sum(axis=1)
+        resist: np.ndarray = (defense < 1).sum(axis=1)
+        exposed: np.ndarray = (weak > resist).mean(axis=1)
+
+        coverage: np.ndarray = (self.offense[squads].max(axis=1) > 1).mean(axis=1)
+        stats: np.ndarray = self.normalized_totals[squads].mean(axis=1)
+
+        return (
+            COVERAGE_WEIGHT * coverage
+            + DEFENSE_WEIGHT * (1 - exposed)
+            + STATS_WEIGHT * stats
+        )
+
+    def analyze(self, squad: np.ndarray) -> dict[str, Any]:
+        """Return type matchups, coverage gaps and stat aggregates for one squad."""
+        defense: np.ndarray = self.defense[squad]
+        weak: np.ndarray = (defense > 1).sum(axis=0)
+        resist: np.ndarray = ((defense < 1) & (defense > 0)).sum(axis=0)
+        immune: np.ndarray = (defense == 0).sum(axis=0)
+        best_offense: np.ndarray = self.offense[squad].max(axis=0)
+        stats: np.ndarray = self.stats[squad]
+
+        def per_stat(values: np.ndarray) -> dict[str, float]:
+            return {s: round(float(v), 3) for s, v in zip(STAT_NAMES, values)}
+
+        return {
+            "members": [self.names[row] for row in squad],
+            "defense": {
+                t: {"weak": int(w), "resist": int(r), "immune": int(i)}
+                for t, w, r, i in zip(TYPES, weak, resist, immune)
+            },
+            "weaknesses": [
+                t for t, w, r, i in zip(TYPES, weak, resist, immune) if w > r + i
+            ],
+            "coverage": [t for t, m in zip(TYPES, best_offense) if m > 1],
+            "coverage_gaps": [t for t, m in zip(TYPES, best_offense) if m <= 1],
+            "stats": {
+                "total": per_stat(stats.sum(axis=0)),
+                "mean": per_stat(stats.mean(axis=0)),
+                "min": per_stat(stats.min(axis=0)),
+                "max": per_stat(stats.max(axis=0)),
+                "normalized_mean": per_stat(stats.mean(axis=0) / MAX_BASE_STAT),
+            },
+            "score": round(float(self.score(squad[np.newaxis, :])[0]), 4),
+        }
+
+
+def candidate_squads(
+    pool_size: int,
+    team_size: int,
+    max_candidates: int,
+    rng: np.random.Generator | None = None,
+) -> np.ndarray:
+    """
+    Return a (k, team_size) array of squads drawn from a pool of rows.
+
+    Every combination is returned when there are at most `max_candidates`
+    (capped at MAX_CANDIDATES); otherwise up to `max_candidates` random squads
+    of distinct members are sampled, each squad at most once and with its
+    members in ascending order. Sampling only allocates (squads x team_size)
+    arrays, however large the pool.
+    """
+    max_candidates = min(max_candidates, MAX_CANDIDATES)
+    if math.comb(pool_size, team_size) <= max_candidates:
+        return np.array(
+            list(itertools.combinations(range(pool_size), team_size)), dtype=np.intp
+        ).reshape(-1, team_size)
+
+    rng = rng or np.random.default_rng()
+    # Draw members with replacement and keep the squads without repeats,
+    # drawing enough that about `missing` of them survive
+    accept: float = math.perm(pool_size, team_size) / pool_size**team_size
+    squads: np.ndarray = np.empty((0, team_size), dtype=np.intp)
+    for _ in range(SAMPLE_ROUNDS):
+        missing: int = max_candidates - len(squads)
+        if missing <= 0:
+            break
+        drawn: np.ndarray = np.sort(
+            rng.integers(
+                pool_size, size=(math.ceil(1.1 * missing / accept), team_size)
+            ),
+            axis=1,
+        ).astype(np.intp)
+        distinct: np.ndarray = drawn[(np.diff(drawn, axis=1) > 0).all(axis=1)]
+        squads = np.unique(np.concatenate([squads, distinct]), axis=0)
+    if len(squads) > max_candidates:
+        keep: np.ndarray = rng.choice(len(squads), size=max_candidates, replace=False)
+        squads = squads[np.sort(keep)]
+    return squads
@@ -1,15 +1,35 @@
+import asyncio
+import json
+import threading
+from pathlib import Path
 from typing import Any
+
+import numpy as np
+import pokemon
 import pytest
-from httpx import Response, AsyncClient
-import json
+import team_analysis
+from bench_pokemon import run_benchmark
+from cache import MemoryCache, SingleFlight, SQLiteCache, TieredCache
+from httpx import AsyncClient, ConnectError, Request, Response
+from pokedex import Pokedex, save_snapshot
 from pokemon import (
+    analyze_team,
+    close_http_client,
+    create_tournament_squad,
+    fetch_pokemon_batch,
     fetch_pokemon_data,
+    find_best_team,
+    get_http_client,
     get_pokemon_info,
-    create_tournament_squad,
+    get_pokemon_info_batch,
+    lifespan,
     list_popular_pokemon,
+    lookup_pokemon_data,
+    mcp,
+    search_pokedex,
 )
-from pathlib import Path
-
+from resilience import CircuitBreaker, RetryPolicy, TokenBucket, parse_retry_after
+from team_analysis import TeamMatrix, candidate_squads
 
 # Get the current file path
 current_dir: Path = Path(__file__).parent
@@ -26,6 +46,50 @@ with open(file=file_path, mode="r") as f:
     MOCK_POKEMON_DATA: Any = json.load(fp=f)
 
 
+@pytest.fixture(autouse=True)
+def fresh_pokemon_cache(monkeypatch: pytest.MonkeyPatch) -> TieredCache:
+    # Keep every test isolated from cached lookups and from the on-disk tier
+    cache = TieredCache(memory=MemoryCache())
+    monkeypatch.setattr(target="pokemon.pokemon_cache", name=cache)
+    monkeypatch.setattr(target="pokemon.pokedex", name=None)
+    monkeypatch.setattr(target="pokemon.pokeapi_breaker", name=CircuitBreaker())
+    monkeypatch.setattr(
+        target="pokemon.pokeapi_retry", name=RetryPolicy(base_delay=0, max_delay=0.1)
+    )
+    monkeypatch.setattr(
+        target="pokemon.pokeapi_rate_limiter", name=TokenBucket(rate=0, capacity=1)
+    )
+    return cache
+
+
+# A tiny Pokedex snapshot in columnar form
+POKEDEX_COLUMNS: dict[str, list[Any]] = {
+    "id": [1, 6, 149, 445],
+    "name": ["bulbasaur", "charizard", "dragonite", "garchomp"],
+    "generation": [1, 1, 1, 4],
+    "height": [7, 17, 22, 19],
+    "weight": [69, 905, 2100, 950],
+    "hp": [45, 78, 91, 108],
+    "attack": [49, 84, 134, 130],
+    "defense": [49, 78, 95, 95],
+    "special-attack": [65, 109, 100, 80],
+    "special-defense": [65, 85, 100, 85],
+    "speed": [45, 100, 80, 102],
+    "types": [
+        ["grass", "poison"],
+        ["fire", "flying"],
+        ["dragon", "flying"],
+        ["dragon", "ground"],
+    ],
+    "abilities": [
+        ["overgrow", "chlorophyll"],
+        ["blaze", "solar-power"],
+        ["inner-focus", "multiscale"],
+        ["sand-veil", "rough-skin"],
+    ],
+}
+
+
 @pytest.mark.asyncio
 async def test_fetch_pokemon_data_success(monkeypatch: pytest.MonkeyPatch) -> None:
     async def mock_get(*args, **kwargs) -> Response:
@@ -102,3 +166,560 @@ async def test_fetch_pokemon_data_error(monkeypatch: pytest.MonkeyPatch) -> None
     result = await fetch_pokemon_data(pokemon_name="bulbasaur")
     assert "error" in result
     assert "Exception Error" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_http_client_is_shared_and_closed_by_lifespan() -> None:
+    async with lifespan(mcp):
+        client = get_http_client()
+        assert get_http_client() is client
+        assert not client.is_closed
+
+    assert client.is_closed
+    assert get_http_client() is not client
+    await close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_create_tournament_squad_reports_partial_failures(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def mock_fetch(*args, **kwargs):
+        pokemon_name = kwargs.get("pokemon_name")
+        if pokemon_name == "missingno":
+            return {"error": "Response Error: 404"}
+        return {"name": pokemon_name}
+
+    monkeypatch.setattr(target="pokemon.fetch_pokemon_data", name=mock_fetch)
+
+    result = await create_tournament_squad(pokemon_names="pikachu, missingno, eevee")
+    assert "Pikachu, Eevee" in result
+    assert "Failed to fetch" in result
+    assert "missingno (Response Error: 404)" in result
+
+
+@pytest.mark.asyncio
+async def test_fetch_pokemon_batch_bounds_concurrency_and_deadline(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    in_flight = 0
+    peak = 0
+
+    async def mock_fetch(*args, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(1 if kwargs["pokemon_name"] == "slowpoke" else 0.01)
+        in_flight -= 1
+        return {"name": kwargs["pokemon_name"]}
+
+    monkeypatch.setattr(target="pokemon.fetch_pokemon_data", name=mock_fetch)
+
+    names = [f"pokemon-{i}" for i in range(8)] + ["slowpoke"]
+    results = await fetch_pokemon_batch(
+        pokemon_names=names, max_concurrency=3, deadline=0.2
+    )
+
+    assert peak <= 3
+    assert [r.get("name") for r in results[:8]] == names[:8]
+    assert "Timeout Error" in results[8]["error"]
+
+
+@pytest.mark.asyncio
+async def test_lookup_pokemon_data_shares_entry_across_spellings(
+    monkeypatch: pytest.MonkeyPatch, fresh_pokemon_cache: TieredCache
+) -> None:
+    calls: list[str] = []
+
+    async def mock_fetch(*args, **kwargs):
+        calls.append(kwargs["pokemon_name"])
+        return {**MOCK_POKEMON_DATA, "id": 1, "stats": []}
+
+    monkeypatch.setattr(target="pokemon.fetch_pokemon_data", name=mock_fetch)
+
+    first = await lookup_pokemon_data(pokemon_name="Bulbasaur")
+    assert await lookup_pokemon_data(pokemon_name=" bulbasaur ") == first
+    assert await lookup_pokemon_data(pokemon_name="001") == first
+    assert calls == ["bulbasaur"]
+    assert first["types"] == [{"type": {"name": "grass"}}, {"type": {"name": "poison"}}]
+    assert fresh_pokemon_cache.stats()["memory"]["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_lookup_pokemon_data_does_not_cache_errors(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[str] = []
+
+    async def mock_fetch(*args, **kwargs):
+        calls.append(kwargs["pokemon_name"])
+        return {"error": "Request Error"}
+
+    monkeypatch.setattr(target="pokemon.fetch_pokemon_data", name=mock_fetch)
+
+    await lookup_pokemon_data(pokemon_name="bulbasaur")
+    await lookup_pokemon_data(pokemon_name="bulbasaur")
+    assert calls == ["bulbasaur", "bulbasaur"]
+
+
+def test_memory_cache_evicts_least_recently_used() -> None:
+    cache = MemoryCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats.evictions == 1
+
+
+def test_memory_cache_expires_entries_but_keeps_them_stale() -> None:
+    cache = MemoryCache(ttl=-1)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
+    assert cache.stats.misses == 1
+    assert cache.get_stale("a") == 1
+
+
+def test_memory_aliases_are_evicted_with_their_entry() -> None:
+    cache = TieredCache(memory=MemoryCache(maxsize=2))
+    for number, name in enumerate(["bulbasaur", "ivysaur", "venusaur"], start=1):
+        cache.set(name, number, aliases=(str(number), name.upper()))
+
+    assert cache.get("1") is None
+    assert cache.get("3") == 3
+    assert sorted(cache._aliases) == ["2", "3", "IVYSAUR", "VENUSAUR"]
+
+
+def test_disk_tier_survives_restart(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite3"
+    cache = TieredCache(memory=MemoryCache(), disk=SQLiteCache(path=path))
+    cache.set("pikachu", {"id": 25, "name": "pikachu"}, aliases=("25",))
+    cache.close()
+
+    restarted = TieredCache(memory=MemoryCache(), disk=SQLiteCache(path=path))
+    assert restarted.get("25") == {"id": 25, "name": "pikachu"}
+    assert restarted.get("pikachu") == {"id": 25, "name": "pikachu"}
+    assert restarted.stats()["disk"]["hits"] == 1
+    assert restarted.stats()["memory"]["hits"] == 1
+    restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_is_read_and_written_off_the_event_loop(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "cache.sqlite3"
+    cache = TieredCache(memory=MemoryCache(), disk=SQLiteCache(path=path))
+    await cache.aset("pikachu", {"id": 25, "name": "pikachu"}, aliases=("25",))
+    cache.close()
+
+    restarted = TieredCache(memory=MemoryCache(), disk=SQLiteCache(path=path))
+    threads: list[str] = []
+    resolve = restarted.disk.resolve
+
+    def recording_resolve(key: str) -> str:
+        threads.append(threading.current_thread().name)
+        return resolve(key)
+
+    monkeypatch.setattr(restarted.disk, "resolve", recording_resolve)
+    assert await restarted.aget("25") == {"id": 25, "name": "pikachu"}
+    assert await restarted.aget("pikachu") == {"id": 25, "name": "pikachu"}
+    assert await restarted.aget_stale("missing") is None
+    assert threads and threading.main_thread().name not in threads
+    assert restarted.stats()["memory"]["hits"] == 1
+    restarted.close()
+
+
+def test_disk_tier_evicts_oldest_entries(tmp_path: Path) -> None:
+    disk = SQLiteCache(path=tmp_path / "cache.sqlite3", max_entries=2)
+    for key in ("a", "b", "c"):
+        disk.set(key, key)
+
+    assert disk.get("a") is None
+    assert disk.get("c") == "c"
+    assert disk.stats.evictions == 1
+    disk.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_fetch(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[str] = []
+
+    async def mock_fetch(*args, **kwargs):
+        calls.append(kwargs["pokemon_name"])
+        await asyncio.sleep(0.05)
+        return {"id": 25, "name": "pikachu"}
+
+    monkeypatch.setattr(target="pokemon.fetch_pokemon_data", name=mock_fetch)
+    monkeypatch.setattr(target="pokemon.pokemon_inflight", name=SingleFlight())
+
+    results = await asyncio.gather(
+        *(lookup_pokemon_data(pokemon_name=name) for name in ["Pikachu"] * 5)
+    )
+    assert calls == ["pikachu"]
+    assert all(result == {"id": 25, "name": "pikachu"} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_to_every_waiter() -> None:
+    flight = SingleFlight()
+
+    async def failing() -> None:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(
+        flight.do("key", failing), flight.do("key", failing), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.coalesced == 1
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_waiter_cancellation() -> None:
+    flight = SingleFlight()
+
+    async def slow() -> str:
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", slow))
+    second = asyncio.create_task(flight.do("key", slow))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_get_pokemon_info_batch_returns_rows_and_errors(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[str] = []
+
+    async def mock_fetch(*args, **kwargs):
+        calls.append(kwargs["pokemon_name"])
+        if kwargs["pokemon_name"] == "missingno":
+            return {"error": "Response Error: 404"}
+        return {
+            **MOCK_POKEMON_DATA,
+            "id": 1,
+            "stats": [{"stat": {"name": "hp"}, "base_stat": 45}],
+        }
+
+    monkeypatch.setattr(target="pokemon.fetch_pokemon_data", name=mock_fetch)
+
+    result = json.loads(
+        await get_pokemon_info_batch(pokemon_names="Bulbasaur, missingno, bulbasaur")
+    )
+    assert sorted(calls) == ["bulbasaur", "missingno"]
+    assert result["pokemon"] == [
+        {
+            "id": 1,
+            "name": "bulbasaur",
+            "types": ["grass", "poison"],
+            "abilities": ["overgrow", "chlorophyll"],
+            "stats": {"hp": 45},
+        }
+    ]
+    assert result["errors"] == [{"query": "missingno", "error": "Response Error: 404"}]
+
+
+def test_pokedex_filters_and_ranks(tmp_path: Path) -> None:
+    path = tmp_path / "pokedex.json.gz"
+    save_snapshot(columns=POKEDEX_COLUMNS, path=path)
+    pokedex = Pokedex.load(path=path)
+
+    dragons = pokedex.filter(type="Dragon")
+    assert [pokedex.names[row] for row in dragons] == ["dragonite", "garchomp"]
+    assert pokedex.filter(type="flying", generation=1) == [1, 2]
+    assert pokedex.filter() is None
+
+    fastest = pokedex.rank(sort_by="speed", rows=dragons, limit=1)
+    assert pokedex.names[fastest[0]] == "garchomp"
+    assert [pokedex.names[row] for row in pokedex.rank(sort_by="attack", limit=2)] == [
+        "dragonite",
+        "garchomp",
+    ]
+    assert pokedex.names[pokedex.rank(sort_by="hp", descending=False)[0]] == (
+        "bulbasaur"
+    )
+    assert pokedex.find(pokemon_name="445") == pokedex.find(pokemon_name="garchomp")
+
+
+@pytest.mark.asyncio
+async def test_search_pokedex_tool(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert "No Pokedex snapshot" in await search_pokedex(type="dragon")
+
+    monkeypatch.setattr(target="pokemon.pokedex", name=Pokedex(POKEDEX_COLUMNS))
+    result = json.loads(await search_pokedex(type="dragon", sort_by="speed"))
+
+    assert result["count"] == 2
+    assert [row["name"] for row in result["pokemon"]] == ["garchomp", "dragonite"]
+    assert result["pokemon"][0]["stats"]["speed"] == 102
+    assert "Invalid sort_by" in await search_pokedex(sort_by="luck")
+
+
+@pytest.mark.asyncio
+async def test_get_pokemon_info_uses_pokedex_offline(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def mock_fetch(*args, **kwargs):
+        raise AssertionError("The PokeAPI should not be called")
+
+    monkeypatch.setattr(target="pokemon.fetch_pokemon_data", name=mock_fetch)
+    monkeypatch.setattr(target="pokemon.pokedex", name=Pokedex(POKEDEX_COLUMNS))
+
+    result = await get_pokemon_info("6")
+    assert "Name: Charizard" in result
+    assert "Types: fire, flying" in result
+    assert "speed: 100" in result
+
+
+def test_team_matrix_type_matchups() -> None:
+    pokedex = Pokedex(POKEDEX_COLUMNS)
+    team = TeamMatrix(
+        records=[
+            pokemon_record_from_pokedex(pokedex, name)
+            for name in ("charizard", "garchomp")
+        ]
+    )
+    analysis = team.analyze(squad=np.arange(2))
+
+    # Charizard takes 4x from rock, Garchomp is immune to electric
+    assert team.defense[0, 12] == 4
+    assert analysis["defense"]["electric"] == {"weak": 1, "resist": 0, "immune": 1}
+    assert analysis["defense"]["ice"]["weak"] == 1
+    assert "grass" in analysis["coverage"]
+    assert "water" in analysis["coverage_gaps"]
+    assert analysis["stats"]["max"]["speed"] == 102
+    assert analysis["score"] == pytest.approx(
+        float(team.score(np.array([[0, 1]]))[0]), abs=1e-4
+    )
+
+
+def pokemon_record_from_pokedex(pokedex: Pokedex, name: str) -> dict[str, Any]:
+    return pokedex.record(row=pokedex.by_name[name])
+
+
+def test_candidate_squads_enumerates_or_samples(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    assert candidate_squads(pool_size=4, team_size=2, max_candidates=10).shape == (6, 2)
+
+    sampled = candidate_squads(
+        pool_size=30, team_size=6, max_candidates=1000, rng=np.random.default_rng(0)
+    )
+    assert sampled.shape[1] == 6
+    assert 990 <= len(sampled) <= 1000
+    assert all(len(set(row)) == 6 for row in sampled.tolist())
+    assert len({tuple(row) for row in sampled.tolist()}) == len(sampled)
+
+    # Sampling never allocates more than MAX_CANDIDATES rows
+    monkeypatch.setattr(team_analysis, "MAX_CANDIDATES", 50)
+    small = candidate_squads(pool_size=30, team_size=6, max_candidates=10**9)
+    assert len(small) <= 50
+
+    # Nor rows as wide as the pool
+    huge = candidate_squads(pool_size=10**7, team_size=6, max_candidates=50)
+    assert huge.shape == (50, 6)
+    assert all(len(set(row)) == 6 for row in huge.tolist())
+
+
+@pytest.mark.asyncio
+async def test_analyze_and_find_best_team_tools(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def mock_fetch(*args, **kwargs):
+        return {"error": "Response Error: 404"}
+
+    monkeypatch.setattr(target="pokemon.fetch_pokemon_data", name=mock_fetch)
+    monkeypatch.setattr(target="pokemon.pokedex", name=Pokedex(POKEDEX_COLUMNS))
+
+    analysis = json.loads(await analyze_team(pokemon_names="charizard, 149, missingno"))
+    assert analysis["members"] == ["charizard", "dragonite"]
+    assert analysis["errors"][0]["query"] == "missingno"
+
+    result = json.loads(
+        await find_best_team(
+            pokemon_names="bulbasaur, charizard, dragonite, garchomp",
+            team_size=2,
+            top=2,
+        )
+    )
+    assert result["scored"] == 6
+    assert len(result["teams"]) == 2
+    assert result["teams"][0]["score"] >= result["teams"][1]["score"]
+
+
+@pytest.mark.asyncio
+async def test_team_tools_report_malformed_pokemon_data(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    pokedex = Pokedex(POKEDEX_COLUMNS)
+
+    async def mock_batch(pokemon_names: list[str]) -> list[dict]:
+        return [
+            {"name": "glitch", "types": [{"slot": 1}]},
+            pokedex.pokeapi_data(row=pokedex.by_name["charizard"]),
+        ]
+
+    monkeypatch.setattr(target="pokemon.fetch_pokemon_batch", name=mock_batch)
+    analysis = json.loads(await analyze_team(pokemon_names="glitch, charizard"))
+    assert analysis["members"] == ["charizard"]
+    assert analysis["errors"][0]["query"] == "glitch"
+    assert "processing Error" in analysis["errors"][0]["error"]
+
+
+def mock_responses(statuses: list[int], headers: dict[str, str] | None = None):
+    """Return an AsyncClient.get replacement answering with `statuses` in order."""
+    calls: list[str] = []
+
+    async def mock_get(self, url: str, **kwargs) -> Response:
+        calls.append(url)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        return Response(
+            status_code=status,
+            json=MOCK_POKEMON_DATA if status == 200 else {},
+            headers=headers,
+            request=Request(method="GET", url=url),
+        )
+
+    return mock_get, calls
+
+
+@pytest.mark.asyncio
+async def test_fetch_pokemon_data_retries_server_errors(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    mock_get, calls = mock_responses(statuses=[503, 429, 200])
+    monkeypatch.setattr(target=AsyncClient, name="get", value=mock_get)
+
+    assert await fetch_pokemon_data(pokemon_name="bulbasaur") == MOCK_POKEMON_DATA
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_pokemon_data_gives_up_on_long_retry_after(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    mock_get, calls = mock_responses(statuses=[429], headers={"Retry-After": "120"})
+    monkeypatch.setattr(target=AsyncClient, name="get", value=mock_get)
+
+    result = await fetch_pokemon_data(pokemon_name="bulbasaur")
+    assert "Response Error: 429" in result["error"]
+    assert result["unavailable"] is True
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_pokemon_data_does_not_retry_not_found(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    mock_get, calls = mock_responses(statuses=[404])
+    monkeypatch.setattr(target=AsyncClient, name="get", value=mock_get)
+
+    result = await fetch_pokemon_data(pokemon_name="missingno")
+    assert "Response Error: 404" in result["error"]
+    assert not result["unavailable"]
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_and_serves_stale_data(
+    monkeypatch: pytest.MonkeyPatch, fresh_pokemon_cache: TieredCache
+) -> None:
+    calls: list[str] = []
+
+    async def mock_get(self, url: str, **kwargs) -> Response:
+        calls.append(url)
+        raise ConnectError("connection refused", request=Request("GET", url))
+
+    monkeypatch.setattr(target=AsyncClient, name="get", value=mock_get)
+    monkeypatch.setattr(
+        target="pokemon.pokeapi_breaker",
+        name=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+    )
+    stale_cache = TieredCache(memory=MemoryCache(ttl=-1))
+    stale_cache.set("pikachu", {"id": 25, "name": "pikachu"})
+    monkeypatch.setattr(target="pokemon.pokemon_cache", name=stale_cache)
+
+    # Retries of one lookup count as a single failure
+    result = await fetch_pokemon_data(pokemon_name="bulbasaur")
+    assert "Request Error" in result["error"]
+    assert len(calls) == 3
+    assert pokemon.pokeapi_breaker.failures == 1
+
+    result = await fetch_pokemon_data(pokemon_name="bulbasaur")
+    assert "Request Error" in result["error"]
+    result = await fetch_pokemon_data(pokemon_name="bulbasaur")
+    assert "Circuit Open" in result["error"]
+    assert len(calls) == 6
+
+    assert await lookup_pokemon_data(pokemon_name="pikachu") == {
+        "id": 25,
+        "name": "pikachu",
+    }
+
+
+def test_circuit_breaker_half_open_probe() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.state == "half-open"
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_retry_policy_backoff_and_retry_after() -> None:
+    policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=3)
+
+    assert 0 <= policy.delay(attempt=2) <= 2
+    assert policy.delay(attempt=1, retry_after=2) == 2
+    assert policy.delay(attempt=1, retry_after=10) is None
+    assert policy.delay(attempt=3) is None
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate() -> None:
+    bucket = TokenBucket(rate=50, capacity=2)
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+    assert loop.time() - start >= 0.07
+
+
+@pytest.mark.asyncio
+async def test_benchmark_harness_drives_server_against_stub() -> None:
+    # The in-memory transport repoints the imported server at the stub, and
+    # puts everything back afterwards
+    names = ("POKEAPI_URL", "pokemon_cache", "pokeapi_breaker", "pokedex")
+    before = {name: getattr(pokemon, name) for name in names}
+
+    result = await run_benchmark(
+        tool="get_pokemon_info",
+        transport="memory",
+        requests=20,
+        concurrency=4,
+        names=5,
+        latency=0,
+        warmup=0,
+    )
+
+    assert result.errors == 0
+    assert result.upstream_requests == 20
+    assert result.p50_ms <= result.p95_ms <= result.p99_ms <= result.max_ms
+    assert result.peak_kib is not None
+    assert {name: getattr(pokemon, name) for name in names} == before
@@ -0,0 +1,369 @@
+import json
+import threading
+import time
+from html import escape
+from pathlib import Path
+
+import pytest
+import youtube_transcript
+from transcript_cache import MemoryCache, SQLiteCache, TieredCache
+from transcript_index import TranscriptIndex
+from youtube_transcript import (
+    fetch_youtube_transcript,
+    fetch_youtube_transcripts,
+    get_youtube_transcript,
+    search_transcripts,
+)
+from youtube_transcript_api._errors import TranscriptsDisabled, VideoUnavailable
+from youtube_transcript_api._transcripts import (
+    FetchedTranscript,
+    FetchedTranscriptSnippet,
+    Transcript,
+    TranscriptList,
+    _TranslationLanguage,
+)
+
+
+class FakeTranscript:
+    def __init__(self, video_id: str, language_code: str) -> None:
+        self.video_id: str = video_id
+        self.language_code: str = language_code
+
+    def fetch(self) -> FetchedTranscript:
+        return FetchedTranscript(
+            snippets=[
+                FetchedTranscriptSnippet(text="Hello there", start=0.0, duration=1.5),
+                FetchedTranscriptSnippet(
+                    text="General Kenobi", start=1.5, duration=2.0
+                ),
+            ],
+            video_id=self.video_id,
+            language="English",
+            language_code=self.language_code,
+            is_generated=False,
+        )
+
+
+class FakeTranscriptList:
+    def __init__(self, video_id: str) -> None:
+        self.video_id: str = video_id
+
+    def find_transcript(self, language_codes: list[str]) -> FakeTranscript:
+        return FakeTranscript(video_id=self.video_id, language_code=language_codes[0])
+
+
+@pytest.fixture
+def youtube_calls(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Serve fake transcripts, recording every video listed on YouTube."""
+    calls: list[str] = []
+
+    def list_transcripts(video_id: str) -> FakeTranscriptList:
+        calls.append(video_id)
+        if video_id == "gone":
+            raise VideoUnavailable(video_id)
+        if video_id == "private":
+            raise TranscriptsDisabled(video_id)
+        return FakeTranscriptList(video_id=video_id)
+
+    monkeypatch.setattr(
+        youtube_transcript.YouTubeTranscriptApi, "list_transcripts", list_transcripts
+    )
+    return calls
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> TieredCache:
+    cache = TieredCache(
+        memory=MemoryCache(), disk=SQLiteCache(path=tmp_path / "cache.sqlite3")
+    )
+    monkeypatch.setattr(youtube_transcript, "transcript_cache", cache)
+    monkeypatch.setattr(
+        youtube_transcript, "transcript_list_cache", TieredCache(memory=MemoryCache())
+    )
+    yield cache
+    cache.close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> TranscriptIndex:
+    index = TranscriptIndex(path=tmp_path / "index.sqlite3")
+    monkeypatch.setattr(youtube_transcript, "transcript_index", index)
+    yield index
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_transcripts_are_cached_and_rendered_per_format(
+    youtube_calls: list[str], fresh_cache: TieredCache, tmp_path: Path
+):
+    as_json: str = await get_youtube_transcript(video_id="abc")
+    as_text: str = await get_youtube_transcript(video_id="abc", format="TEXT")
+    assert json.loads(as_json)[1] == {
+        "text": "General Kenobi",
+        "start": 1.5,
+        "duration": 2.0,
+    }
+    assert as_text == "Hello there\nGeneral Kenobi"
+    # Other languages are resolved from the same listing of the video
+    await get_youtube_transcript(video_id="abc", lang_code="de")
+    assert youtube_calls == ["abc"]
+
+    # A restarted server reads the transcript back from the disk tier
+    fresh_cache.close()
+    restarted = TieredCache(
+        memory=MemoryCache(), disk=SQLiteCache(path=tmp_path / "cache.sqlite3")
+    )
+    youtube_transcript.transcript_cache = restarted
+    assert await get_youtube_transcript(video_id="abc") == as_json
+    assert youtube_calls == ["abc"]
+    assert restarted.stats()["disk"]["hits"] == 1
+    restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_failures_are_cached_for_the_negative_ttl(
+    youtube_calls: list[str], monkeypatch: pytest.MonkeyPatch
+):
+    for _ in range(2):
+        with pytest.raises(ValueError, match="unavailable"):
+            await fetch_youtube_transcript(video_id="gone")
+        with pytest.raises(ValueError, match="disabled"):
+            await fetch_youtube_transcript(video_id="private", lang_code="fr")
+    assert youtube_calls == ["gone", "private"]
+
+    # Once a failure expires, the video is looked up again
+    monkeypatch.setattr(youtube_transcript, "YOUTUBE_TRANSCRIPT_NEGATIVE_TTL", -1)
+    monkeypatch.setattr(
+        youtube_transcript, "transcript_cache", TieredCache(memory=MemoryCache())
+    )
+    with pytest.raises(ValueError, match="unavailable"):
+        await fetch_youtube_transcript(video_id="gone")
+    with pytest.raises(ValueError, match="unavailable"):
+        await fetch_youtube_transcript(video_id="gone")
+    assert youtube_calls == ["gone", "private", "gone", "gone"]
+
+
+@pytest.mark.asyncio
+async def test_batch_fetches_concurrently_under_a_cap(
+    youtube_calls: list[str], monkeypatch: pytest.MonkeyPatch
+):
+    active: list[int] = [0, 0]  # [in flight, most ever in flight]
+    lock = threading.Lock()
+    list_transcripts = youtube_transcript.YouTubeTranscriptApi.list_transcripts
+
+    def slow_list_transcripts(video_id: str) -> FakeTranscriptList:
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return list_transcripts(video_id=video_id)
+
+    monkeypatch.setattr(
+        youtube_transcript.YouTubeTranscriptApi,
+        "list_transcripts",
+        slow_list_transcripts,
+    )
+    video_ids: list[str] = ["v1", "gone", "v2", "v1", "v3", "v4", "v5"]
+    results: list[dict] = json.loads(
+        await fetch_youtube_transcripts(
+            video_ids=video_ids, format="text", max_concurrency=2
+        )
+    )
+
+    assert [result["video_id"] for result in results] == video_ids
+    assert "unavailable" in results[1]["error"]
+    assert results[0] == results[3]
+    assert results[0]["transcript"] == "Hello there\nGeneral Kenobi"
+    assert sorted(youtube_calls) == ["gone", "v1", "v2", "v3", "v4", "v5"]
+    assert active[1] == 2
+
+    rows: list[dict] = json.loads(await fetch_youtube_transcripts(video_ids=["v2"]))
+    assert rows[0]["transcript"][0] == {
+        "text": "Hello there",
+        "start": 0.0,
+        "duration": 1.5,
+    }
+    with pytest.raises(ValueError, match="format"):
+        await fetch_youtube_transcripts(video_ids=["v1"], format="srt")
+
+
+@pytest.mark.asyncio
+async def test_time_range_paging_and_chunks(
+    youtube_calls: list[str], monkeypatch: pytest.MonkeyPatch
+):
+    def fetch(self: FakeTranscript) -> FetchedTranscript:
+        return FetchedTranscript(
+            snippets=[
+                FetchedTranscriptSnippet(
+                    text=f"line {i:02}", start=i * 2.0, duration=2.0
+                )
+                for i in range(30)
+            ],
+            video_id=self.video_id,
+            language="English",
+            language_code=self.language_code,
+            is_generated=False,
+        )
+
+    monkeypatch.setattr(FakeTranscript, "fetch", fetch)
+    # 10s to 20s covers lines 5 to 9; the first page holds three of them
+    page: str = await get_youtube_transcript(
+        video_id="long", format="text", start_time=10, end_time=20, limit=3
+    )
+    assert page == "line 05\nline 06\nline 07"
+    page = await get_youtube_transcript(
+        video_id="long", format="text", start_time=10, end_time=20, offset=3
+    )
+    assert page == "line 08\nline 09"
+    rows: list[dict] = json.loads(
+        await get_youtube_transcript(video_id="long", offset=29)
+    )
+    assert rows == [{"text": "line 29", "start": 58.0, "duration": 2.0}]
+
+    # Chunks of about 4 tokens hold two 7-character lines each
+    result: dict = json.loads(
+        await get_youtube_transcript(
+            video_id="long", format="chunks", limit=5, max_chunk_tokens=4
+        )
+    )
+    assert result["chunks"][0] == {
+        "offset": 0,
+        "start": 0.0,
+        "end": 4.0,
+        "text": "line 00 line 01",
+    }
+    assert [chunk["offset"] for chunk in result["chunks"]] == [0, 2, 4]
+    assert result["next_offset"] == 5
+    result = json.loads(
+        await get_youtube_transcript(video_id="long", format="chunks", offset=25)
+    )
+    assert result["chunks"][0]["text"].startswith("line 25")
+    assert result["next_offset"] is None
+    assert youtube_calls == ["long"]
+
+    with pytest.raises(ValueError, match="negative"):
+        await get_youtube_transcript(video_id="long", offset=-1)
+
+
+@pytest.mark.asyncio
+async def test_search_transcripts_returns_timestamped_snippets(
+    youtube_calls: list[str], fresh_index: TranscriptIndex, tmp_path: Path
+):
+    assert json.loads(await search_transcripts(query="kenobi")) == []
+    await fetch_youtube_transcripts(video_ids=["v1", "v2"])
+    await fetch_youtube_transcript(video_id="v1", lang_code="de")
+
+    hits: list[dict] = json.loads(await search_transcripts(query="KENOBI"))
+    assert len(hits) == 3
+    assert hits[0]["text"] == "General [Kenobi]"
+    assert (hits[0]["start"], hits[0]["end"], hits[0]["offset"]) == (1.5, 3.5, 1)
+
+    hits = json.loads(await search_transcripts(query="hel*", video_ids=["v2"]))
+    assert [(hit["video_id"], hit["offset"]) for hit in hits] == [("v2", 0)]
+    assert json.loads(await search_transcripts(query="there kenobi")) == []
+
+    # Re-indexing a transcript replaces its snippets
+    youtube_transcript.transcript_index.add(
+        record={
+            "video_id": "v2",
+            "language_code": "en",
+            "snippets": [["Obi-Wan Kenobi", 0.0, 1.0]],
+        }
+    )
+    hits = json.loads(await search_transcripts(query="kenobi", video_ids=["v2"]))
+    assert [hit["text"] for hit in hits] == ["Obi-Wan [Kenobi]"]
+
+    # Transcripts cached before indexing are indexed when next read
+    other = TranscriptIndex(path=tmp_path / "other.sqlite3")
+    youtube_transcript.transcript_index = other
+    await fetch_youtube_transcript(video_id="v1")
+    assert other.contains(video_id="v1", language_code="en")
+    assert youtube_calls.count("v1") == 1
+    other.close()
+
+
+class FakeHttpClient:
+    """Answers transcript URLs with a one-snippet transcript naming the URL."""
+
+    def __init__(self) -> None:
+        self.urls: list[str] = []
+
+    def get(self, url: str) -> "FakeHttpClient":
+        self.urls.append(url)
+        self.text: str = (
+            f'<transcript><text start="0" dur="1">{escape(url)}</text></transcript>'
+        )
+        return self
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_language_fallback_and_translation_share_one_listing(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    http = FakeHttpClient()
+    calls: list[str] = []
+
+    def list_transcripts(video_id: str) -> TranscriptList:
+        calls.append(video_id)
+        french = [_TranslationLanguage(language="French", language_code="fr")]
+
+        def transcript(code: str, generated: bool) -> Transcript:
+            return Transcript(
+                http, video_id, f"url/{code}", code.upper(), code, generated, french
+            )
+
+        return TranscriptList(
+            video_id=video_id,
+            manually_created_transcripts={"es": transcript("es", generated=False)},
+            generated_transcripts={"en": transcript("en", generated=True)},
+            translation_languages=french,
+        )
+
+    monkeypatch.setattr(
+        youtube_transcript.YouTubeTranscriptApi, "list_transcripts", list_transcripts
+    )
+
+    # A later preference with a transcript wins over translating into an earlier one
+    text, resolved = await fetch_youtube_transcript(
+        video_id="v", lang_code="de, en", format="text", report_resolution=True
+    )
+    assert text == "url/en"
+    assert json.loads(resolved)["resolved"] == {
+        "video_id": "v",
+        "language": "EN",
+        "language_code": "en",
+        "is_generated": True,
+        "translated_from": None,
+    }
+
+    # Generated transcripts can be ruled out
+    text = await fetch_youtube_transcript(
+        video_id="v", lang_code="en,es", format="text", allow_generated=False
+    )
+    assert text == "url/es"
+
+    # With no transcript in any preferred language, a manual one is translated
+    text, resolved = await fetch_youtube_transcript(
+        video_id="v", lang_code="de,fr", format="text", report_resolution=True
+    )
+    assert text == "url/es&tlang=fr"
+    assert json.loads(resolved)["resolved"]["translated_from"] == "es"
+    with pytest.raises(ValueError, match="Available languages: en, es"):
+        await fetch_youtube_transcript(
+            video_id="v", lang_code="de,fr", allow_translation=False
+        )
+
+    # Every choice came from one listing, and repeats are served from the cache
+    await get_youtube_transcript(video_id="v", lang_code="de,fr")
+    await get_youtube_transcript(video_id="v", lang_code="de,en")
+    assert calls == ["v"]
+    assert http.urls == ["url/en", "url/es", "url/es&tlang=fr"]
+    rows: list[dict] = json.loads(
+        await fetch_youtube_transcripts(video_ids=["v"], lang_code="fr")
+    )
+    assert (rows[0]["language_code"], rows[0]["translated_from"]) == ("fr", "es")
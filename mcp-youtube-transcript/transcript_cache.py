@@ -0,0 +1,183 @@
+# transcript_cache.py
+
+"""
+Tiered transcript cache for the YouTube transcript server.
+
+A bounded in-process LRU tier sits in front of an optional SQLite tier, so
+fetched transcripts survive server restarts. Every entry carries its own
+expiry, which lets failures (transcripts disabled, video unavailable) be
+cached for much less time than transcripts. Both tiers keep hit/miss/eviction
+counters.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class CacheStats:
+    """Hit, miss and eviction counters for one cache tier."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class MemoryCache:
+    """
+    A size-bounded LRU cache of JSON-like values, each with its own expiry.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize: int = maxsize
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for `key`, or None if missing or expired."""
+        entry: tuple[float, Any] | None = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            self._entries.pop(key, None)
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """Store `value` under `key`, evicting the least recently used entries."""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+
+class SQLiteCache:
+    """
+    A persistent JSON cache stored in a single SQLite file.
+
+    The database is opened lazily on first use. Expired entries are skipped
+    on reads and the oldest entries are evicted once more than `max_entries`
+    are stored.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 10_000) -> None:
+        self.path: Path = path
+        self.max_entries: int = max_entries
+        self.stats = CacheStats()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(database=self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at)"
+            )
+        return self._conn
+
+    def get(self, key: str) -> tuple[float, Any] | None:
+        """Return (expiry, value) for `key`, or None if missing or expired."""
+        row = (
+            self._connect()
+            .execute(
+                "SELECT expires_at, value FROM entries "
+                "WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        if row is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        return row[0], json.loads(row[1])
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        conn: sqlite3.Connection = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (
+                    key,
+                    json.dumps(value, separators=(",", ":")),
+                    time.time(),
+                    expires_at,
+                ),
+            )
+            evicted: int = conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self.stats.evictions += max(evicted, 0)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class TieredCache:
+    """
+    An in-memory LRU tier backed by an optional SQLite tier.
+
+    Memory misses fall through to disk and disk hits are promoted back into
+    memory with their remaining lifetime. Safe to use from worker threads.
+    """
+
+    def __init__(self, memory: MemoryCache, disk: SQLiteCache | None = None) -> None:
+        self.memory: MemoryCache = memory
+        self.disk: SQLiteCache | None = disk
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for `key`, or None if missing or expired."""
+        with self._lock:
+            value: Any | None = self.memory.get(key)
+            if value is not None or self.disk is None:
+                return value
+
+            entry: tuple[float, Any] | None = self.disk.get(key)
+            if entry is None:
+                return None
+            self.memory.set(key, entry[1], expires_at=entry[0])
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store `value` in every tier under `key` for `ttl` seconds."""
+        expires_at: float = time.time() + ttl
+        with self._lock:
+            self.memory.set(key, value, expires_at=expires_at)
+            if self.disk is not None:
+                self.disk.set(key, value, expires_at=expires_at)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return the hit/miss/eviction counters of each tier."""
+        stats: dict[str, dict[str, int]] = {"memory": asdict(self.memory.stats)}
+        if self.disk is not None:
+            stats["disk"] = asdict(self.disk.stats)
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self.disk is not None:
+                self.disk.close()
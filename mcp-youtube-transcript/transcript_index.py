@@ -0,0 +1,175 @@
+# transcript_index.py
+
+"""
+Full-text index of fetched transcripts for the YouTube transcript server.
+
+Every transcript the server fetches is indexed snippet by snippet in a SQLite
+FTS5 table, so searches return the matching moments of a video, with their
+timestamps, without reading whole transcripts. The index is kept in a file
+and survives restarts.
+"""
+
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# A search term, optionally followed by `*` for a prefix search
+_TERM_PATTERN: re.Pattern[str] = re.compile(pattern=r"(\w+)(\*?)")
+
+# A snippet's rowid is its transcript's id shifted left by this many bits,
+# plus its position in the transcript, so one transcript's snippets form a
+# contiguous rowid range
+_OFFSET_BITS: int = 20
+_MAX_SNIPPETS: int = 1 << _OFFSET_BITS
+
+
+@dataclass
+class SegmentHit:
+    """
+    A transcript snippet matching a search query.
+    """
+
+    video_id: str
+    language_code: str
+    offset: int
+    start: float
+    duration: float
+    text: str
+    score: float
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query matching snippets containing every term.
+
+    Terms are quoted so punctuation in the input is never parsed as FTS5
+    syntax; a trailing `*` on a term keeps its prefix-search meaning.
+    """
+    return " ".join(
+        f'"{term}"{star}' for term, star in _TERM_PATTERN.findall(string=query)
+    )
+
+
+class TranscriptIndex:
+    """
+    A persistent SQLite FTS5 index of transcript snippets.
+
+    The database is opened lazily on first use. One connection is shared by
+    the fetch threads, so every method holds a lock while using it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+        # (video_id, language_code) of every indexed transcript
+        self._indexed: set[tuple[str, str]] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(database=self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                "id INTEGER PRIMARY KEY, video_id TEXT NOT NULL, "
+                "language_code TEXT NOT NULL, UNIQUE (video_id, language_code))"
+            )
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS snippets_fts USING fts5("
+                "text, start UNINDEXED, duration UNINDEXED, "
+                "tokenize='porter unicode61')"
+            )
+            self._indexed = set(
+                self._conn.execute("SELECT video_id, language_code FROM transcripts")
+            )
+        return self._conn
+
+    def contains(self, video_id: str, language_code: str) -> bool:
+        with self._lock:
+            self._connect()
+            return (video_id, language_code) in self._indexed
+
+    def add(self, record: dict[str, Any]) -> None:
+        """
+        Index (or re-index) a normalized transcript's snippets.
+        """
+        key: tuple[str, str] = (record["video_id"], record["language_code"])
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                row = conn.execute(
+                    "SELECT id FROM transcripts WHERE video_id = ? AND language_code = ?",
+                    key,
+                ).fetchone()
+                if row is None:
+                    transcript_id: int = conn.execute(
+                        "INSERT INTO transcripts (video_id, language_code) VALUES (?, ?)",
+                        key,
+                    ).lastrowid
+                else:
+                    transcript_id = row[0]
+                    first: int = transcript_id << _OFFSET_BITS
+                    conn.execute(
+                        "DELETE FROM snippets_fts WHERE rowid BETWEEN ? AND ?",
+                        (first, first + _MAX_SNIPPETS - 1),
+                    )
+                conn.executemany(
+                    "INSERT INTO snippets_fts (rowid, text, start, duration) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        ((transcript_id << _OFFSET_BITS) + i, text, start, duration)
+                        for i, (text, start, duration) in enumerate(
+                            record["snippets"][:_MAX_SNIPPETS]
+                        )
+                    ),
+                )
+            self._indexed.add(key)
+
+    def search(
+        self, query: str, video_ids: list[str] | None = None, limit: int = 20
+    ) -> list[SegmentHit]:
+        """
+        Returns the best matching snippets, ranked by BM25, optionally only
+        from the given videos. Matched terms are marked with [ and ].
+        """
+        match: str = build_match_query(query=query)
+        if not match:
+            return []
+        sql: str = (
+            "SELECT transcripts.video_id, transcripts.language_code, "
+            f"snippets_fts.rowid & {_MAX_SNIPPETS - 1}, start, duration, "
+            "highlight(snippets_fts, 0, '[', ']'), bm25(snippets_fts) AS rank "
+            "FROM snippets_fts JOIN transcripts "
+            f"ON transcripts.id = snippets_fts.rowid >> {_OFFSET_BITS} "
+            "WHERE snippets_fts MATCH ?"
+        )
+        params: list[Any] = [match]
+        if video_ids:
+            sql += f" AND transcripts.video_id IN ({', '.join('?' * len(video_ids))})"
+            params.extend(video_ids)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(max(0, limit))
+        with self._lock:
+            rows = self._connect().execute(sql, params)
+            return [
+                SegmentHit(
+                    video_id=video_id,
+                    language_code=language_code,
+                    offset=offset,
+                    start=start,
+                    duration=duration,
+                    text=text,
+                    score=-rank,
+                )
+                for video_id, language_code, offset, start, duration, text, rank in rows
+            ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
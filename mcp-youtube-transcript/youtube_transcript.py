@@ -3,26 +3,263 @@ This module provides functionality to fetch YouTube video transcripts using the
 and exposes this functionality as a tool through the Model Context Protocol (MCP).
 """
 
+import asyncio
+import functools
+import json
+import os
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
 from mcp.server.fastmcp import FastMCP
+from transcript_cache import MemoryCache, SQLiteCache, TieredCache
+from transcript_index import SegmentHit, TranscriptIndex
 from youtube_transcript_api._api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import (
+    NoTranscriptFound,
     TranscriptsDisabled,
     VideoUnavailable,
 )
 from youtube_transcript_api._transcripts import (
     FetchedTranscript,
+    FetchedTranscriptSnippet,
     Transcript,
     TranscriptList,
 )
 from youtube_transcript_api.formatters import JSONFormatter, TextFormatter
 
+# Transcript cache settings; an empty YOUTUBE_TRANSCRIPT_CACHE_PATH disables
+# the disk tier. Failures (transcripts disabled, video unavailable) are
+# cached for YOUTUBE_TRANSCRIPT_NEGATIVE_TTL seconds.
+YOUTUBE_TRANSCRIPT_CACHE_SIZE: int = int(
+    os.getenv(key="YOUTUBE_TRANSCRIPT_CACHE_SIZE", default="256")
+)
+YOUTUBE_TRANSCRIPT_CACHE_TTL: float = float(
+    os.getenv(key="YOUTUBE_TRANSCRIPT_CACHE_TTL", default=str(7 * 86400))
+)
+YOUTUBE_TRANSCRIPT_NEGATIVE_TTL: float = float(
+    os.getenv(key="YOUTUBE_TRANSCRIPT_NEGATIVE_TTL", default="3600")
+)
+YOUTUBE_TRANSCRIPT_CACHE_PATH: str = os.getenv(
+    key="YOUTUBE_TRANSCRIPT_CACHE_PATH",
+    default=str(Path(__file__).parent / "transcripts_cache.sqlite3"),
+)
+
+# How long a video's list of available transcripts is reused, so requests
+# for other languages of the same video don't list it on YouTube again
+YOUTUBE_TRANSCRIPT_LIST_TTL: float = float(
+    os.getenv(key="YOUTUBE_TRANSCRIPT_LIST_TTL", default="600")
+)
+
+# Full-text index of every fetched transcript, searched by search_transcripts
+YOUTUBE_TRANSCRIPT_INDEX_PATH: Path = Path(
+    os.getenv(
+        key="YOUTUBE_TRANSCRIPT_INDEX_PATH",
+        default=str(Path(__file__).parent / "transcripts_index.sqlite3"),
+    )
+)
+
+# youtube_transcript_api is synchronous, so fetches run on a bounded thread
+# pool instead of blocking the event loop. The batch tool fetches up to
+# YOUTUBE_BATCH_CONCURRENCY videos at a time, and at most
+# YOUTUBE_BATCH_MAX_VIDEOS per call.
+YOUTUBE_FETCH_WORKERS: int = int(os.getenv(key="YOUTUBE_FETCH_WORKERS", default="8"))
+YOUTUBE_BATCH_CONCURRENCY: int = int(
+    os.getenv(key="YOUTUBE_BATCH_CONCURRENCY", default="4")
+)
+YOUTUBE_BATCH_MAX_VIDEOS: int = int(
+    os.getenv(key="YOUTUBE_BATCH_MAX_VIDEOS", default="200")
+)
+
+VALID_FORMATS: set[str] = {"text", "json"}
+# Extra format of fetch_youtube_transcript: token-bounded chunks with
+# timestamps, of at most YOUTUBE_CHUNK_TOKENS tokens by default
+CHUNKS_FORMAT: str = "chunks"
+YOUTUBE_CHUNK_TOKENS: int = int(os.getenv(key="YOUTUBE_CHUNK_TOKENS", default="500"))
+# Rough characters per token used to size chunks
+CHARS_PER_TOKEN: int = 4
+
+# Fetched transcripts, stored once per video and language in normalized form
+# (see _normalize_transcript), plus recent failures per video
+transcript_cache = TieredCache(
+    memory=MemoryCache(maxsize=YOUTUBE_TRANSCRIPT_CACHE_SIZE),
+    disk=SQLiteCache(path=Path(YOUTUBE_TRANSCRIPT_CACHE_PATH))
+    if YOUTUBE_TRANSCRIPT_CACHE_PATH
+    else None,
+)
+
+# Recently listed videos' TranscriptList objects, which are not serializable
+# and so are kept in memory only
+transcript_list_cache = TieredCache(memory=MemoryCache(maxsize=64))
+
+# Snippets of fetched transcripts, searchable by content
+transcript_index = TranscriptIndex(path=YOUTUBE_TRANSCRIPT_INDEX_PATH)
+
+# Cached failure reasons and the errors they are reported as
+UNAVAILABLE, DISABLED = "unavailable", "disabled"
+
+# Threads running the blocking YouTube requests and cache reads
+fetch_executor = ThreadPoolExecutor(
+    max_workers=YOUTUBE_FETCH_WORKERS, thread_name_prefix="youtube-fetch"
+)
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """
+    Stop the fetch threads and close the transcript cache and index on
+    shutdown.
+    """
+    try:
+        yield
+    finally:
+        fetch_executor.shutdown(wait=True, cancel_futures=True)
+        transcript_cache.close()
+        transcript_index.close()
+
+
 # Initialize the FastMCP server
-mcp = FastMCP(name="youtube-transcripts")
+mcp = FastMCP(name="youtube-transcripts", lifespan=lifespan)
+
+
+def _normalize_transcript(
+    transcript: FetchedTranscript, translated_from: str | None = None
+) -> dict[str, Any]:
+    """
+    Converts a fetched transcript into the JSON-serializable form it is
+    cached in, with each snippet as a [text, start, duration] triple.
+    `translated_from` is the language code a translated transcript was
+    translated from.
+    """
+    return {
+        "video_id": transcript.video_id,
+        "language": transcript.language,
+        "language_code": transcript.language_code,
+        "is_generated": transcript.is_generated,
+        "translated_from": translated_from,
+        "snippets": [
+            [snippet.text, snippet.start, snippet.duration]
+            for snippet in transcript.snippets
+        ],
+    }
+
+
+def _transcript_rows(record: dict[str, Any]) -> list[dict[str, Any]]:
+    """Returns a normalized transcript's snippets in the JSON format's shape."""
+    return [
+        {"text": text, "start": start, "duration": duration}
+        for text, start, duration in record["snippets"]
+    ]
+
+
+def _render_transcript(record: dict[str, Any], format: str) -> str:
+    """
+    Renders a normalized transcript as text or JSON, exactly as the
+    youtube_transcript_api formatters render a freshly fetched one.
+    """
+    transcript = FetchedTranscript(
+        snippets=[
+            FetchedTranscriptSnippet(text=text, start=start, duration=duration)
+            for text, start, duration in record["snippets"]
+        ],
+        video_id=record["video_id"],
+        language=record["language"],
+        language_code=record["language_code"],
+        is_generated=record["is_generated"],
+    )
+    if format == "text":
+        return TextFormatter().format_transcript(transcript=transcript)
+    return JSONFormatter().format_transcript(transcript=transcript)
+
+
+def _select_segments(
+    record: dict[str, Any],
+    start_time: float = 0.0,
+    end_time: float = 0.0,
+    offset: int = 0,
+    limit: int = 0,
+) -> tuple[list[list[Any]], int | None]:
+    """
+    Picks the snippets overlapping [start_time, end_time) seconds (an
+    end_time of 0 means the end of the video), then skips `offset` of them
+    and keeps at most `limit` (0 keeps all).
+
+    Returns:
+        The selected [text, start, duration] snippets, and the offset of the
+        next page within the time range, or None if this is the last page.
+    """
+    in_range: list[list[Any]] = [
+        snippet
+        for snippet in record["snippets"]
+        if snippet[1] + snippet[2] > start_time
+        and (end_time <= 0 or snippet[1] < end_time)
+    ]
+    stop: int = offset + limit if limit > 0 else len(in_range)
+    next_offset: int | None = stop if stop < len(in_range) else None
+    return in_range[offset:stop], next_offset
+
+
+def _chunk_segments(
+    segments: list[list[Any]], max_tokens: int, offset: int = 0
+) -> list[dict[str, Any]]:
+    """
+    Groups consecutive snippets into chunks of at most `max_tokens`
+    estimated tokens. A single longer snippet becomes a chunk of its own.
+
+    Each chunk has the start and end time of its snippets, their joined
+    text, and the offset of its first snippet (counting from `offset`).
+    """
+    max_chars: int = max_tokens * CHARS_PER_TOKEN
+    chunks: list[dict[str, Any]] = []
+    texts: list[str] = []
+    chars: int = 0
+    for i, (text, start, duration) in enumerate(segments):
+        if texts and chars + len(text) > max_chars:
+            chunks[-1]["text"] = " ".join(texts)
+            texts, chars = [], 0
+        if not texts:
+            chunks.append({"offset": offset + i, "start": start, "end": start})
+        texts.append(text)
+        chars += len(text) + 1  # Including the joining space
+        chunks[-1]["end"] = round(start + duration, 3)
+    if texts:
+        chunks[-1]["text"] = " ".join(texts)
+    return chunks
+
+
+def _parse_lang_codes(lang_code: str) -> list[str]:
+    """Splits a comma-separated language preference list, dropping repeats."""
+    return list(
+        dict.fromkeys(code.strip() for code in lang_code.split(",") if code.strip())
+    )
+
+
+def _resolution(record: dict[str, Any]) -> dict[str, Any]:
+    """Describes which transcript a normalized transcript was resolved to."""
+    return {
+        "video_id": record["video_id"],
+        "language": record["language"],
+        "language_code": record["language_code"],
+        "is_generated": record["is_generated"],
+        # Transcripts cached before translations existed have no such field
+        "translated_from": record.get("translated_from"),
+    }
 
 
 # Tool: Get YouTube transcript
 async def get_youtube_transcript(
-    video_id: str, lang_code: str = "en", format: str = "json"
+    video_id: str,
+    lang_code: str = "en",
+    format: str = "json",
+    start_time: float = 0.0,
+    end_time: float = 0.0,
+    offset: int = 0,
+    limit: int = 0,
+    max_chunk_tokens: int = 0,
+    allow_generated: bool = True,
+    allow_translation: bool = True,
 ) -> str:
     """
     Retrieves the transcript for a given YouTube video ID in the specified language and format.
@@ -33,70 +270,498 @@ async def get_youtube_transcript(
 
     Args:
         video_id: The unique identifier of the YouTube video.
-        lang_code: The language code for the transcript (e.g., "en", "es", "fr"). Defaults to "en".
-        format: The desired output format for the transcript. Must be either "text" or "json".
-                Defaults to "json".
+        lang_code: The language code for the transcript (e.g., "en", "es", "fr"), or a
+                   comma-separated list of them in order of preference (e.g., "de,en").
+                   Defaults to "en".
+        format: The desired output format for the transcript. Must be "text", "json" or
+                "chunks". Defaults to "json".
+        start_time: Only include snippets ending after this many seconds. Defaults to 0.
+        end_time: Only include snippets starting before this many seconds; 0 means the
+                  end of the video. Defaults to 0.
+        offset: Number of snippets in the time range to skip. Defaults to 0.
+        limit: Maximum number of snippets to return; 0 means all. Defaults to 0.
+        max_chunk_tokens: Size of each chunk in the "chunks" format, in estimated
+                          tokens. Defaults to YOUTUBE_CHUNK_TOKENS.
+        allow_generated: Whether auto-generated transcripts may be used when no manually
+                         created one is in a preferred language. Defaults to True.
+        allow_translation: Whether a transcript may be translated by YouTube into the
+                           first preferred language it can be translated to, when no
+                           preferred language has a transcript. Defaults to True.
 
     Returns:
-        A string containing the transcript in the specified format.
+        A string containing the selected part of the transcript in the specified
+        format. The "chunks" format is a JSON object with the chunks (each with its
+        start and end time, text and snippet offset) and the `next_offset` to pass
+        to get the following page, or null on the last page.
 
     Raises:
         ValueError: If input parameters are invalid, the video is unavailable,
-                    transcripts are disabled, or any other error occurs during fetching.
+                    transcripts are disabled, no transcript matches the preferred
+                    languages, or any other error occurs during fetching.
     """
-    VALID_FORMATS: set[str] = {"text", "json"}
+    transcript, _ = await _fetch_transcript(
+        video_id=video_id,
+        lang_code=lang_code,
+        format=format,
+        start_time=start_time,
+        end_time=end_time,
+        offset=offset,
+        limit=limit,
+        max_chunk_tokens=max_chunk_tokens,
+        allow_generated=allow_generated,
+        allow_translation=allow_translation,
+    )
+    return transcript
+
 
+async def _fetch_transcript(
+    video_id: str,
+    lang_code: str,
+    format: str,
+    start_time: float,
+    end_time: float,
+    offset: int,
+    limit: int,
+    max_chunk_tokens: int,
+    allow_generated: bool,
+    allow_translation: bool,
+) -> tuple[str, dict[str, Any]]:
+    """
+    Does the work of get_youtube_transcript, also returning the normalized
+    transcript the result was rendered from.
+    """
     # Validate input types
     if not isinstance(video_id, str):
         raise ValueError("The video_id must be a string.")
-    if not isinstance(lang_code, str):
-        raise ValueError("The lang_code must be a string.")
-    if not isinstance(format, str) or format.lower() not in VALID_FORMATS:
-        raise ValueError(f"The format must be one of {VALID_FORMATS}.")
+    if not isinstance(lang_code, str) or not _parse_lang_codes(lang_code=lang_code):
+        raise ValueError("The lang_code must be a non-empty string.")
+    if not isinstance(format, str) or format.lower() not in {
+        *VALID_FORMATS,
+        CHUNKS_FORMAT,
+    }:
+        raise ValueError(
+            f"The format must be one of {VALID_FORMATS | {CHUNKS_FORMAT}}."
+        )
+    if min(start_time, end_time, offset, limit, max_chunk_tokens) < 0:
+        raise ValueError("Times, offset, limit and chunk size cannot be negative.")
+
+    record: dict[str, Any] = await _run_blocking(
+        _load_transcript,
+        video_id=video_id,
+        lang_code=lang_code,
+        allow_generated=allow_generated,
+        allow_translation=allow_translation,
+    )
+    segments, next_offset = _select_segments(
+        record=record,
+        start_time=start_time,
+        end_time=end_time,
+        offset=offset,
+        limit=limit,
+    )
+    if format.lower() != CHUNKS_FORMAT:
+        transcript: str = _render_transcript(
+            record={**record, "snippets": segments}, format=format.lower()
+        )
+        return transcript, record
+    chunks: list[dict[str, Any]] = _chunk_segments(
+        segments=segments,
+        max_tokens=max_chunk_tokens or YOUTUBE_CHUNK_TOKENS,
+        offset=offset,
+    )
+    resolved: dict[str, Any] = _resolution(record=record)
+    transcript = json.dumps(
+        {
+            "video_id": record["video_id"],
+            "language_code": record["language_code"],
+            "is_generated": resolved["is_generated"],
+            "translated_from": resolved["translated_from"],
+            "chunks": chunks,
+            "next_offset": next_offset,
+        }
+    )
+    return transcript, record
+
+
+async def _run_blocking[T](func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run `func(*args, **kwargs)` on the fetch threads and await its result."""
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        fetch_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def _resolve_transcript(
+    transcript_list: TranscriptList,
+    language_codes: list[str],
+    allow_generated: bool,
+    allow_translation: bool,
+) -> tuple[Transcript, str | None]:
+    """
+    Picks the transcript to fetch for a list of preferred languages.
 
+    A transcript in any preferred language wins over a translation:
+    preferred languages are tried in order, each manually created first,
+    then generated (if allowed). Failing that, the first preferred language
+    some transcript can be translated to is used, translating from a
+    manually created transcript where possible.
+
+    Returns:
+        The transcript, and the language code it is translated from, or
+        None if it is not a translation.
+
+    Raises:
+        NoTranscriptFound: If no transcript matches the preferences.
+    """
     try:
-        # Attempt to retrieve the transcript
-        transcript_list: TranscriptList = YouTubeTranscriptApi.list_transcripts(
-            video_id=video_id
+        if allow_generated:
+            return transcript_list.find_transcript(language_codes=language_codes), None
+        return transcript_list.find_manually_created_transcript(
+            language_codes=language_codes
+        ), None
+    except NoTranscriptFound:
+        if not allow_translation:
+            raise
+
+    # Iterating a TranscriptList yields the manually created transcripts first
+    sources: list[Transcript] = [
+        transcript
+        for transcript in transcript_list
+        if transcript.is_translatable
+        and (allow_generated or not transcript.is_generated)
+    ]
+    for language_code in language_codes:
+        for source in sources:
+            if any(
+                language.language_code == language_code
+                for language in source.translation_languages
+            ):
+                return source.translate(language_code=language_code), (
+                    source.language_code
+                )
+    raise NoTranscriptFound(
+        video_id=transcript_list.video_id,
+        requested_language_codes=language_codes,
+        transcript_data=transcript_list,
+    )
+
+
+def _list_transcripts(video_id: str) -> TranscriptList:
+    """
+    Returns the transcripts available for a video, listing them on YouTube
+    at most once per YOUTUBE_TRANSCRIPT_LIST_TTL. Blocking.
+    """
+    transcript_list: TranscriptList | None = transcript_list_cache.get(video_id)
+    if transcript_list is None:
+        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id=video_id)
+        transcript_list_cache.set(
+            video_id, transcript_list, ttl=YOUTUBE_TRANSCRIPT_LIST_TTL
         )
-        fetched_transcript: Transcript = transcript_list.find_transcript(
-            language_codes=[lang_code]
+    return transcript_list
+
+
+def _cached_transcript(key: str) -> dict[str, Any] | None:
+    """
+    Returns a cached normalized transcript, indexing it first if it was
+    cached before the index existed.
+    """
+    record: dict[str, Any] | None = transcript_cache.get(key)
+    if record is not None and not transcript_index.contains(
+        video_id=record["video_id"], language_code=record["language_code"]
+    ):
+        transcript_index.add(record=record)
+    return record
+
+
+def _load_transcript(
+    video_id: str,
+    lang_code: str,
+    allow_generated: bool = True,
+    allow_translation: bool = True,
+) -> dict[str, Any]:
+    """
+    Returns the normalized transcript of a video best matching a
+    comma-separated list of preferred languages (see _resolve_transcript)
+    from the cache, fetching it from YouTube on a miss. Blocking; runs on
+    the fetch threads.
+
+    Transcripts are cached per video and language, or per source and target
+    language for translations, and which one a preference list resolved to
+    is cached too. All the preference lists tried for a video are resolved
+    from one listing of its transcripts.
+
+    Raises:
+        ValueError: If the video is unavailable, transcripts are disabled
+                    (both remembered for YOUTUBE_TRANSCRIPT_NEGATIVE_TTL),
+                    no transcript matches the preferences, or any other
+                    error occurs during fetching.
+    """
+    language_codes: list[str] = _parse_lang_codes(lang_code=lang_code)
+    choice_key: str = (
+        f"choice:{video_id}:{','.join(language_codes)}"
+        f":{int(allow_generated)}{int(allow_translation)}"
+    )
+    failure_key: str = f"failure:{video_id}"
+
+    # A transcript in the first preferred language is always the choice
+    record: dict[str, Any] | None = _cached_transcript(
+        key=f"transcript:{video_id}:{language_codes[0]}"
+    )
+    if record is not None and (allow_generated or not record["is_generated"]):
+        return record
+    transcript_key: str | None = transcript_cache.get(choice_key)
+    if transcript_key is not None:
+        record = _cached_transcript(key=transcript_key)
+        if record is not None:
+            return record
+    failure: str | None = transcript_cache.get(failure_key)
+    if failure == UNAVAILABLE:
+        raise ValueError(f"The video with ID '{video_id}' is unavailable.")
+    if failure == DISABLED:
+        raise ValueError(
+            f"Transcripts are disabled for the video with ID '{video_id}'."
         )
 
-        # Initialize the appropriate formatter
-        transcript: FetchedTranscript = fetched_transcript.fetch()
-        if format.lower() == "text":
-            formatter = TextFormatter()
-            return formatter.format_transcript(transcript=transcript)
-        else:
-            formatter = JSONFormatter()
-            return formatter.format_transcript(transcript=transcript)
+    try:
+        # Attempt to retrieve the transcript
+        transcript_list: TranscriptList = _list_transcripts(video_id=video_id)
+        chosen, translated_from = _resolve_transcript(
+            transcript_list=transcript_list,
+            language_codes=language_codes,
+            allow_generated=allow_generated,
+            allow_translation=allow_translation,
+        )
+        transcript_key = f"transcript:{video_id}:{chosen.language_code}"
+        if translated_from is not None:
+            transcript_key = (
+                f"transcript:{video_id}:{translated_from}>{chosen.language_code}"
+            )
+        record = _cached_transcript(key=transcript_key)
+        if record is None:
+            transcript: FetchedTranscript = chosen.fetch()
 
     except VideoUnavailable:
+        transcript_cache.set(
+            failure_key, UNAVAILABLE, ttl=YOUTUBE_TRANSCRIPT_NEGATIVE_TTL
+        )
         raise ValueError(f"The video with ID '{video_id}' is unavailable.")
     except TranscriptsDisabled:
+        transcript_cache.set(failure_key, DISABLED, ttl=YOUTUBE_TRANSCRIPT_NEGATIVE_TTL)
         raise ValueError(
             f"Transcripts are disabled for the video with ID '{video_id}'."
         )
+    except NoTranscriptFound:
+        available: list[str] = sorted(
+            {transcript.language_code for transcript in transcript_list}
+        )
+        raise ValueError(
+            f"No transcript in {', '.join(language_codes)} for the video with ID "
+            f"'{video_id}'. Available languages: {', '.join(available)}."
+        )
     except Exception as e:
         raise ValueError(f"An error occurred while fetching the transcript: {e}")
 
+    if record is None:
+        record = _normalize_transcript(
+            transcript=transcript, translated_from=translated_from
+        )
+        transcript_cache.set(transcript_key, record, ttl=YOUTUBE_TRANSCRIPT_CACHE_TTL)
+        transcript_index.add(record=record)
+    transcript_cache.set(choice_key, transcript_key, ttl=YOUTUBE_TRANSCRIPT_CACHE_TTL)
+    return record
+
 
 # Tool: Fetch YouTube transcript
 @mcp.tool()
 async def fetch_youtube_transcript(
-    video_id: str, lang_code: str = "en", format: str = "json"
-) -> str:
+    video_id: str,
+    lang_code: str = "en",
+    format: str = "json",
+    start_time: float = 0.0,
+    end_time: float = 0.0,
+    offset: int = 0,
+    limit: int = 0,
+    max_chunk_tokens: int = 0,
+    allow_generated: bool = True,
+    allow_translation: bool = True,
+    report_resolution: bool = False,
+) -> str | list[str]:
     """
-    Tool to fetch the transcript of a YouTube video.
+    Tool to fetch the transcript of a YouTube video, or part of it.
+
+    Long videos can be walked incrementally: narrow the transcript to a time range,
+    page through it with offset/limit, or use the 'chunks' format to get
+    token-bounded chunks with timestamps and the next_offset to continue from.
+
+    Several languages can be given at once, most preferred first: the first one the
+    video has a transcript in is used, and if it has none, a transcript is translated
+    into the first of them it can be translated to. There is no need to retry with
+    other languages.
 
     :param video_id: The unique identifier of the YouTube video.
-    :param lang_code: The language code for the transcript (default is 'en' for English).
-    :param format: The desired output format of the transcript; either 'text' or 'json'.
-    :return: The transcript in the specified format.
+    :param lang_code: The language code for the transcript (default is 'en' for English),
+                      or comma-separated codes in order of preference, e.g. 'de,en'.
+    :param format: The desired output format of the transcript; 'text', 'json' or 'chunks'.
+    :param start_time: Only include snippets ending after this time, in seconds.
+    :param end_time: Only include snippets starting before this time, in seconds (0 for the end).
+    :param offset: Number of snippets in the time range to skip.
+    :param limit: Maximum number of snippets to return (0 for all).
+    :param max_chunk_tokens: Estimated tokens per chunk in the 'chunks' format.
+    :param allow_generated: Whether auto-generated transcripts may be used.
+    :param allow_translation: Whether a transcript may be translated into a preferred language.
+    :param report_resolution: Also return which transcript was used, as a second block.
+    :return: The transcript in the specified format. With report_resolution, it is followed
+             by a JSON object describing the transcript used: {"resolved": {video_id,
+             language, language_code, is_generated, translated_from}}. The 'chunks' format
+             always includes language_code, is_generated and translated_from.
+    """
+    transcript, record = await _fetch_transcript(
+        video_id=video_id,
+        lang_code=lang_code,
+        format=format,
+        start_time=start_time,
+        end_time=end_time,
+        offset=offset,
+        limit=limit,
+        max_chunk_tokens=max_chunk_tokens,
+        allow_generated=allow_generated,
+        allow_translation=allow_translation,
+    )
+    if not report_resolution:
+        return transcript
+    return [transcript, json.dumps({"resolved": _resolution(record=record)})]
+
+
+# Tool: Fetch many YouTube transcripts
+@mcp.tool()
+async def fetch_youtube_transcripts(
+    video_ids: list[str],
+    lang_code: str = "en",
+    format: str = "json",
+    max_concurrency: int = 0,
+    allow_generated: bool = True,
+    allow_translation: bool = True,
+) -> str:
+    """
+    Tool to fetch the transcripts of many YouTube videos (e.g. a playlist)
+    concurrently. A video that fails does not fail the others.
+
+    :param video_ids: The unique identifiers of the YouTube videos.
+    :param lang_code: The language code for the transcripts (default is 'en' for English),
+                      or comma-separated codes in order of preference, e.g. 'de,en'.
+    :param format: The format of each transcript; either 'text' or 'json'.
+    :param max_concurrency: How many videos to fetch at once (default YOUTUBE_BATCH_CONCURRENCY).
+    :param allow_generated: Whether auto-generated transcripts may be used.
+    :param allow_translation: Whether a transcript may be translated into a preferred language.
+    :return: A JSON array with one {"video_id", "language_code", "is_generated",
+             "translated_from", "transcript"} or {"video_id", "error"} object per video,
+             in the order given. JSON transcripts are arrays of {"text", "start",
+             "duration"} snippets.
+    """
+    if not isinstance(format, str) or format.lower() not in VALID_FORMATS:
+        raise ValueError(f"The format must be one of {VALID_FORMATS}.")
+    if not isinstance(lang_code, str) or not _parse_lang_codes(lang_code=lang_code):
+        raise ValueError("The lang_code must be a non-empty string.")
+    if len(video_ids) > YOUTUBE_BATCH_MAX_VIDEOS:
+        raise ValueError(
+            f"At most {YOUTUBE_BATCH_MAX_VIDEOS} videos can be fetched per call."
+        )
+    format = format.lower()
+    limit: int = max_concurrency if max_concurrency > 0 else YOUTUBE_BATCH_CONCURRENCY
+    semaphore = asyncio.Semaphore(value=min(limit, YOUTUBE_FETCH_WORKERS))
+
+    async def fetch_one(video_id: str) -> dict[str, Any]:
+        async with semaphore:
+            try:
+                record: dict[str, Any] = await _run_blocking(
+                    _load_transcript,
+                    video_id=video_id,
+                    lang_code=lang_code,
+                    allow_generated=allow_generated,
+                    allow_translation=allow_translation,
+                )
+            except ValueError as e:
+                return {"video_id": video_id, "error": str(e)}
+        if format == "text":
+            transcript: Any = _render_transcript(record=record, format=format)
+        else:
+            transcript = _transcript_rows(record=record)
+        resolved: dict[str, Any] = _resolution(record=record)
+        return {
+            "video_id": video_id,
+            "language_code": resolved["language_code"],
+            "is_generated": resolved["is_generated"],
+            "translated_from": resolved["translated_from"],
+            "transcript": transcript,
+        }
+
+    # Each distinct video is fetched once, however often it is listed
+    unique_ids: list[str] = list(dict.fromkeys(video_ids))
+    results: list[dict[str, Any]] = await asyncio.gather(
+        *(fetch_one(video_id=video_id) for video_id in unique_ids)
+    )
+    by_id: dict[str, dict[str, Any]] = dict(zip(unique_ids, results, strict=True))
+    return json.dumps([by_id[video_id] for video_id in video_ids])
+
+
+# Tool: Search fetched transcripts
+@mcp.tool()
+async def search_transcripts(
+    query: str, video_ids: list[str] | None = None, limit: int = 20
+) -> str:
+    """
+    Tool to find where a topic is discussed in transcripts fetched earlier,
+    without reading the whole transcripts.
+
+    Only transcripts this server has already fetched are searched; fetch a video's
+    transcript first to make it searchable. End a word with '*' to match it as a prefix.
+
+    :param query: The words to search for; snippets must contain all of them.
+    :param video_ids: Only search these videos (default: every fetched transcript).
+    :param limit: Maximum number of snippets to return (at most 100).
+    :return: A JSON array of matching snippets, best match first, each with its
+             video_id, language_code, start and end time in seconds, offset (to pass
+             to fetch_youtube_transcript for the surrounding snippets) and text, with
+             matched words marked as [word].
+    """
+    hits: list[SegmentHit] = await _run_blocking(
+        transcript_index.search,
+        query=query,
+        video_ids=video_ids,
+        limit=max(1, min(limit, 100)),
+    )
+    return json.dumps(
+        [
+            {
+                "video_id": hit.video_id,
+                "language_code": hit.language_code,
+                "start": hit.start,
+                "end": round(hit.start + hit.duration, 3),
+                "offset": hit.offset,
+                "text": hit.text,
+            }
+            for hit in hits
+        ]
+    )
+
+
+# Resource: Transcript cache statistics
+@mcp.resource(uri="transcripts://cache/stats")
+async def get_cache_stats() -> str:
+    """
+    Report hit, miss and eviction counters for each transcript cache tier and
+    for the cache of videos' transcript lists.
+
+    Returns:
+        str: JSON with the counters and the number of entries held in memory.
     """
-    return await get_youtube_transcript(
-        video_id=video_id, lang_code=lang_code, format=format
+    return json.dumps(
+        {
+            "memory_entries": len(transcript_cache.memory),
+            **transcript_cache.stats(),
+            "transcript_lists": transcript_list_cache.stats()["memory"],
+        },
+        indent=2,
     )
 
 
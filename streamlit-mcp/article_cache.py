@@ -0,0 +1,217 @@
+# article_cache.py
+
+"""
+Content cache for the Wikipedia summary server.
+
+Summarizing an article is fetch -> parse -> Markdown -> LLM, and each step's
+output is cached in one SQLite file:
+
+- pages: per canonical URL, the ETag/Last-Modified validators of the last
+  response and hashes of its HTML and extracted Markdown, so the page is
+  re-downloaded only when it changed and re-parsed only when its HTML did.
+- markdown: extracted Markdown by content hash.
+- summaries: generated summaries by (Markdown hash, model), so an unchanged
+  article is summarized once per model.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
+
+@dataclass
+class CachedPage:
+    """What is known about the last response for a URL."""
+
+    url: str
+    etag: str | None
+    last_modified: str | None
+    html_hash: str
+    markdown_hash: str
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Headers asking the server to answer 304 if the page is unchanged."""
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def content_hash(content: str | bytes) -> str:
+    """SHA-256 hex digest of `content`, encoding text as UTF-8."""
+    if isinstance(content, str):
+        content = content.encode(encoding="utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalizes the spellings of one article's URL to a single cache key.
+
+    The scheme and host are lowercased, mobile hosts (en.m.wikipedia.org)
+    map to the desktop host, the fragment is dropped, spaces in the path
+    become underscores and percent-encoding is made consistent, so that
+    `https://en.m.wikipedia.org/wiki/Model Context Protocol#History` and
+    `https://en.wikipedia.org/wiki/Model_Context_Protocol` share an entry.
+    """
+    parts = urlsplit(url=url.strip())
+    host: str = parts.netloc.lower().replace(".m.wikipedia.org", ".wikipedia.org")
+    path: str = quote(unquote(parts.path).replace(" ", "_"), safe="/:@!$&'()*+,;=-._~")
+    return urlunsplit((parts.scheme.lower(), host, path or "/", parts.query, ""))
+
+
+class ArticleCache:
+    """
+    A persistent cache of fetched pages, their Markdown and their summaries.
+
+    The database is opened lazily on first use. Markdown and summaries no
+    longer referenced by any page are removed when a page changes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(database=self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                "html_hash TEXT NOT NULL, markdown_hash TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS markdown ("
+                "hash TEXT PRIMARY KEY, markdown TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "markdown_hash TEXT NOT NULL, model TEXT NOT NULL, "
+                "summary TEXT NOT NULL, PRIMARY KEY (markdown_hash, model))"
+            )
+        return self._conn
+
+    def page(self, url: str) -> CachedPage | None:
+        """Return the cached page for a canonical URL, if its Markdown is cached."""
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT url, etag, last_modified, html_hash, markdown_hash "
+                    "FROM pages JOIN markdown ON markdown.hash = pages.markdown_hash "
+                    "WHERE url = ?",
+                    (url,),
+                )
+                .fetchone()
+            )
+        return CachedPage(*row) if row is not None else None
+
+    def markdown(self, markdown_hash: str) -> str | None:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT markdown FROM markdown WHERE hash = ?", (markdown_hash,)
+                )
+                .fetchone()
+            )
+        return row[0] if row is not None else None
+
+    def store_page(self, page: CachedPage, markdown: str) -> None:
+        """
+        Record the latest response for a page and its extracted Markdown,
+        dropping the Markdown and summaries of the page's previous version
+        unless another page still shares them.
+        """
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                row = conn.execute(
+                    "SELECT markdown_hash FROM pages WHERE url = ?", (page.url,)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR IGNORE INTO markdown VALUES (?, ?)",
+                    (page.markdown_hash, markdown),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                    (
+                        page.url,
+                        page.etag,
+                        page.last_modified,
+                        page.html_hash,
+                        page.markdown_hash,
+                    ),
+                )
+                if row is not None and row[0] != page.markdown_hash:
+                    self._drop_unreferenced(conn=conn, markdown_hash=row[0])
+
+    def update_validators(
+        self, url: str, etag: str | None, last_modified: str | None
+    ) -> None:
+        """Keep the validators of a 304 response, which may refresh them."""
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                conn.execute(
+                    "UPDATE pages SET etag = coalesce(?, etag), "
+                    "last_modified = coalesce(?, last_modified) WHERE url = ?",
+                    (etag, last_modified, url),
+                )
+
+    def drop_page(self, url: str) -> None:
+        """Forget a page, and its Markdown and summaries unless shared."""
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                row = conn.execute(
+                    "SELECT markdown_hash FROM pages WHERE url = ?", (url,)
+                ).fetchone()
+                conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                if row is not None:
+                    self._drop_unreferenced(conn=conn, markdown_hash=row[0])
+
+    @staticmethod
+    def _drop_unreferenced(conn: sqlite3.Connection, markdown_hash: str) -> None:
+        if conn.execute(
+            "SELECT 1 FROM pages WHERE markdown_hash = ?", (markdown_hash,)
+        ).fetchone():
+            return
+        conn.execute("DELETE FROM markdown WHERE hash = ?", (markdown_hash,))
+        conn.execute("DELETE FROM summaries WHERE markdown_hash = ?", (markdown_hash,))
+
+    def summary(self, markdown_hash: str, model: str) -> str | None:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT summary FROM summaries "
+                    "WHERE markdown_hash = ? AND model = ?",
+                    (markdown_hash, model),
+                )
+                .fetchone()
+            )
+        return row[0] if row is not None else None
+
+    def store_summary(self, markdown_hash: str, model: str, summary: str) -> None:
+        with self._lock:
+            conn: sqlite3.Connection = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)",
+                    (markdown_hash, model, summary),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
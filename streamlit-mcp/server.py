@@ -1,9 +1,11 @@
 # server.py
 import os
 import sys
+from pathlib import Path
 
 import requests
 import uvicorn
+from article_cache import ArticleCache, CachedPage, canonical_url, content_hash
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from html2text import html2text
@@ -28,11 +30,92 @@ if os.getenv("MODEL_NAME") is None:
 # Get model name from environment variables
 MODEL_NAME: str = os.getenv(key="MODEL_NAME", default="gpt-4.1-nano")
 
+# Fetched pages, their Markdown and their summaries (see article_cache.py)
+ARTICLE_CACHE_PATH: Path = Path(
+    os.getenv(
+        key="ARTICLE_CACHE_PATH",
+        default=str(Path(__file__).parent / "article_cache.sqlite3"),
+    )
+)
+article_cache = ArticleCache(path=ARTICLE_CACHE_PATH)
+
 
 # MCP server instance
 mcp = FastMCP(name="wiki-summary")
 
 
+def _extract_markdown(html: str) -> str:
+    """
+    Parse an article's HTML and convert its main content to Markdown.
+    """
+    # Parse HTML article content
+    soup = BeautifulSoup(markup=html, features="html.parser")
+
+    # Main window content text
+    content_div = soup.find(name="div", attrs={"id": "mw-content-text"})
+    if not content_div:
+        raise McpError(
+            error=ErrorData(
+                code=INVALID_PARAMS,
+                message="Failed to find the main content of the article.",
+            )
+        )
+
+    # Convert HTML content to Markdown
+    return html2text(html=str(object=content_div))
+
+
+def _fetch_markdown(url: str, cached: CachedPage | None) -> tuple[str, str | None]:
+    """
+    Fetch an article, conditionally if it was fetched before, and extract its
+    Markdown unless the cached extract is still current.
+
+    Returns:
+        The Markdown's content hash, and the Markdown if it was extracted
+        now, or None if the cached one is still current. Without `cached`,
+        the Markdown is always extracted.
+    """
+    # Fetch HTML article content, unless unchanged since the last fetch
+    response: Response = requests.get(
+        url, headers=cached.conditional_headers() if cached else None
+    )
+    etag: str | None = response.headers.get("ETag")
+    last_modified: str | None = response.headers.get("Last-Modified")
+
+    if response.status_code == 304 and cached is not None:
+        article_cache.update_validators(url=url, etag=etag, last_modified=last_modified)
+        return cached.markdown_hash, None
+
+    # Response status
+    if response.status_code != 200:
+        raise McpError(
+            error=ErrorData(
+                code=INVALID_PARAMS,
+                message=f"Failed to fetch the article. Status code: {response.status_code}",
+            )
+        )
+
+    html_hash: str = content_hash(content=response.content)
+    if cached is not None and cached.html_hash == html_hash:
+        # Same HTML without validators: nothing to parse again
+        article_cache.update_validators(url=url, etag=etag, last_modified=last_modified)
+        return cached.markdown_hash, None
+
+    markdown_text: str = _extract_markdown(html=response.text)
+    markdown_hash: str = content_hash(content=markdown_text)
+    article_cache.store_page(
+        page=CachedPage(
+            url=url,
+            etag=etag,
+            last_modified=last_modified,
+            html_hash=html_hash,
+            markdown_hash=markdown_hash,
+        ),
+        markdown=markdown_text,
+    )
+    return markdown_hash, markdown_text
+
+
 # Tool: Summarize wikipedia article
 @mcp.tool()
 async def summarize_wikipedia_article(url: str) -> str:
@@ -40,6 +123,10 @@ async def summarize_wikipedia_article(url: str) -> str:
     Fetch a Wikipedia article at the provided URL, parse it's main content,
     convert it to Markdown, and generate a summary using the llm.
 
+    Each step is cached: the page is re-downloaded only if the server reports
+    it changed (ETag/Last-Modified), re-parsed only if its HTML changed, and
+    re-summarized only if its Markdown changed or the model is different.
+
     Usage:
         summarize_wikipedia_article("https://en.wikipedia.org/wiki/Model_Context_Protocol")
     """
@@ -49,40 +136,34 @@ async def summarize_wikipedia_article(url: str) -> str:
         if not url.startswith(("http", "https")):
             raise ValueError("Invalid URL: Must start with 'http://' or 'https://'")
 
-        # Fetch HTML article content
-        response: Response = requests.get(url)
-
-        # Response status
-        if response.status_code != 200:
-            raise McpError(
-                error=ErrorData(
-                    code=INVALID_PARAMS,
-                    message=f"Failed to fetch the article. Status code: {response.status_code}",
-                )
-            )
-
-        # Parse HTML article content
-        soup = BeautifulSoup(markup=response.text, features="html.parser")
-
-        # Main window content text
-        content_div = soup.find(name="div", attrs={"id": "mw-content-text"})
-        if not content_div:
-            raise McpError(
-                error=ErrorData(
-                    code=INVALID_PARAMS,
-                    message="Failed to find the main content of the article.",
-                )
-            )
+        # One cache entry per article, however its URL is spelled
+        url = canonical_url(url=url)
+        markdown_hash, markdown_text = _fetch_markdown(
+            url=url, cached=article_cache.page(url=url)
+        )
 
-        # Convert HTML content to Markdown
-        markdown_text: str = html2text(html=str(object=content_div))
+        # Summaries are reused for unchanged content and the same model
+        summary: str | None = article_cache.summary(
+            markdown_hash=markdown_hash, model=MODEL_NAME
+        )
+        if summary is not None:
+            return summary
+        if markdown_text is None:
+            markdown_text = article_cache.markdown(markdown_hash=markdown_hash)
+        if markdown_text is None:
+            # Pruned by a concurrent update of the page: fetch it again in full
+            article_cache.drop_page(url=url)
+            markdown_hash, markdown_text = _fetch_markdown(url=url, cached=None)
 
         # Summarize the article using llm
         prompt: str = f"Summarize the following text:\n\n{markdown_text}\n\nSummary:"
         llm: ChatResponse = chat(
             model=MODEL_NAME, messages=[{"role": "user", "content": prompt}]
         )
-        summary: str = llm["message"]["content"].strip()
+        summary = llm["message"]["content"].strip()
+        article_cache.store_summary(
+            markdown_hash=markdown_hash, model=MODEL_NAME, summary=summary
+        )
 
         return summary
 
@@ -133,6 +214,7 @@ app = Starlette(
         Route(path="/sse", endpoint=sse_handler),
         Mount(path="/messages/", app=sse.handle_post_message),
     ],
+    on_shutdown=[article_cache.close],
 )
 
 
@@ -0,0 +1,132 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from article_cache import ArticleCache, CachedPage, canonical_url, content_hash
+
+URL = "https://en.wikipedia.org/wiki/Model_Context_Protocol"
+MODEL = "llama3.2"
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> Iterator[ArticleCache]:
+    cache = ArticleCache(path=tmp_path / "cache" / "articles.db")
+    yield cache
+    cache.close()
+
+
+def store(
+    cache: ArticleCache, markdown: str, url: str = URL, etag: str | None = '"v1"'
+) -> CachedPage:
+    page = CachedPage(
+        url=url,
+        etag=etag,
+        last_modified="Mon, 01 Jan 2024 00:00:00 GMT",
+        html_hash=content_hash(f"<p>{markdown}</p>"),
+        markdown_hash=content_hash(markdown),
+    )
+    cache.store_page(page=page, markdown=markdown)
+    return page
+
+
+def test_canonical_url_maps_mobile_host():
+    assert (
+        canonical_url("https://EN.m.Wikipedia.org/wiki/Model_Context_Protocol") == URL
+    )
+
+
+def test_canonical_url_drops_fragment():
+    assert canonical_url(f"{URL}#History") == URL
+
+
+def test_canonical_url_spaces_and_percent_encoding_match():
+    spaced = canonical_url("https://en.wikipedia.org/wiki/Model Context Protocol")
+    encoded = canonical_url("https://en.wikipedia.org/wiki/Model%20Context%20Protocol")
+    assert spaced == encoded == URL
+
+
+def test_canonical_url_keeps_query_and_normalizes_escapes():
+    assert canonical_url("https://en.wikipedia.org/wiki/Caf%c3%a9?oldid=1") == (
+        "https://en.wikipedia.org/wiki/Caf%C3%A9?oldid=1"
+    )
+    assert canonical_url("https://en.wikipedia.org/wiki/Café") == (
+        "https://en.wikipedia.org/wiki/Caf%C3%A9"
+    )
+
+
+def test_conditional_headers():
+    page = CachedPage(URL, '"v1"', None, "h", "m")
+    assert page.conditional_headers() == {"If-None-Match": '"v1"'}
+    page.last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert page.conditional_headers()["If-Modified-Since"] == page.last_modified
+
+
+def test_store_page_round_trip(cache: ArticleCache):
+    page = store(cache=cache, markdown="# v1")
+    assert cache.page(url=URL) == page
+    assert cache.markdown(markdown_hash=page.markdown_hash) == "# v1"
+    assert cache.page(url=f"{URL}_(disambiguation)") is None
+
+
+def test_store_page_prunes_previous_version(cache: ArticleCache):
+    old = store(cache=cache, markdown="# v1")
+    cache.store_summary(markdown_hash=old.markdown_hash, model=MODEL, summary="s1")
+
+    new = store(cache=cache, markdown="# v2", etag='"v2"')
+
+    assert cache.page(url=URL) == new
+    assert cache.markdown(markdown_hash=old.markdown_hash) is None
+    assert cache.summary(markdown_hash=old.markdown_hash, model=MODEL) is None
+    assert cache.markdown(markdown_hash=new.markdown_hash) == "# v2"
+
+
+def test_store_page_keeps_markdown_shared_with_another_page(cache: ArticleCache):
+    old = store(cache=cache, markdown="# shared")
+    store(cache=cache, markdown="# shared", url=f"{URL}_(redirect)")
+    cache.store_summary(markdown_hash=old.markdown_hash, model=MODEL, summary="s1")
+
+    store(cache=cache, markdown="# v2")
+
+    assert cache.markdown(markdown_hash=old.markdown_hash) == "# shared"
+    assert cache.summary(markdown_hash=old.markdown_hash, model=MODEL) == "s1"
+
+
+def test_update_validators_keeps_existing_values(cache: ArticleCache):
+    store(cache=cache, markdown="# v1")
+
+    cache.update_validators(url=URL, etag=None, last_modified="Tue, 02 Jan 2024")
+    page = cache.page(url=URL)
+    assert page is not None
+    assert page.etag == '"v1"'
+    assert page.last_modified == "Tue, 02 Jan 2024"
+
+    cache.update_validators(url=URL, etag='"v2"', last_modified=None)
+    page = cache.page(url=URL)
+    assert page is not None
+    assert page.etag == '"v2"'
+    assert page.last_modified == "Tue, 02 Jan 2024"
+
+
+def test_drop_page(cache: ArticleCache):
+    page = store(cache=cache, markdown="# v1")
+    cache.store_summary(markdown_hash=page.markdown_hash, model=MODEL, summary="s1")
+
+    cache.drop_page(url=URL)
+
+    assert cache.page(url=URL) is None
+    assert cache.markdown(markdown_hash=page.markdown_hash) is None
+    assert cache.summary(markdown_hash=page.markdown_hash, model=MODEL) is None
+    cache.drop_page(url=URL)
+
+
+def test_cache_persists_across_instances(tmp_path: Path):
+    path = tmp_path / "articles.db"
+    first = ArticleCache(path=path)
+    page = store(cache=first, markdown="# v1")
+    first.store_summary(markdown_hash=page.markdown_hash, model=MODEL, summary="s1")
+    first.close()
+
+    second = ArticleCache(path=path)
+    assert second.page(url=URL) == page
+    assert second.summary(markdown_hash=page.markdown_hash, model=MODEL) == "s1"
+    second.close()